@@ -1,15 +1,33 @@
-import yfinance as yf
-import pandas as pd
-import numpy as np
 from datetime import date
 import warnings
 
+class FetchError(Exception):
+    """yfinance returned nothing for a ticker, which is usually rate limiting; worth retrying."""
+
+
+def make_session():
+    """One HTTP session to share across scrapers, so connections are reused between tickers.
+
+    yfinance requires a curl_cffi session; it keeps one curl handle per thread,
+    which makes a single instance safe to share with the fetch worker pool.
+    """
+    from curl_cffi import requests as curl_requests
+    return curl_requests.Session(impersonate="chrome")
+
+
 class FundamentalScraper: 
-    def __init__(self, ticker):
+    def __init__(self, ticker, session=None, cache=None, limiter=None):
         self.ticker = ticker 
+        self.session = session
+        self.cache = cache
+        # A fetch_engine.TokenBucket charged once per upstream request; cache hits are free.
+        self.limiter = limiter
+        self._yf_tickers = {}
         self.tickerFundamentals = {
             "ticker": self.ticker, 
             'company_name': "",
+            'sector': "",
+            'industry': "",
             'snapshot_date': date.today().strftime("%m/%d/%Y"), 
             "revenue_growth_YoY": "",  
             "debt_to_equity": "", 
@@ -26,31 +44,47 @@ class FundamentalScraper:
 
         }
 
+    def _payload(self, symbol, endpoint, **params):
+        """A yfinance Ticker attribute (or history(**params)), served from the disk cache when one is set."""
+        def load():
+            # Imported on the first network fetch; runs served from the cache or the stub never load it.
+            import yfinance as yf
+
+            if self.limiter is not None:
+                self.limiter.acquire()
+            if symbol not in self._yf_tickers:
+                self._yf_tickers[symbol] = yf.Ticker(symbol, session=self.session)
+            ticker = self._yf_tickers[symbol]
+            return ticker.history(**params) if endpoint == "history" else getattr(ticker, endpoint)
+
+        if self.cache is None:
+            return load()
+        return self.cache.fetch(endpoint, symbol, load, params)
+
     def setFundamentals(self, ticker): 
-        ticker = yf.Ticker(ticker)
         try:
-            quarterly_income_stmt = ticker.quarterly_income_stmt
+            quarterly_income_stmt = self._payload(ticker, "quarterly_income_stmt")
             last_quarter_data = quarterly_income_stmt.iloc[:, 0]
         except Exception as e:
             quarterly_income_stmt = None
             last_quarter_data = None
         
         try:
-            quarterly_balance_sheet = ticker.quarterly_balance_sheet
+            quarterly_balance_sheet = self._payload(ticker, "quarterly_balance_sheet")
             last_quarter_bs = quarterly_balance_sheet.iloc[:, 0]
         except Exception as e:
             quarterly_balance_sheet = None
             last_quarter_bs = None
         
         try:
-            quarterly_cashflow = ticker.quarterly_cashflow
+            quarterly_cashflow = self._payload(ticker, "quarterly_cashflow")
             last_quarter_cf = quarterly_cashflow.iloc[:, 0]
         except Exception as e:
             quarterly_cashflow = None
             last_quarter_cf = None
         
         try:
-            annual_financials = ticker.financials
+            annual_financials = self._payload(ticker, "financials")
         except Exception as e:
             annual_financials = None
         
@@ -63,11 +97,13 @@ class FundamentalScraper:
         except Exception as e:
             self.tickerFundamentals['revenue_growth_YoY'] = ""
         
+        # The info dict is what every run needs; without it there is nothing to store.
         try:
-            info = ticker.info
+            info = self._payload(ticker, "info")
         except Exception as e:
-            info = {}
-        print(info)
+            raise FetchError(f"Fetching info for {ticker} failed: {e}") from e
+        if not info:
+            raise FetchError(f"No info returned for {ticker}")
         try:
             self.tickerFundamentals['company_name'] = info.get('displayName', "")
             if self.tickerFundamentals['company_name'] == "": 
@@ -75,6 +111,13 @@ class FundamentalScraper:
         except Exception as e:
             self.tickerFundamentals['company_name'] = ""
         
+        try:
+            self.tickerFundamentals['sector'] = info.get('sector', "")
+            self.tickerFundamentals['industry'] = info.get('industry', "")
+        except Exception as e:
+            self.tickerFundamentals['sector'] = ""
+            self.tickerFundamentals['industry'] = ""
+
         try:
             self.tickerFundamentals['EPS TTM'] = info.get('trailingEps', "")
         except Exception as e:
@@ -128,7 +171,7 @@ class FundamentalScraper:
             self.tickerFundamentals['interest_coverage'] = ""
         
         try:
-            freeCashFlow = ticker.cash_flow.loc['Free Cash Flow'].iloc[0]
+            freeCashFlow = self._payload(ticker, "cash_flow").loc['Free Cash Flow'].iloc[0]
             isFreeCashFlowPositive = freeCashFlow > 0 
             self.tickerFundamentals['free_cash_flow_positive'] = isFreeCashFlowPositive.item()
         except Exception as e:
@@ -168,12 +211,19 @@ class FundamentalScraper:
         self.setFundamentals(self.ticker)
         return self.tickerFundamentals
 
-    def getPriceHistory(self):
+    def getPriceHistory(self, start=None):
+        import pandas as pd
+
         try:
-            ticker = yf.Ticker(self.ticker)
-            hist = ticker.history(period="5y")
+            if start is not None:
+                hist = self._payload(self.ticker, "history", start=start)
+            else:
+                hist = self._payload(self.ticker, "history", period="5y")
             
             if hist.empty:
+                # No bars since `start` is normal; none at all for a full fetch means the request failed.
+                if start is None:
+                    raise FetchError(f"No price history returned for {self.ticker}")
                 return []
             
             price_data = []
@@ -188,6 +238,7 @@ class FundamentalScraper:
                 })
             
             return price_data
+        except FetchError:
+            raise
         except Exception as e:
-            print(f"Error fetching price history for {self.ticker}: {e}")
-            return []
\ No newline at end of file
+            raise FetchError(f"Fetching price history for {self.ticker} failed: {e}") from e
\ No newline at end of file
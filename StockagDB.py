@@ -1,71 +1,93 @@
 import pandas as pd
-from models import SessionLocal, Fundamental, Stock, engine, Base
-import numpy as np 
+from models import SessionLocal, Fundamental, Stock, Base, FUNDAMENTAL_FIELDS, get_engine
+from response_cache import bump_data_version
+from bulk_loader import update_stock_groups, upsert_stocks
+from fundamental_history import append_snapshots
+from peer_ranks import update_peer_ranks
+from sqlalchemy import event
+import numpy as np
+import time
+
+
+def load_fundamentals_csv(path):
+    df = pd.read_csv(path)
+    df = df[df['ticker'].notna()]
+    df = df.rename(columns=FUNDAMENTAL_FIELDS)
+    df['snapshot_date'] = pd.to_datetime(df['snapshot_date']).dt.date
+    return df.replace({np.nan: None})
+
+
+def bulk_seed(db, df, chunk_size=500):
+    """Seed stocks and fundamentals from a frame in a handful of statements. Does not commit."""
+    timings = {}
+
+    start = time.perf_counter()
+    # Sector and industry are only in CSVs scraped since they were added.
+    stock_rows = df.reindex(columns=['ticker', 'company_name', 'sector', 'industry']).replace({np.nan: None}).to_dict('records')
+    columns = [c.name for c in Fundamental.__table__.columns if c.name != 'id']
+    fundamental_rows = df.reindex(columns=columns).replace({np.nan: None}).to_dict('records')
+    timings['transform'] = time.perf_counter() - start
+
+    # 1. Ensure the Stock entries exist (Foreign Key requirement)
+    start = time.perf_counter()
+    inserted = upsert_stocks(db, stock_rows, chunk_size)
+    update_stock_groups(db, stock_rows, chunk_size)
+    timings['stocks'] = time.perf_counter() - start
+
+    # 2. Append the snapshots to the history and refresh the latest fundamentals
+    start = time.perf_counter()
+    append_snapshots(db, fundamental_rows, chunk_size)
+    timings['fundamentals'] = time.perf_counter() - start
+
+    # 3. Re-rank every ticker within its sector and industry
+    start = time.perf_counter()
+    update_peer_ranks(db, chunk_size)
+    timings['peer_ranks'] = time.perf_counter() - start
+
+    return inserted, timings
+
 
 if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Seed the database from Fundamentals.csv.")
+    parser.add_argument("--csv", default="Fundamentals.csv")
+    parser.add_argument("--chunk-size", type=int, default=500)
+    parser.add_argument("--dry-run", action="store_true", help="Run the load, print a timing report, then roll back")
+    args = parser.parse_args()
+
     print("Connecting to database and creating tables...")
+    engine = get_engine()
     Base.metadata.create_all(bind=engine)
     print("Tables created/verified.")
 
-    df = pd.read_csv('Fundamentals.csv')
-    df = df.replace({np.nan: None})
+    statements = []
+    event.listen(engine, "before_cursor_execute", lambda *a: statements.append(1))
+
+    start = time.perf_counter()
+    df = load_fundamentals_csv(args.csv)
+    read_elapsed = time.perf_counter() - start
     db = SessionLocal()
-    
+
     try:
-        print("Processing records...")
-        for index, row in df.iterrows():
-            entry = row.to_dict()
-            ticker_symbol = entry.get('ticker')
-            
-            if not ticker_symbol:
-                continue
-
-            # 1. Ensure the Stock entry exists (Foreign Key requirement)
-            stock = db.query(Stock).filter(Stock.ticker == ticker_symbol).first()
-            if not stock:
-                new_stock = Stock(
-                    ticker=ticker_symbol, 
-                    company_name=entry.get('company_name')
-                )
-                db.add(new_stock)
-                db.flush() # Sync with DB but don't commit yet
-
-            # 2. Check if fundamental already exists (avoid duplicates)
-            db.query(Fundamental).filter(Fundamental.ticker == ticker_symbol).delete()
-
-            # 3. Add the Fundamental data
-            fundamentals = Fundamental(
-                ticker=ticker_symbol,
-                snapshot_date=entry.get("snapshot_date"),
-                revenue_growth_yoy=entry.get("revenue_growth_YoY"),
-                debt_to_equity=entry.get("debt_to_equity"),
-                interest_coverage=entry.get("interest_coverage"),
-                free_cash_flow_positive=entry.get("free_cash_flow_positive"),
-                roe=entry.get("roe"),
-                profit_margin=entry.get("profit_margin"),
-                current_ratio=entry.get("current_ratio"),
-                eps_ttm=entry.get("EPS TTM"),
-                pe_ttm=entry.get("P/E TTM"),
-                analyst_rating=entry.get("Analyst Rating"),
-                peg_5y=entry.get("5y PEG"),
-                week_range_52=entry.get("52 Week Range"),
-                day_range=entry.get("Day Range"),
-                current_price=entry.get("Current Price"),
-                perf_1y=entry.get("perf_1y"),
-                beta=entry.get("beta"),
-                pe_trailing=entry.get("pe_trailing"),
-                market_cap=entry.get("market_cap"),
-            )
-
-            db.add(fundamentals)
-            
-            if (index + 1) % 50 == 0:
-                print(f"Processed {index + 1} records...")
-
-        db.commit()
-        print("SUCCESS: Data fully uploaded/updated in the cloud database!")
+        print(f"Processing {len(df)} records...")
+        inserted, timings = bulk_seed(db, df, args.chunk_size)
+
+        if args.dry_run:
+            db.rollback()
+            print("DRY RUN: changes rolled back.")
+            print(f"  read csv:     {read_elapsed * 1000:.1f}ms")
+            for phase, elapsed in timings.items():
+                print(f"  {phase + ':':<13} {elapsed * 1000:.1f}ms")
+            print(f"  new stocks:   {inserted}")
+            print(f"  statements:   {len(statements)}")
+        else:
+            db.commit()
+            bump_data_version(db)
+            print(f"Inserted {inserted} new stocks, appended {len(df)} fundamentals snapshots.")
+            print("SUCCESS: Data fully uploaded/updated in the cloud database!")
     except Exception as e:
         db.rollback()
         print(f"ABORTED: Error occurred: {e}")
     finally:
-        db.close()
\ No newline at end of file
+        db.close()
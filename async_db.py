@@ -0,0 +1,56 @@
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+from starlette.concurrency import run_in_threadpool
+
+from models import SessionLocal, pool_options, settings
+
+ASYNC_DRIVERS = {
+    "postgresql": "postgresql+asyncpg",
+    "postgresql+psycopg2": "postgresql+asyncpg",
+    "sqlite": "sqlite+aiosqlite",
+}
+
+_engine = None
+_session_factory = None
+
+
+def async_database_url(url):
+    scheme, sep, rest = url.partition("://")
+    return ASYNC_DRIVERS.get(scheme, scheme) + sep + rest
+
+
+def get_async_engine():
+    """The AsyncEngine is built on first use, so sync-only processes never import asyncpg/aiosqlite."""
+    global _engine, _session_factory
+    if _engine is None:
+        url = settings()["database_url"]
+        _engine = create_async_engine(async_database_url(url), echo=settings()["sql_echo"], **pool_options(url))
+        _session_factory = async_sessionmaker(_engine, expire_on_commit=False)
+    return _engine
+
+
+async def get_async_db():
+    get_async_engine()
+    async with _session_factory() as db:
+        yield db
+
+
+def async_session():
+    """A new AsyncSession for work that outlives a request, such as a streaming response."""
+    get_async_engine()
+    return _session_factory()
+
+
+async def run_in_sync_session(fn, *args, **kwargs):
+    """fn(db, *args, **kwargs) on a worker thread with its own sync Session.
+
+    For CPU-heavy work (pandas, NumPy) that would stall the event loop under AsyncSession.run_sync.
+    """
+
+    def call():
+        db = SessionLocal()
+        try:
+            return fn(db, *args, **kwargs)
+        finally:
+            db.close()
+
+    return await run_in_threadpool(call)
@@ -0,0 +1,244 @@
+import math
+from datetime import date
+from typing import Optional
+
+from fastapi import APIRouter, Depends, HTTPException, Query, Request
+from sqlalchemy import func, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+import screener_engine
+from async_db import get_async_db, run_in_sync_session
+from exports import (
+    export_format, export_period, export_response, export_tickers, price_export_statement, screener_export_statement
+)
+from keyset import keyset_result, keyset_statements
+from models import Stock
+from queries import (
+    SCREENER_COLUMNS, screener_params, screener_statement, apply_screener_filters, screener_order,
+    fundamental_dict, screener_dict, price_history_statement, price_history_rows,
+    screener_source, batch_tickers, stock_detail_statement, stock_details, price_history_batch_statement, aligned_price_series
+)
+from response_cache import response_cache, cached_response_async
+from scoring import factor_weights, scorer
+from serialization import json_response
+
+# Async versions of the read endpoints in stockendpoint.py, mounted ahead of them when DB_MODE=async.
+router = APIRouter()
+
+
+@router.get("/api/fundamentals")
+async def get_fundamentals(
+    params: dict = Depends(screener_params),
+    pagination: str = Query("offset", pattern="^(offset|cursor)$"),
+    cursor: Optional[str] = Query(None),
+    include_total: bool = Query(False),
+    as_of: Optional[date] = Query(None, description="Screen the fundamentals as they were on this date"),
+    db: AsyncSession = Depends(get_async_db)
+):
+    use_cursor = pagination == "cursor" or cursor is not None
+
+    if screener_engine.enabled and not use_cursor and as_of is None:
+        # The snapshot only touches the database when it is due for a version check; filtering and sorting
+        # the arrays is CPU work, so it runs on a worker thread.
+        payload = await run_in_sync_session(screener_engine.screener.query, **params)
+        return json_response(payload)
+
+    page, limit = params["page"], params["limit"]
+    sort_by, sort_order = params["sort_by"], params["sort_order"]
+    source = screener_source(as_of, params)
+
+    stmt = apply_screener_filters(
+        screener_statement(select, source),
+        params["ranges"],
+        params["fcf_positive"],
+        params["analyst_rating"],
+        params["ticker_search"],
+        source,
+        params["sector"],
+        params["industry"],
+    )
+
+    if use_cursor:
+        if sort_by not in SCREENER_COLUMNS:
+            sort_by, sort_order = "market_cap", "desc"
+        total_records = None
+        if include_total:
+            total_records = await db.scalar(select(func.count()).select_from(stmt.subquery()))
+        try:
+            page_stmts = keyset_statements(stmt, sort_by, sort_order, limit, cursor, source)
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+        rows = []
+        for page_stmt in page_stmts:
+            rows += (await db.execute(page_stmt)).all()
+            if len(rows) > limit:
+                break
+        results, next_cursor = keyset_result(rows, sort_by, sort_order, limit)
+
+        return json_response({
+            "data": [screener_dict(r) for r in results],
+            "pagination": {
+                "limit": limit,
+                "next_cursor": next_cursor,
+                "total": total_records
+            }
+        })
+
+    total_records = await db.scalar(select(func.count()).select_from(stmt.subquery()))
+
+    offset = (page - 1) * limit
+    stmt = stmt.order_by(screener_order(sort_by, sort_order, source)).offset(offset).limit(limit)
+    results = (await db.execute(stmt)).all()
+
+    return json_response({
+        "data": [screener_dict(r) for r in results],
+        "pagination": {
+            "total": total_records,
+            "page": page,
+            "limit": limit,
+            "total_pages": math.ceil(total_records / limit)
+        }
+    })
+
+
+@router.get("/api/stock/{ticker}")
+async def get_stock_detail(ticker: str, request: Request, db: AsyncSession = Depends(get_async_db)):
+
+    async def build():
+        # Joined up front: lazy-loading item.stock is not possible on an AsyncSession.
+        row = (await db.execute(stock_detail_statement([ticker.upper()]).limit(1))).first()
+
+        if not row:
+            raise HTTPException(status_code=404, detail="Stock not found")
+
+        item, company_name = row
+        item_dict = fundamental_dict(item)
+
+        if company_name is not None:
+            item_dict['company_name'] = company_name
+
+        return item_dict
+
+    return await cached_response_async(response_cache, request, db, build)
+
+
+@router.get("/api/stocks")
+async def get_all_tickers(db: AsyncSession = Depends(get_async_db)):
+    stocks = (await db.execute(select(Stock.ticker, Stock.company_name))).all()
+    return [{"ticker": s.ticker, "name": s.company_name} for s in stocks]
+
+
+@router.get("/api/stocks/details")
+async def get_stock_details(
+    request: Request,
+    tickers: list = Depends(batch_tickers),
+    db: AsyncSession = Depends(get_async_db)
+):
+
+    async def build():
+        return stock_details((await db.execute(stock_detail_statement(tickers))).all(), tickers)
+
+    return await cached_response_async(response_cache, request, db, build)
+
+
+@router.get("/api/stocks/price-history")
+async def get_price_histories(
+    request: Request,
+    tickers: list = Depends(batch_tickers),
+    period: str = Query("1Y"),
+    resolution: Optional[str] = Query(None, pattern="(?i)^(d|daily|w|weekly|m|monthly)$"),
+    max_points: Optional[int] = Query(None, ge=3),
+    db: AsyncSession = Depends(get_async_db)
+):
+
+    async def build():
+        price_data = (await db.execute(price_history_batch_statement(tickers, period))).all()
+        return aligned_price_series(price_data, tickers, resolution, max_points)
+
+    return await cached_response_async(response_cache, request, db, build)
+
+
+@router.get("/api/stock/{ticker}/price-history")
+async def get_price_history(
+    ticker: str,
+    request: Request,
+    period: str = Query("1Y"),
+    resolution: Optional[str] = Query(None, pattern="(?i)^(d|daily|w|weekly|m|monthly)$"),
+    max_points: Optional[int] = Query(None, ge=3),
+    db: AsyncSession = Depends(get_async_db)
+):
+
+    async def build():
+        price_data = (await db.execute(price_history_statement(ticker, period))).all()
+
+        if not price_data:
+            raise HTTPException(status_code=404, detail="No price history found for this stock")
+
+        return price_history_rows(price_data, resolution, max_points)
+
+    return await cached_response_async(response_cache, request, db, build)
+
+
+@router.get("/api/scores")
+async def get_scores(
+    request: Request,
+    weights: dict = Depends(factor_weights),
+    method: str = Query("z", pattern="^(z|rank)$"),
+    params: dict = Depends(screener_params),
+    db: AsyncSession = Depends(get_async_db)
+):
+    filters = {k: v for k, v in params.items() if k not in ("sort_by", "sort_order")}
+
+    async def build():
+        return await run_in_sync_session(scorer.score, weights, method, **filters)
+
+    return await cached_response_async(response_cache, request, db, build)
+
+
+@router.get("/api/backtest")
+async def get_backtest(
+    request: Request,
+    params: dict = Depends(screener_params),
+    start: Optional[date] = Query(None),
+    end: Optional[date] = Query(None),
+    rebalance: str = Query("M", pattern="^(W|M|Q|A)$"),
+    weighting: str = Query("equal", pattern="^(equal|cap)$"),
+    point_in_time: bool = Query(False, description="Screen each rebalance on the fundamentals as of that date"),
+    max_holdings: Optional[int] = Query(None, ge=1, description="Hold the first N by sort_by"),
+    cost_bps: float = Query(0.0, ge=0),
+    db: AsyncSession = Depends(get_async_db)
+):
+
+    async def build():
+        from backtest import price_matrix, run_backtest
+
+        # The pivot and simulation are CPU-bound, so they run on a worker thread rather than the event loop.
+        result = await run_in_sync_session(
+            run_backtest, price_matrix, params, start, end, rebalance, weighting, point_in_time, max_holdings, cost_bps
+        )
+        if result is None:
+            raise HTTPException(status_code=404, detail="Not enough price history in this range")
+        return result
+
+    return await cached_response_async(response_cache, request, db, build)
+
+
+@router.get("/api/export/fundamentals")
+async def export_fundamentals(
+    request: Request,
+    format: str = Depends(export_format),
+    params: dict = Depends(screener_params),
+    as_of: Optional[date] = Query(None, description="Export the fundamentals as they were on this date"),
+):
+    stmt = screener_export_statement(params, screener_source(as_of, params))
+    return export_response(request, stmt, format, "fundamentals", use_async=True)
+
+
+@router.get("/api/export/price-history")
+async def export_price_history(
+    request: Request,
+    format: str = Depends(export_format),
+    tickers: Optional[list] = Depends(export_tickers),
+    period: Optional[str] = Depends(export_period),
+):
+    return export_response(request, price_export_statement(tickers, period), format, "price-history", use_async=True)
@@ -0,0 +1,221 @@
+"""Backtests of screener rules over price_history.
+
+Close prices are held in process as one dates x tickers matrix (forward-filled),
+loaded once and reloaded only when the price data changes. A backtest screens
+the universe with the /api/fundamentals filters, either once on the latest
+fundamentals or at each rebalance date on the fundamentals as they were then
+(`point_in_time`). It weights the holdings equally or by market cap, and
+derives the equity curve, turnover, drawdown and Sharpe ratio from array
+operations over the matrix. There is no per-day or per-ticker Python loop.
+"""
+import math
+import os
+import threading
+import time
+
+import numpy as np
+import pandas as pd
+from sqlalchemy import func, select
+
+from indicators import TRADING_DAYS
+from models import DataVersion, PriceHistory
+from queries import apply_screener_filters, screener_order, screener_source, screener_statement
+
+REBALANCE_FREQUENCIES = {"W": "W", "M": "M", "Q": "Q", "A": "Y"}
+
+
+class PriceMatrix:
+    """Forward-filled close prices as a dates x tickers array, checked for changes every `check_interval` seconds."""
+
+    def __init__(self, check_interval=30.0):
+        self.check_interval = check_interval
+        self.dates = None
+        self.tickers = None
+        self.closes = None
+        self.version = None
+        self.checked_at = 0.0
+        self.reloading = False
+        self.lock = threading.Lock()
+
+    @staticmethod
+    def current_version(db):
+        # max(id) is a primary key lookup where count() scans the table. Rewritten bars get new ids, and the
+        # writers bump the data version for rows updated in place.
+        max_id = db.query(func.max(PriceHistory.id)).scalar()
+        data_version = db.query(DataVersion.version).filter(DataVersion.id == 1).scalar()
+        return (max_id, data_version)
+
+    @staticmethod
+    def load(db):
+        rows = db.execute(select(PriceHistory.date, PriceHistory.ticker, PriceHistory.close_price)).all()
+        frame = pd.DataFrame(rows, columns=["date", "ticker", "close"])
+        frame["date"] = pd.to_datetime(frame["date"])
+        frame["close"] = pd.to_numeric(frame["close"]).where(lambda c: c > 0)
+        # Forward-filled, so a missing bar holds the last price; NaN only before a ticker's first bar.
+        matrix = frame.pivot_table(index="date", columns="ticker", values="close", aggfunc="last").sort_index().ffill()
+        return matrix.index, matrix.columns.to_numpy(dtype=str), matrix.to_numpy(dtype=float)
+
+    def ensure_fresh(self, db):
+        """(dates, tickers, closes), reloaded first if the price data changed.
+
+        As in screener_engine.ScreenerSnapshot, the lock is never held across the queries,
+        so concurrent requests keep serving the current matrix during a reload.
+        """
+        with self.lock:
+            state = self.dates, self.tickers, self.closes
+            due = self.closes is None or time.monotonic() - self.checked_at >= self.check_interval
+            if not due or (self.reloading and self.closes is not None):
+                return state
+            self.reloading = True
+        try:
+            version = self.current_version(db)
+            loaded = self.load(db) if self.closes is None or version != self.version else None
+        except BaseException:
+            with self.lock:
+                self.reloading = False
+            raise
+        with self.lock:
+            if loaded is not None:
+                self.dates, self.tickers, self.closes = loaded
+                self.version = version
+            self.checked_at = time.monotonic()
+            self.reloading = False
+            return self.dates, self.tickers, self.closes
+
+
+def screen(db, params, as_of=None, max_holdings=None):
+    """(tickers, market caps) passing the screener filters, on the latest fundamentals or as of a date."""
+    source = screener_source(as_of, params)
+    stmt = apply_screener_filters(
+        screener_statement(select, source).with_only_columns(source.ticker, source.market_cap),
+        params["ranges"],
+        params["fcf_positive"],
+        params["analyst_rating"],
+        params["ticker_search"],
+        source,
+        params["sector"],
+        params["industry"],
+    )
+    if max_holdings:
+        stmt = stmt.order_by(screener_order(params["sort_by"], params["sort_order"], source), source.ticker)
+        stmt = stmt.limit(max_holdings)
+    rows = db.execute(stmt).all()
+    return [r[0] for r in rows], np.array([np.nan if r[1] is None else r[1] for r in rows], dtype=float)
+
+
+def target_weights(held, caps, weighting):
+    """Rows of `held` (bool) as weights summing to 1, or 0 for a rebalance with nothing to hold."""
+    if weighting == "cap":
+        raw = np.where(held & (caps > 0), caps, 0.0)
+    else:
+        raw = held.astype(float)
+    totals = raw.sum(axis=1, keepdims=True)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        return np.where(totals > 0, raw / totals, 0.0)
+
+
+def simulate(prices, starts, weights, cost=0.0):
+    """Equity curve and per-rebalance traded fraction for target `weights` set at rows `starts` of `prices`.
+
+    Between rebalances each holding drifts with its price; weight not invested is cash.
+    `cost` is charged on the traded fraction of the portfolio at each rebalance.
+    """
+    days = len(prices)
+    # Row d belongs to the last rebalance strictly before it; a rebalance row itself closes the previous segment.
+    segment = np.maximum(np.searchsorted(starts, np.arange(days), side="left") - 1, 0)
+    held = weights[segment]
+    with np.errstate(invalid="ignore", divide="ignore"):
+        relative = np.where(held > 0, prices / prices[starts[segment]], 0.0)
+    drifted = held * relative
+    growth = 1.0 - held.sum(axis=1) + np.nansum(drifted, axis=1)
+
+    # Weights just before each rebalance, after drifting through the previous segment.
+    before = np.zeros_like(weights)
+    before[1:] = np.nan_to_num(drifted[starts[1:]]) / growth[starts[1:], None]
+    traded = np.abs(weights - before).sum(axis=1)
+    traded[0] = weights[0].sum()
+
+    step = np.empty(len(starts))
+    step[0] = 1.0
+    step[1:] = growth[starts[1:]]
+    start_equity = np.cumprod(step * (1.0 - cost * traded))
+    equity = start_equity[segment] * growth
+    equity[starts] = start_equity
+    return equity, traded
+
+
+def performance(dates, equity):
+    returns = equity[1:] / equity[:-1] - 1
+    std = returns.std(ddof=1) if len(returns) > 1 else math.nan
+    years = (dates[-1] - dates[0]).days / 365.25
+    return {
+        "total_return": float(equity[-1] / equity[0] - 1),
+        "cagr": float((equity[-1] / equity[0]) ** (1 / years) - 1) if years > 0 else None,
+        "volatility": None if math.isnan(std) else float(std * np.sqrt(TRADING_DAYS)),
+        "sharpe": float(returns.mean() / std * np.sqrt(TRADING_DAYS)) if std > 0 else None,
+        "max_drawdown": float((equity / np.maximum.accumulate(equity) - 1).min()),
+    }
+
+
+def run_backtest(db, matrix, params, start=None, end=None, rebalance="M", weighting="equal",
+                 point_in_time=False, max_holdings=None, cost_bps=0.0):
+    """Backtest the screener `params` (from queries.screener_params) over the cached price matrix.
+
+    Without `point_in_time` the universe is screened once on today's fundamentals, which carries
+    look-ahead bias; cap weights then scale today's market cap by each rebalance date's price.
+    """
+    dates, tickers, closes = matrix.ensure_fresh(db)
+    lo = dates.searchsorted(pd.Timestamp(start)) if start else 0
+    hi = dates.searchsorted(pd.Timestamp(end), side="right") if end else len(dates)
+    if hi - lo < 2:
+        return None
+    dates = dates[lo:hi]
+    periods = dates.to_period(REBALANCE_FREQUENCIES[rebalance])
+    starts = np.flatnonzero(np.r_[True, periods[1:] != periods[:-1]])
+    rebalance_dates = dates[starts]
+
+    if point_in_time:
+        screens = [screen(db, params, d.date(), max_holdings) for d in rebalance_dates]
+    else:
+        screens = [screen(db, params, None, max_holdings)] * len(starts)
+
+    # Only the screened tickers' columns are simulated.
+    index = {t: i for i, t in enumerate(tickers)}
+    universe = sorted({t for names, _ in screens for t in names if t in index})
+    columns = np.array([index[t] for t in universe], dtype=int)
+    position = {t: i for i, t in enumerate(universe)}
+    prices = closes[lo:hi][:, columns]
+
+    held = np.zeros((len(starts), len(universe)), dtype=bool)
+    caps = np.full(held.shape, np.nan)
+    for k, (names, market_caps) in enumerate(screens):
+        cols = [position[t] for t in names if t in position]
+        held[k, cols] = True
+        caps[k, cols] = market_caps[[i for i, t in enumerate(names) if t in position]]
+    if not point_in_time:
+        caps = caps * prices[starts] / closes[-1, columns]
+    # A ticker without a price on the rebalance date (not listed yet) cannot be bought.
+    held &= np.isfinite(prices[starts])
+
+    weights = target_weights(held, caps, weighting)
+    equity, traded = simulate(prices, starts, weights, cost_bps / 10000.0)
+    # One-way turnover: half of what is traded when swapping holdings; the initial purchase is all buys.
+    turnover = traded / 2
+    turnover[0] = traded[0]
+
+    return {
+        "stats": {
+            **performance(dates, equity),
+            "rebalances": len(starts),
+            "avg_turnover": float(turnover[1:].mean()) if len(starts) > 1 else 0.0,
+            "avg_holdings": float(held.sum(axis=1).mean()),
+        },
+        "rebalances": [
+            {"date": d.date(), "holdings": int(n), "turnover": float(t)}
+            for d, n, t in zip(rebalance_dates, held.sum(axis=1), turnover)
+        ],
+        "equity": [{"date": d.date(), "value": float(v)} for d, v in zip(dates, equity)],
+    }
+
+
+price_matrix = PriceMatrix(check_interval=float(os.getenv("PRICE_MATRIX_CHECK_INTERVAL", "30")))
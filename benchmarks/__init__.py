@@ -0,0 +1,9 @@
+"""Benchmark suite for the API endpoints and the ingestion pipeline.
+
+Run from the repository root:
+
+    python -m benchmarks.run --tickers 500 --years 5 --output before.json
+    python -m benchmarks.compare before.json after.json
+
+benchmarks.importtime measures the import and process start-up time of the API and scripts the same way.
+"""
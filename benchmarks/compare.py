@@ -0,0 +1,56 @@
+"""Compare two benchmark result files and flag regressions.
+
+    python -m benchmarks.compare base.json head.json --threshold 0.2
+
+Exits with status 1 when any case got slower than the threshold allows.
+"""
+import argparse
+import json
+import sys
+
+
+def metric(result):
+    """(value, higher_is_better) for one case: median latency, or throughput for ingestion."""
+    if "median_ms" in result:
+        return result["median_ms"], False
+    return result["tickers_per_sec"], True
+
+
+def compare(base, head, threshold):
+    """Yield (name, base value, head value, relative change, regressed) for the cases in both files."""
+    for name in sorted(set(base["results"]) & set(head["results"])):
+        (old, higher_is_better), (new, _) = metric(base["results"][name]), metric(head["results"][name])
+        change = (new - old) / old if old else 0.0
+        slower = -change if higher_is_better else change
+        yield name, old, new, change, slower > threshold
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("base")
+    parser.add_argument("head")
+    parser.add_argument("--threshold", type=float, default=0.2, help="Allowed slowdown as a fraction (0.2 = 20%%)")
+    args = parser.parse_args()
+
+    with open(args.base) as f:
+        base = json.load(f)
+    with open(args.head) as f:
+        head = json.load(f)
+
+    for key in ("tickers", "years", "db_mode", "screener_engine"):
+        if base["meta"].get(key) != head["meta"].get(key):
+            print(f"warning: {key} differs ({base['meta'].get(key)} vs {head['meta'].get(key)})")
+
+    print(f"{base['meta'].get('commit')} -> {head['meta'].get('commit')}")
+    regressions = 0
+    for name, old, new, change, regressed in compare(base, head, args.threshold):
+        regressions += regressed
+        print(f"{'!!' if regressed else '  '} {name:<36} {old:>10.2f} -> {new:>10.2f}  {change:+7.1%}")
+
+    if regressions:
+        print(f"{regressions} regressions over {args.threshold:.0%}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,43 @@
+"""Deterministic synthetic dataset for the benchmarks.
+
+Values come from StubScraper, which seeds its generator with the ticker, so
+the same ticker count and years always produce the same rows. Bar dates end
+today so the price-history periods select the same number of bars on any day.
+"""
+import time
+
+from bulk_loader import load_price_history, price_rows, upsert_stocks
+from fetch_engine import StubScraper
+from fundamental_history import append_snapshots, fundamental_row
+from indicators import update_indicators
+from peer_ranks import update_peer_ranks
+
+
+def symbols(tickers, prefix="T"):
+    return [f"{prefix}{i:04d}" for i in range(tickers)]
+
+
+def build_dataset(db, tickers, years):
+    """Seed `tickers` stocks with fundamentals, `years` of daily bars, indicators and peer ranks. Commits.
+
+    Returns (symbols, stats dict).
+    """
+    StubScraper.latency = 0
+    StubScraper.days = years * 252
+    names = symbols(tickers)
+
+    start = time.perf_counter()
+    fundamentals = [StubScraper(s).getFundamentals() for s in names]
+    upsert_stocks(db, [
+        {"ticker": s, "company_name": f["company_name"], "sector": f["sector"], "industry": f["industry"]}
+        for s, f in zip(names, fundamentals)
+    ])
+    append_snapshots(db, [fundamental_row(s, f) for s, f in zip(names, fundamentals)])
+    bars = 0
+    for s in names:
+        bars += load_price_history(db, price_rows(s, StubScraper(s).getPriceHistory()))["rows"]
+    update_indicators(db, names)
+    update_peer_ranks(db)
+    db.commit()
+
+    return names, {"tickers": tickers, "bars": bars, "seconds": time.perf_counter() - start}
@@ -0,0 +1,116 @@
+"""Cold-start cost of the API and the scripts, from `python -X importtime`.
+
+Each case runs in a fresh interpreter `--repeat` times. Two timings are recorded per case:
+
+- import:<case> is the total import time that -X importtime reports;
+- startup:<case> is the wall time of the whole process, interpreter start-up included.
+
+The heavy third-party modules each case ends up loading are recorded too.
+The output has the same format as benchmarks.run, so benchmarks.compare works on it.
+
+    python -m benchmarks.importtime --output importtime.json
+"""
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+from benchmarks.run import git_revision, timings
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+CASES = {
+    "models": "import models",
+    "api_module": "import stockendpoint",
+    "api_app": "import stockendpoint; stockendpoint.app",
+    "update_fundamentals": "import update_fundamentals",
+    "migrations": "import migrations",
+}
+HEAVY_MODULES = ("pandas", "numpy", "yfinance", "curl_cffi", "dotenv")
+
+
+def parse_importtime(stderr):
+    """[(module, depth, self_us, cumulative_us)] from -X importtime output."""
+    rows = []
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:"):].split("|")
+        depth = (len(name) - len(name.lstrip())) // 2
+        rows.append((name.strip(), depth, int(self_us), int(cumulative_us)))
+    return rows
+
+
+def run_case(code, env):
+    start = time.perf_counter()
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", code], cwd=ROOT, env=env, capture_output=True, text=True
+    )
+    wall = time.perf_counter() - start
+    if proc.returncode != 0:
+        raise RuntimeError(f"{code!r} failed:\n{proc.stderr[-2000:]}")
+    rows = parse_importtime(proc.stderr)
+    # Top-level entries cover everything imported, each module counted once.
+    total = sum(cumulative for _, depth, _, cumulative in rows if depth == 0) / 1e6
+    return wall, total, rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--repeat", type=int, default=10, help="Fresh interpreters per case")
+    parser.add_argument("--top", type=int, default=10, help="Slowest modules to print per case (by self time)")
+    parser.add_argument("--case", action="append", choices=sorted(CASES), help="Only these cases (repeatable)")
+    parser.add_argument("--output", help="Write the JSON results here instead of stdout")
+    args = parser.parse_args()
+
+    env = dict(os.environ, PYTHONPATH=os.pathsep.join(filter(None, [ROOT, os.getenv("PYTHONPATH")])))
+    # Some revisions read DATABASE_URL at import; nothing connects to it.
+    env.setdefault("DATABASE_URL", f"sqlite:///{os.path.join(tempfile.mkdtemp(), 'importtime.db')}")
+
+    results = {}
+    for name in args.case or CASES:
+        walls, totals = [], []
+        for _ in range(args.repeat):
+            wall, total, rows = run_case(CASES[name], env)
+            walls.append(wall)
+            totals.append(total)
+        loaded = sorted({module.split(".")[0] for module, *_ in rows} & set(HEAVY_MODULES))
+        results[f"import:{name}"] = {**timings(totals), "heavy_modules": loaded}
+        results[f"startup:{name}"] = timings(walls)
+
+        print(f"{name}: import {results[f'import:{name}']['median_ms']:.1f} ms, "
+              f"process {results[f'startup:{name}']['median_ms']:.1f} ms, heavy: {', '.join(loaded) or '-'}",
+              file=sys.stderr)
+        for module, _, self_us, cumulative_us in sorted(rows, key=lambda r: -r[2])[:args.top]:
+            print(f"    {self_us / 1000:8.1f} ms self {cumulative_us / 1000:8.1f} ms cumulative  {module}",
+                  file=sys.stderr)
+
+    commit, dirty = git_revision()
+    report = {
+        "meta": {
+            "commit": commit,
+            "dirty": dirty,
+            "timestamp": datetime.now().isoformat(timespec="seconds"),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "repeat": args.repeat,
+        },
+        "results": results,
+    }
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+        print(f"Results written to {args.output}", file=sys.stderr)
+    else:
+        json.dump(report, sys.stdout, indent=2)
+        print()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,194 @@
+"""Time the API endpoints and the ingestion path against a synthetic SQLite database.
+
+The app is driven in-process with FastAPI's TestClient and the response cache
+disabled, so each request reaches the database. DB_MODE and SCREENER_ENGINE
+are read from the environment as in production and recorded in the output.
+Progress goes to stderr, so stdout holds only the JSON report:
+
+    python -m benchmarks.run --tickers 500 --years 5 > results.json
+"""
+import argparse
+import contextlib
+import io
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import date, datetime
+
+FUNDAMENTALS_CASES = {
+    "default": "",
+    "filter_pe_sort_pe": "min_pe=10&max_pe=30&sort_by=pe_ttm&sort_order=asc",
+    "filter_growth_margin": "min_revenue_growth=0.1&min_profit_margin=0.1&sort_by=profit_margin",
+    "filter_market_cap_fcf": "min_market_cap=100000000000&fcf_positive=true&sort_by=market_cap&sort_order=asc",
+    "filter_indicators": "min_return_1y=0&max_rsi=70&sort_by=return_1m",
+    "ticker_search": "ticker_search=T01",
+    "deep_page": "page=5&limit=100",
+    "cursor": "pagination=cursor&limit=50",
+    "as_of": "as_of={today}",
+}
+PRICE_PERIODS = ["5D", "1M", "6M", "1Y", "5Y"]
+
+
+def timings(samples):
+    ordered = sorted(samples)
+    ms = lambda s: round(s * 1000, 3)
+    return {
+        "iterations": len(ordered),
+        "min_ms": ms(ordered[0]),
+        "median_ms": ms(statistics.median(ordered)),
+        "mean_ms": ms(statistics.fmean(ordered)),
+        "p95_ms": ms(ordered[min(len(ordered) - 1, int(0.95 * len(ordered)))]),
+        "max_ms": ms(ordered[-1]),
+    }
+
+
+def time_requests(client, urls, repeat, warmup):
+    """Request `urls` in turn for `warmup` + `repeat` rounds; only the last `repeat` are timed."""
+    samples = []
+    for i in range(warmup + repeat):
+        url = urls[i % len(urls)]
+        start = time.perf_counter()
+        response = client.get(url)
+        elapsed = time.perf_counter() - start
+        if response.status_code != 200:
+            raise RuntimeError(f"{url} returned {response.status_code}: {response.text[:200]}")
+        if i >= warmup:
+            samples.append(elapsed)
+    return timings(samples)
+
+
+def bench_api(symbols, repeat, warmup):
+    from fastapi.testclient import TestClient
+
+    from response_cache import response_cache
+    from stockendpoint import app
+
+    # Measure database round trips rather than cache hits.
+    response_cache.maxsize = 0
+    picks = [symbols[(i * 7919) % len(symbols)] for i in range(repeat + warmup)]
+
+    results = {}
+    with TestClient(app) as client:
+        for name, query in FUNDAMENTALS_CASES.items():
+            url = "/api/fundamentals?" + query.format(today=date.today().isoformat())
+            results[f"fundamentals.{name}"] = time_requests(client, [url], repeat, warmup)
+            print(f"  fundamentals.{name}: {results[f'fundamentals.{name}']['median_ms']:.2f}ms", file=sys.stderr)
+
+        for period in PRICE_PERIODS:
+            urls = [f"/api/stock/{s}/price-history?period={period}" for s in picks]
+            results[f"price_history.{period}"] = time_requests(client, urls, repeat, warmup)
+            median = results[f"price_history.{period}"]["median_ms"]
+            print(f"  price_history.{period}: {median:.2f}ms", file=sys.stderr)
+
+        results["stock_detail"] = time_requests(client, [f"/api/stock/{s}" for s in picks], repeat, warmup)
+        print(f"  stock_detail: {results['stock_detail']['median_ms']:.2f}ms", file=sys.stderr)
+    return results
+
+
+def bench_ingest(tickers, years):
+    """Time update_fundamentals over `tickers` new stub tickers, then an incremental rerun of them."""
+    import update_fundamentals as updater
+    from benchmarks.dataset import symbols
+    from fetch_engine import StubScraper
+
+    StubScraper.latency = 0
+    StubScraper.days = years * 252
+    updater.tickers = symbols(tickers, prefix="I")
+
+    results = {}
+    for name, incremental in (("full", False), ("incremental", True)):
+        start = time.perf_counter()
+        with contextlib.redirect_stdout(io.StringIO()):
+            updater.update_fundamentals(incremental=incremental, source=StubScraper)
+        elapsed = time.perf_counter() - start
+        results[f"ingest.{name}"] = {
+            "tickers": tickers,
+            "seconds": round(elapsed, 3),
+            "tickers_per_sec": round(tickers / elapsed, 1),
+        }
+        print(f"  ingest.{name}: {elapsed:.2f}s ({tickers / elapsed:.1f} tickers/s)", file=sys.stderr)
+    return results
+
+
+def git_revision():
+    try:
+        commit = subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                                check=True).stdout.strip()
+        dirty = bool(subprocess.run(["git", "status", "--porcelain", "--untracked-files=no"], capture_output=True,
+                                    text=True, check=True).stdout.strip())
+    except (OSError, subprocess.CalledProcessError):
+        return None, None
+    return commit, dirty
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--tickers", type=int, default=500)
+    parser.add_argument("--years", type=int, default=5)
+    parser.add_argument("--repeat", type=int, default=50, help="Timed requests per case")
+    parser.add_argument("--warmup", type=int, default=5, help="Untimed requests per case")
+    parser.add_argument("--ingest-tickers", type=int, default=50, help="Tickers refreshed by the ingestion benchmark")
+    parser.add_argument("--skip-ingest", action="store_true")
+    parser.add_argument("--output", help="Write the JSON results here instead of stdout")
+    args = parser.parse_args()
+
+    db_path = os.path.join(tempfile.mkdtemp(), "benchmark.db")
+    # Set before the first database access, which is when models reads its settings.
+    os.environ["DATABASE_URL"] = f"sqlite:///{db_path}"
+    os.environ["SQL_ECHO"] = "false"
+
+    import models
+    from benchmarks.dataset import build_dataset
+    from migrations import upgrade
+
+    upgrade(models.engine)
+    db = models.SessionLocal()
+    try:
+        print(f"Seeding {args.tickers} tickers x {args.years} years into {db_path}...", file=sys.stderr)
+        symbols, seed = build_dataset(db, args.tickers, args.years)
+    finally:
+        db.close()
+    print(f"  seeded {seed['bars']} bars in {seed['seconds']:.2f}s", file=sys.stderr)
+
+    print("API:", file=sys.stderr)
+    results = bench_api(symbols, args.repeat, args.warmup)
+    if not args.skip_ingest:
+        print("Ingestion:", file=sys.stderr)
+        results.update(bench_ingest(args.ingest_tickers, args.years))
+
+    commit, dirty = git_revision()
+    report = {
+        "meta": {
+            "commit": commit,
+            "dirty": dirty,
+            "timestamp": datetime.now().isoformat(timespec="seconds"),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "db_mode": os.getenv("DB_MODE", "sync").lower(),
+            "screener_engine": os.getenv("SCREENER_ENGINE", "sql").lower(),
+            "tickers": args.tickers,
+            "years": args.years,
+            "bars": seed["bars"],
+            "seed_seconds": round(seed["seconds"], 3),
+            "repeat": args.repeat,
+            "warmup": args.warmup,
+        },
+        "results": results,
+    }
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+        print(f"Results written to {args.output}", file=sys.stderr)
+    else:
+        json.dump(report, sys.stdout, indent=2)
+        print()
+
+
+if __name__ == "__main__":
+    main()
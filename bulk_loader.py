@@ -0,0 +1,210 @@
+import csv
+import io
+import time
+
+from sqlalchemy import bindparam, insert, update
+
+from models import PriceHistory, Stock
+
+PRICE_COLUMNS = ["ticker", "date", "open_price", "high_price", "low_price", "close_price", "volume"]
+
+
+def price_rows(ticker_symbol, price_history_data):
+    return [
+        {
+            "ticker": ticker_symbol,
+            "date": p["date"],
+            "open_price": p["open_price"],
+            "high_price": p["high_price"],
+            "low_price": p["low_price"],
+            "close_price": p["close_price"],
+            "volume": p["volume"],
+        }
+        for p in price_history_data
+    ]
+
+
+def _copy_rows(db, rows):
+    # COPY FROM STDIN runs on the session's own DBAPI connection, so it stays in the same transaction.
+    buf = io.StringIO()
+    writer = csv.writer(buf)
+    for r in rows:
+        writer.writerow(["" if r[c] is None else r[c] for c in PRICE_COLUMNS])
+    buf.seek(0)
+
+    raw = db.connection().connection
+    with raw.cursor() as cursor:
+        cursor.copy_expert(
+            f"COPY {PriceHistory.__tablename__} ({', '.join(PRICE_COLUMNS)}) FROM STDIN WITH (FORMAT csv)",
+            buf,
+        )
+
+
+def _executemany_rows(db, rows, batch_size):
+    stmt = insert(PriceHistory.__table__)
+    for i in range(0, len(rows), batch_size):
+        db.execute(stmt, rows[i:i + batch_size])
+
+
+def load_price_history(db, rows, batch_size=5000, method=None):
+    """Insert price rows (dicts keyed by PRICE_COLUMNS) without building ORM objects.
+
+    `method` is "copy" (Postgres + psycopg2 only) or "executemany"; by default
+    COPY is used when available. Returns a stats dict including rows/sec.
+    Does not commit.
+    """
+    if method is None:
+        dialect = db.get_bind().dialect
+        method = "copy" if dialect.name == "postgresql" and dialect.driver == "psycopg2" else "executemany"
+
+    start = time.perf_counter()
+    if rows:
+        if method == "copy":
+            _copy_rows(db, rows)
+        else:
+            _executemany_rows(db, rows, batch_size)
+    elapsed = time.perf_counter() - start
+
+    return {
+        "method": method,
+        "rows": len(rows),
+        "seconds": elapsed,
+        "rows_per_sec": len(rows) / elapsed if elapsed > 0 else float("inf"),
+    }
+
+
+def upsert_price_history(db, rows, batch_size=5000):
+    """Insert or update price rows on the unique (ticker, date) key. Does not commit."""
+    dialect = db.get_bind().dialect.name
+    start = time.perf_counter()
+
+    if rows and dialect in ("postgresql", "sqlite"):
+        if dialect == "postgresql":
+            from sqlalchemy.dialects.postgresql import insert as dialect_insert
+        else:
+            from sqlalchemy.dialects.sqlite import insert as dialect_insert
+
+        stmt = dialect_insert(PriceHistory.__table__)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=["ticker", "date"],
+            set_={c: stmt.excluded[c] for c in PRICE_COLUMNS if c not in ("ticker", "date")},
+        )
+        for i in range(0, len(rows), batch_size):
+            db.execute(stmt, rows[i:i + batch_size])
+    elif rows:
+        for r in rows:
+            db.query(PriceHistory).filter(
+                PriceHistory.ticker == r["ticker"], PriceHistory.date == r["date"]
+            ).delete()
+        _executemany_rows(db, rows, batch_size)
+    elapsed = time.perf_counter() - start
+
+    return {
+        "method": "upsert",
+        "rows": len(rows),
+        "seconds": elapsed,
+        "rows_per_sec": len(rows) / elapsed if elapsed > 0 else float("inf"),
+    }
+
+
+def chunks(items, size):
+    """Consecutive slices of `items` of at most `size`, e.g. to keep IN lists and bind parameters bounded."""
+    for i in range(0, len(items), size):
+        yield items[i:i + size]
+
+
+def upsert_stocks(db, rows, chunk_size=500):
+    """Insert missing Stock rows ({ticker, company_name}); existing tickers are left as they are.
+
+    Existing tickers are found with one IN query per chunk, so the cost is a
+    few statements regardless of how many rows are passed. Returns the number inserted.
+    """
+    tickers = [r["ticker"] for r in rows]
+    existing = set()
+    for chunk in chunks(tickers, chunk_size):
+        existing.update(t for (t,) in db.query(Stock.ticker).filter(Stock.ticker.in_(chunk)))
+
+    new_rows = list({r["ticker"]: r for r in rows if r["ticker"] not in existing}.values())
+    if not new_rows:
+        return 0
+
+    dialect = db.get_bind().dialect.name
+    if dialect in ("postgresql", "sqlite"):
+        if dialect == "postgresql":
+            from sqlalchemy.dialects.postgresql import insert as dialect_insert
+        else:
+            from sqlalchemy.dialects.sqlite import insert as dialect_insert
+        # ON CONFLICT guards against a ticker being inserted concurrently since the diff query.
+        stmt = dialect_insert(Stock.__table__).on_conflict_do_nothing(index_elements=["ticker"])
+    else:
+        stmt = insert(Stock.__table__)
+    for chunk in chunks(new_rows, chunk_size):
+        db.execute(stmt, chunk)
+    return len(new_rows)
+
+
+def update_stock_groups(db, rows, chunk_size=500):
+    """Set sector and industry from rows ({ticker, sector, industry}) that have them. Does not commit.
+
+    upsert_stocks leaves existing tickers alone, so this brings their peer groups up to date.
+    Returns the number of rows applied.
+    """
+    rows = [
+        {"key": r["ticker"], "sector": r.get("sector"), "industry": r.get("industry")}
+        for r in rows if r.get("sector") or r.get("industry")
+    ]
+    stmt = update(Stock.__table__).where(Stock.__table__.c.ticker == bindparam("key"))
+    for chunk in chunks(rows, chunk_size):
+        db.execute(stmt, chunk)
+    return len(rows)
+
+
+def replace_price_history(db, ticker_symbol, price_history_data, batch_size=5000, method=None):
+    db.query(PriceHistory).filter(PriceHistory.ticker == ticker_symbol).delete()
+    return load_price_history(db, price_rows(ticker_symbol, price_history_data), batch_size, method)
+
+
+if __name__ == "__main__":
+    import argparse
+
+    from sqlalchemy import create_engine
+    from sqlalchemy.orm import sessionmaker
+
+    from fetch_engine import StubScraper
+    from models import Base, Stock
+
+    parser = argparse.ArgumentParser(description="Compare per-row ORM adds with the bulk price-history loader.")
+    parser.add_argument("--tickers", type=int, default=20)
+    parser.add_argument("--url", default="sqlite://", help="Database URL to benchmark against (default: in-memory SQLite)")
+    args = parser.parse_args()
+
+    bench_engine = create_engine(args.url)
+    Base.metadata.create_all(bind=bench_engine)
+    Session = sessionmaker(bind=bench_engine)
+
+    StubScraper.latency = 0
+    symbols = [f"T{i:04d}" for i in range(args.tickers)]
+    histories = {s: StubScraper(s).getPriceHistory() for s in symbols}
+
+    db = Session()
+    db.add_all(Stock(ticker=s, company_name=s) for s in symbols)
+    db.commit()
+
+    start = time.perf_counter()
+    total = 0
+    for s, history in histories.items():
+        db.query(PriceHistory).filter(PriceHistory.ticker == s).delete()
+        for p in history:
+            db.add(PriceHistory(ticker=s, **p))
+        total += len(history)
+    db.commit()
+    orm_elapsed = time.perf_counter() - start
+    print(f"ORM adds:    {total} rows in {orm_elapsed:.2f}s ({total / orm_elapsed:,.0f} rows/sec)")
+
+    start = time.perf_counter()
+    for s, history in histories.items():
+        stats = replace_price_history(db, s, history)
+    db.commit()
+    bulk_elapsed = time.perf_counter() - start
+    print(f"Bulk ({stats['method']}): {total} rows in {bulk_elapsed:.2f}s ({total / bulk_elapsed:,.0f} rows/sec)")
+    db.close()
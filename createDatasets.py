@@ -1,21 +1,37 @@
 tickers = ['UNH', 'PLD', 'CC', 'AEP', 'GOOGL', 'MLM', 'PINS', 'ORA', 'SPG', 'C', 'OTIS', 'APD', 'MU', 'KDP', 'EMR', 'DUK', 'IFF', 'XOM', 'CVX', 'HSY', 'AXP', 'NEXT', 'GS', 'RBLX', 'TXN', 'NTRS', 'GE', 'ADBE', 'CLX', 'MET', 'WY', 'BUD', 'KMB', 'EOG', 'ICE', 'COF', 'REGN', 'PEP', 'VLO', 'NOC', 'CAT', 'PEG', 'MDB', 'SCHW', 'PGR', 'PSA', 'DD', 'BA', 'ABBV', 'CVS', 'ZM', 'UNP', 'CDNS', 'CCI', 'FOXA', 'ALL', 'DE', 'AMR', 'LRCX', 'EXC', 'SRE', 'STT', 'ENPH', 'HD', 'BE', 'BAC', 'EQR', 'ROKU', 'CHTR', 'SEDG', 'AMAT', 'CRWD', 'INFY', 'HUM', 'IRM', 'KIM', 'MDLZ', 'CRSR', 'CSX', 'FDX', 'FANG', 'VTR', 'BLK', 'FOX', 'AFRM', 'TGT', 'SO', 'DOCS', 'RTX', 'BABA', 'MMC', 'DDOG', 'DEO', 'ORCL', 'PNC', 'PG', 'JNJ', 'COP', 'TRV', 'TD', 'FCX', 'BALL', 'WBD', 'OKTA', 'PARR', 'NVDA', 'COST', 'VZ', 'ASML', 'PH', 'PYPL', 'IBM', 'PLUG', 'CRM', 'LOW', 'COIN', 'EMN', 'MOS', 'TFC', 'NUE', 'IP', 'ZS', 'UL', 'NOW', 'AON', 'SNAP', 'KO', 'DOCU', 'WMT', 'UPS', 'LIN', 'ECL', 'LMT', 'WMB', 'PKG', 'NET', 'VRTX', 'PRU', 'BTU', 'TSM', 'HOOD', 'NVO', 'LUMN', 'FYBR', 'O', 'METC', 'MRVL', 'VMC', 'ADI', 'MCD', 'ABNB', 'SLB', 'DASH', 'BKNG', 'AMT', 'EQIX', 'MDT', 'KLAC', 'ITW', 'KMI', 'ETN', 'RUN', 'ILMN', 'RHI', 'SNPS', 'NOK', 'GILD', 'UBER', 'HST', 'SHOP', 'DVN', 'TMO', 'TMUS', 'AVGO', 'INTC', 'FAST', 'OXY', 'MSFT', 'BMY', 'D', 'SMR', 'NXPI', 'ALB', 'ZBH', 'FRT', 'MRK', 'DG', 'ERIC', 'AMD', 'TJX', 'TSLA', 'CME', 'CL', 'CF', 'VST', 'ESS', 'REG', 'WFC', 'TEAM', 'MPC', 'ISRG', 'HON', 'LLY', 'BK', 'SBUX', 'BIIB', 'CMCSA', 'COMM', 'QCOM', 'DHR', 'AMGN', 'BSX', 'SIRI', 'ULTA', 'INTU', 'DIS', 'DAL', 'GD', 'PANW', 'JCI', 'AMZN', 'TM', 'NEE', 'CI', 'EL', 'NSC', 'DOW', 'SOC', 'SAP', 'APA', 'UDR', 'PFE', 'EXR', 'PSX', 'OKE', 'CE', 'LYB', 'NKE', 'META', 'MS', 'MEOH', 'T', 'CMI', 'BXP', 'SHW', 'PPG', 'JD', 'CCJ', 'SONY', 'YUM', 'MAA', 'CPT', 'EW', 'LYFT', 'AAPL', 'HCC', 'MMM', 'NFLX', 'AVB', 'DLTR', 'JPM', 'USB']
 
 import pandas as pd
-from FundamentalScript import FundamentalScraper
+from FundamentalScript import FetchError, FundamentalScraper, make_session
+from scrape_cache import ScrapeCache
+from snapshots import fundamentals_frame, write_snapshot
 
-allData = []
 
-totalTicker = len(tickers)
+def main():
+    allData = []
+    session = make_session()
+    cache = ScrapeCache()
 
-currentTickerIndex = 0 
- 
-for i in tickers: 
-    scraper = FundamentalScraper(i)
-    data = scraper.getFundamentals()
-    allData.append(data)
-    currentTickerIndex += 1 
-    print(f'Current progress:{round((currentTickerIndex/totalTicker), 4) * 100}%')
-    
+    totalTicker = len(tickers)
 
-df = pd.DataFrame(allData)
-df.to_csv('Fundamentals.csv')
\ No newline at end of file
+    currentTickerIndex = 0
+
+    for i in tickers:
+        scraper = FundamentalScraper(i, session=session, cache=cache)
+        currentTickerIndex += 1
+        try:
+            data = scraper.getFundamentals()
+        except FetchError as e:
+            print(f"Skipping {i}: {e}")
+            continue
+        allData.append(data)
+        print(f'Current progress:{round((currentTickerIndex/totalTicker), 4) * 100}%')
+
+
+    df = pd.DataFrame(allData)
+    df.to_csv('Fundamentals.csv')
+    print(cache.report())
+    print(f"Snapshot written to {write_snapshot(fundamentals_frame(allData))}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,57 @@
+import numpy as np
+import pandas as pd
+
+RESOLUTIONS = {"W": "W", "WEEKLY": "W", "M": "M", "MONTHLY": "M"}
+
+
+def resample_ohlcv(frame, resolution):
+    """Aggregate daily bars into weekly or monthly candles.
+
+    `frame` has columns date, open, high, low, close, volume sorted by date.
+    Each candle is dated at its first trading day.
+    """
+    freq = RESOLUTIONS.get(resolution.upper())
+    if freq is None or frame.empty:
+        return frame
+    buckets = pd.DatetimeIndex(frame["date"]).to_period(freq)
+    return (
+        frame.groupby(buckets, sort=True)
+        .agg(date=("date", "first"), open=("open", "first"), high=("high", "max"),
+             low=("low", "min"), close=("close", "last"), volume=("volume", "sum"))
+        .reset_index(drop=True)
+    )
+
+
+def lttb_indices(y, threshold):
+    """Largest-Triangle-Three-Buckets: indices of `threshold` points that preserve the shape of `y`."""
+    n = len(y)
+    if threshold >= n or threshold < 3:
+        return np.arange(n)
+
+    y = np.asarray(y, dtype=float)
+    x = np.arange(n, dtype=float)
+    # Bucket boundaries for the n-2 interior points; first and last points are always kept.
+    edges = np.linspace(1, n - 1, threshold - 1).astype(int)
+    selected = np.empty(threshold, dtype=int)
+    selected[0], selected[-1] = 0, n - 1
+
+    a = 0
+    for i in range(threshold - 2):
+        start, end = edges[i], edges[i + 1]
+        next_start, next_end = edges[i + 1], edges[i + 2] if i + 2 < len(edges) else n
+        avg_x = x[next_start:next_end].mean()
+        avg_y = np.nanmean(y[next_start:next_end]) if next_end > next_start else y[-1]
+        areas = np.abs(
+            (x[a] - avg_x) * (y[start:end] - y[a]) - (x[a] - x[start:end]) * (avg_y - y[a])
+        )
+        a = start + int(np.nanargmax(areas)) if not np.all(np.isnan(areas)) else start
+        selected[i + 1] = a
+    return selected
+
+
+def downsample(frame, resolution=None, max_points=None):
+    if resolution:
+        frame = resample_ohlcv(frame, resolution)
+    if max_points and len(frame) > max_points:
+        frame = frame.iloc[lttb_indices(frame["close"].to_numpy(dtype=float, na_value=np.nan), max_points)]
+    return frame
@@ -0,0 +1,176 @@
+"""Streaming CSV / NDJSON exports of screener results and price history.
+
+Rows are pulled from the database in EXPORT_BATCH_SIZE partitions (yield_per,
+which is a server-side cursor on Postgres), then encoded and gzip-compressed
+one batch at a time. Memory stays flat whether an export is ten rows or
+millions of bars.
+"""
+import csv
+import io
+import math
+import os
+import zlib
+from datetime import date
+from typing import Optional
+
+from fastapi import HTTPException, Query
+from fastapi.responses import StreamingResponse
+from sqlalchemy import select
+
+from models import PriceHistory, SessionLocal
+from queries import PERIODS, apply_screener_filters, period_start, screener_order, screener_statement
+from serialization import dumps
+
+EXPORT_BATCH_SIZE = int(os.getenv("EXPORT_BATCH_SIZE", "2000"))
+
+MEDIA_TYPES = {"csv": "text/csv; charset=utf-8", "ndjson": "application/x-ndjson"}
+
+
+class Encoder:
+    """Encodes row batches as CSV or NDJSON bytes, gzip-compressed when `compress` is set."""
+
+    def __init__(self, fmt, compress=False):
+        self.fmt = fmt
+        self.columns = None
+        # wbits=31 writes a gzip header and trailer around the deflate stream.
+        self.compressor = zlib.compressobj(6, zlib.DEFLATED, 31) if compress else None
+
+    def _out(self, data):
+        return self.compressor.compress(data) if self.compressor else data
+
+    def header(self, columns):
+        # str() because result keys of Table-built columns are quoted_name, which orjson rejects.
+        self.columns = [str(c) for c in columns]
+        if self.fmt != "csv":
+            return b""
+        return self._out((",".join(self.columns) + "\n").encode("utf-8"))
+
+    def batch(self, rows):
+        if self.fmt == "csv":
+            buf = io.StringIO()
+            writer = csv.writer(buf, lineterminator="\n")
+            writer.writerows(
+                ["" if v is None or (isinstance(v, float) and not math.isfinite(v)) else v for v in row]
+                for row in rows
+            )
+            data = buf.getvalue().encode("utf-8")
+        else:
+            data = b"".join(dumps(dict(zip(self.columns, row))) + b"\n" for row in rows)
+        return self._out(data)
+
+    def finish(self):
+        return self.compressor.flush() if self.compressor else b""
+
+
+def export_format(format: str = Query("csv", pattern="^(csv|ndjson)$")):
+    return format
+
+
+def export_tickers(tickers: Optional[str] = Query(None, description="Comma-separated symbols (default: all)")):
+    if not tickers:
+        return None
+    return list(dict.fromkeys(t.strip().upper() for t in tickers.split(",") if t.strip())) or None
+
+
+def export_period(
+    period: Optional[str] = Query(None, description=f"One of {', '.join(PERIODS)}; default: full history")
+):
+    if period is None:
+        return None
+    if period.upper() not in PERIODS:
+        raise HTTPException(status_code=400, detail=f"period must be one of: {', '.join(PERIODS)}")
+    return period.upper()
+
+
+def screener_export_statement(params, source):
+    """Every row matching the screener filters, in the screener's sort order (page and limit are ignored)."""
+    stmt = apply_screener_filters(
+        screener_statement(select, source),
+        params["ranges"],
+        params["fcf_positive"],
+        params["analyst_rating"],
+        params["ticker_search"],
+        source,
+        params["sector"],
+        params["industry"],
+    )
+    # Ticker breaks ties so the export order is stable.
+    return stmt.order_by(screener_order(params["sort_by"], params["sort_order"], source), source.ticker)
+
+
+def price_export_statement(tickers=None, period=None):
+    """Bars of `tickers` (all when None) within `period` (full history when None), by ticker and date."""
+    stmt = select(
+        PriceHistory.ticker,
+        PriceHistory.date,
+        PriceHistory.open_price.label("open"),
+        PriceHistory.high_price.label("high"),
+        PriceHistory.low_price.label("low"),
+        PriceHistory.close_price.label("close"),
+        PriceHistory.volume,
+    )
+    if tickers:
+        stmt = stmt.where(PriceHistory.ticker.in_(tickers))
+    if period:
+        stmt = stmt.where(PriceHistory.date >= period_start(period))
+    return stmt.order_by(PriceHistory.ticker, PriceHistory.date)
+
+
+def stream_rows(stmt, encoder):
+    """Encoded chunks of a statement's rows, read in batches on a session owned by the stream."""
+    # Not the request's get_db session: the stream outlives the endpoint call.
+    db = SessionLocal()
+    try:
+        result = db.execute(stmt.execution_options(yield_per=EXPORT_BATCH_SIZE))
+        yield encoder.header(result.keys())
+        for rows in result.partitions():
+            yield encoder.batch(rows)
+        yield encoder.finish()
+    finally:
+        db.close()
+
+
+async def stream_rows_async(stmt, encoder):
+    from async_db import async_session
+
+    async with async_session() as db:
+        result = await db.stream(stmt.execution_options(yield_per=EXPORT_BATCH_SIZE))
+        yield encoder.header(result.keys())
+        async for rows in result.partitions():
+            yield encoder.batch(rows)
+        yield encoder.finish()
+
+
+def accepts_gzip(accept_encoding):
+    """Whether an Accept-Encoding header gives gzip (or, failing that, `*`) a q-value above 0."""
+    qvalues = {}
+    for token in accept_encoding.split(","):
+        coding, _, params = token.partition(";")
+        coding = coding.strip().lower()
+        if not coding:
+            continue
+        q = 1.0
+        for param in params.split(";"):
+            key, _, value = param.partition("=")
+            if key.strip().lower() == "q":
+                try:
+                    q = float(value)
+                except ValueError:
+                    q = 0.0
+        qvalues[coding] = q
+    q = qvalues.get("gzip", qvalues.get("x-gzip", qvalues.get("*", 0.0)))
+    return q > 0
+
+
+def export_response(request, stmt, fmt, name, use_async=False):
+    """StreamingResponse of `stmt` as `fmt`, gzip-encoded when the client accepts it."""
+    compress = accepts_gzip(request.headers.get("accept-encoding", ""))
+    encoder = Encoder(fmt, compress)
+    headers = {
+        "Content-Disposition": f'attachment; filename="{name}-{date.today().isoformat()}.{fmt}"',
+        "Vary": "Accept-Encoding",
+    }
+    if compress:
+        headers["Content-Encoding"] = "gzip"
+    body = stream_rows_async(stmt, encoder) if use_async else stream_rows(stmt, encoder)
+    return StreamingResponse(body, media_type=MEDIA_TYPES[fmt], headers=headers)
@@ -0,0 +1,212 @@
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from datetime import date, timedelta
+
+from FundamentalScript import FundamentalScraper
+from price_sync import fetch_price_history
+
+
+class DeadlineExceeded(Exception):
+    """Raised instead of starting a fetch once the run's time budget is spent."""
+
+
+class TokenBucket:
+    """Thread-safe token bucket: `rate` tokens per second, bursts up to `capacity`."""
+
+    def __init__(self, rate, capacity=None):
+        self.rate = float(rate)
+        self.capacity = float(capacity if capacity is not None else max(1.0, rate))
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+
+    def acquire(self, tokens=1.0):
+        while True:
+            with self.lock:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= tokens:
+                    self.tokens -= tokens
+                    return
+                wait = (tokens - self.tokens) / self.rate
+            time.sleep(wait)
+
+
+def fetch_ticker(ticker_symbol, source=FundamentalScraper, last_bar=None, limiter=None):
+    """Return (data, price_history, full_resync) for one ticker.
+
+    A ticker takes several upstream requests, so `limiter` is handed to the scraper, which charges it per request.
+    """
+    scraper = source(ticker_symbol) if limiter is None else source(ticker_symbol, limiter=limiter)
+    data = scraper.getFundamentals()
+    if not data:
+        return data, [], True
+    price_history_data, full_resync = fetch_price_history(scraper, last_bar)
+    return data, price_history_data, full_resync
+
+
+def fetch_with_retry(ticker_symbol, source=FundamentalScraper, limiter=None, retries=3, backoff=1.0, last_bar=None,
+                     deadline=None):
+    for attempt in range(retries + 1):
+        if deadline is not None and time.monotonic() >= deadline:
+            raise DeadlineExceeded(ticker_symbol)
+        try:
+            return fetch_ticker(ticker_symbol, source, last_bar, limiter)
+        except Exception:
+            if attempt == retries:
+                raise
+            # Exponential backoff with jitter so retries from many workers don't line up.
+            time.sleep(backoff * (2 ** attempt) * (0.5 + random.random()))
+
+
+def _timed_fetch(*args):
+    start = time.perf_counter()
+    try:
+        return fetch_with_retry(*args), time.perf_counter() - start
+    except Exception as e:
+        e.seconds = time.perf_counter() - start
+        raise
+
+
+def fetch_concurrently(tickers, source=FundamentalScraper, workers=8, rate=20.0, retries=3, backoff=1.0, last_bars=None,
+                       deadline=None):
+    """Fetch tickers on a thread pool, yielding (ticker, data, price_history, full_resync, error, seconds).
+
+    `rate` caps upstream requests per second across all workers, not tickers: each ticker makes several.
+
+    `last_bars` ({ticker: (date, close)}) switches price history to incremental fetching.
+    Past `deadline` (a time.monotonic() value) remaining tickers fail fast with DeadlineExceeded.
+
+    Only the network work runs on the pool; the caller consumes the results on
+    its own thread so database writes stay on a single session.
+    """
+    limiter = TokenBucket(rate) if rate else None
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        futures = {
+            pool.submit(_timed_fetch, t, source, limiter, retries, backoff, (last_bars or {}).get(t), deadline): t
+            for t in tickers
+        }
+        for future in as_completed(futures):
+            ticker_symbol = futures[future]
+            try:
+                (data, price_history_data, full_resync), seconds = future.result()
+                yield ticker_symbol, data, price_history_data, full_resync, None, seconds
+            except Exception as e:
+                yield ticker_symbol, None, [], True, e, getattr(e, "seconds", 0.0)
+
+
+STUB_INDUSTRIES = {
+    "Technology": ["Software - Infrastructure", "Semiconductors", "Consumer Electronics"],
+    "Healthcare": ["Drug Manufacturers - General", "Medical Devices"],
+    "Financial Services": ["Banks - Diversified", "Asset Management", "Insurance - Diversified"],
+    "Energy": ["Oil & Gas Integrated", "Oil & Gas E&P"],
+    "Consumer Cyclical": ["Internet Retail", "Restaurants"],
+    "Industrials": ["Aerospace & Defense", "Railroads"],
+}
+
+
+class StubScraper:
+    """Offline stand-in for FundamentalScraper with deterministic data and simulated latency."""
+
+    latency = 0.05
+    days = 5 * 252
+
+    def __init__(self, ticker, limiter=None):
+        self.ticker = ticker
+        self.rng = random.Random(ticker)
+        self.limiter = limiter
+
+    def request(self):
+        """Simulate one upstream request."""
+        if self.limiter is not None:
+            self.limiter.acquire()
+        time.sleep(self.latency)
+
+    def getFundamentals(self):
+        self.request()
+        rng = self.rng
+        price = round(rng.uniform(10, 500), 2)
+        # Drawn from their own generator so the other fields keep their values.
+        groups = random.Random(f"{self.ticker}:sector")
+        sector = groups.choice(sorted(STUB_INDUSTRIES))
+        return {
+            "ticker": self.ticker,
+            "company_name": f"{self.ticker} Inc.",
+            "sector": sector,
+            "industry": groups.choice(STUB_INDUSTRIES[sector]),
+            "snapshot_date": date.today(),
+            "revenue_growth_YoY": rng.uniform(-0.2, 0.5),
+            "debt_to_equity": rng.uniform(0, 3),
+            "interest_coverage": rng.uniform(-5, 50),
+            "free_cash_flow_positive": rng.random() > 0.2,
+            "roe": rng.uniform(-0.1, 0.6),
+            "profit_margin": rng.uniform(-0.2, 0.4),
+            "current_ratio": rng.uniform(0.5, 3),
+            "market_cap": rng.uniform(1e9, 3e12),
+            "pe_trailing": rng.uniform(5, 80),
+            "beta": rng.uniform(0.2, 2.5),
+            "perf_1y": rng.uniform(-0.5, 1.0),
+            "EPS TTM": rng.uniform(-2, 30),
+            "P/E TTM": rng.uniform(5, 80),
+            "Analyst Rating": "2.0 - Buy",
+            "5y PEG": rng.uniform(0.5, 4),
+            "52 Week Range": f"{price * 0.7:.2f} - {price * 1.2:.2f}",
+            "Day Range": f"{price * 0.98:.2f} - {price * 1.02:.2f}",
+            "Current Price": price,
+        }
+
+    def getPriceHistory(self, start=None):
+        self.request()
+        # Seeded independently of getFundamentals so repeated calls return the same bars.
+        rng = random.Random(f"{self.ticker}:history")
+        close = rng.uniform(10, 500)
+        price_data = []
+        day = date.today() - timedelta(days=self.days * 7 // 5)
+        while len(price_data) < self.days:
+            day += timedelta(days=1)
+            if day.weekday() >= 5:
+                continue
+            open_price = close
+            close = max(1.0, close * (1 + rng.gauss(0.0003, 0.02)))
+            price_data.append({
+                'date': day,
+                'open_price': open_price,
+                'high_price': max(open_price, close) * 1.01,
+                'low_price': min(open_price, close) * 0.99,
+                'close_price': close,
+                'volume': float(rng.randint(100_000, 50_000_000)),
+            })
+        if start is not None:
+            price_data = [p for p in price_data if p['date'] >= start]
+        return price_data
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Benchmark sequential vs concurrent fetching against the stub source.")
+    parser.add_argument("--tickers", type=int, default=50)
+    parser.add_argument("--workers", type=int, default=8)
+    parser.add_argument("--rate", type=float, default=0, help="Requests/sec limit (0 disables the limiter)")
+    parser.add_argument("--latency", type=float, default=StubScraper.latency)
+    args = parser.parse_args()
+
+    StubScraper.latency = args.latency
+    symbols = [f"T{i:04d}" for i in range(args.tickers)]
+
+    start = time.perf_counter()
+    for s in symbols:
+        fetch_ticker(s, StubScraper)
+    sequential = time.perf_counter() - start
+
+    start = time.perf_counter()
+    for _ in fetch_concurrently(symbols, StubScraper, workers=args.workers, rate=args.rate):
+        pass
+    concurrent = time.perf_counter() - start
+
+    print(f"Sequential: {sequential:.2f}s")
+    print(f"Concurrent ({args.workers} workers): {concurrent:.2f}s")
+    print(f"Speedup: {sequential / concurrent:.1f}x")
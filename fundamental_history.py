@@ -0,0 +1,261 @@
+"""Append-only fundamentals history.
+
+Each refresh appends one row per (ticker, snapshot_date) to fundamental_history;
+a rerun on the same day overwrites that day's row. `fundamentals` is a
+materialization of the newest snapshot per ticker and stays what the screener
+and detail endpoints read. compact() moves snapshots older than the hot window
+into fundamental_history_cold, keeping the last one of each month, and
+as_of_source() answers point-in-time queries across both tables.
+"""
+import math
+import os
+from datetime import date, datetime, timedelta
+
+from sqlalchemy import Integer, and_, bindparam, cast, delete, func, insert, null, or_, select, tuple_, union_all, update
+from sqlalchemy.orm import aliased
+
+from bulk_loader import chunks
+from models import FUNDAMENTAL_FIELDS, RATING_LABELS, Fundamental, FundamentalHistory, FundamentalHistoryCold
+
+HOT_DAYS = int(os.getenv("FUNDAMENTAL_HOT_DAYS", "90"))
+
+SNAPSHOT_COLUMNS = [c.name for c in FundamentalHistory.__table__.columns]
+
+_LABELS = {label.lower(): label for label in RATING_LABELS}
+
+
+def parse_range(value):
+    """Split a range string like "234.6 - 630.73" into (low, high) floats, or (None, None)."""
+    try:
+        low, high = str(value).split(" - ", 1)
+        return float(low), float(high)
+    except (ValueError, TypeError):
+        return None, None
+
+
+def parse_rating(value):
+    """Split an analyst rating like "2.0 - Buy" into (score, label), or (None, None).
+
+    The label is one of RATING_LABELS, or None when it is not a known one.
+    """
+    try:
+        score, label = str(value).split(" - ", 1)
+        return float(score), _LABELS.get(label.strip().lower())
+    except (ValueError, TypeError):
+        return None, None
+
+
+# Typed columns derived from the stringly-typed range and rating fields.
+PARSED_COLUMNS = {
+    "week_range_52": ("week_range_52_low", "week_range_52_high", parse_range),
+    "day_range": ("day_low", "day_high", parse_range),
+    "analyst_rating": ("analyst_rating_score", "analyst_rating_label", parse_rating),
+}
+PARSED_FIELDS = [name for first, second, _ in PARSED_COLUMNS.values() for name in (first, second)] + ["pct_from_52w_high"]
+
+
+def parsed_fields(row):
+    """The PARSED_FIELDS values for a row holding the raw strings and current_price."""
+    parsed = {}
+    for raw, (first, second, parser) in PARSED_COLUMNS.items():
+        value = row.get(raw)
+        parsed[first], parsed[second] = parser(value) if isinstance(value, str) else (None, None)
+    price, high = row.get("current_price"), parsed["week_range_52_high"]
+    # Fraction below the 52-week high: -0.25 is 25% under it.
+    missing = price is None or (isinstance(price, float) and math.isnan(price))
+    parsed["pct_from_52w_high"] = price / high - 1 if not missing and high else None
+    return parsed
+
+
+def fundamental_row(ticker_symbol, data):
+    """Map a scraper dict (FUNDAMENTAL_FIELDS keys) to a snapshot row."""
+    row = {column: data.get(field) for field, column in FUNDAMENTAL_FIELDS.items()}
+    row["ticker"] = ticker_symbol
+    # The scraper reports the date as MM/DD/YYYY.
+    if isinstance(row["snapshot_date"], str):
+        row["snapshot_date"] = datetime.strptime(row["snapshot_date"], "%m/%d/%Y").date()
+    return row
+
+
+def _upsert(db, table, keys, rows):
+    dialect = db.get_bind().dialect.name
+    if dialect in ("postgresql", "sqlite"):
+        if dialect == "postgresql":
+            from sqlalchemy.dialects.postgresql import insert as dialect_insert
+        else:
+            from sqlalchemy.dialects.sqlite import insert as dialect_insert
+        stmt = dialect_insert(table)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=keys,
+            set_={c: stmt.excluded[c] for c in rows[0] if c not in keys},
+        )
+        db.execute(stmt, rows)
+    else:
+        key_values = [tuple(r[k] for k in keys) for r in rows]
+        db.execute(delete(table).where(tuple_(*[table.c[k] for k in keys]).in_(key_values)))
+        db.execute(insert(table), rows)
+
+
+def append_snapshots(db, rows, chunk_size=500):
+    """Add snapshot rows (dicts keyed by Fundamental columns) to the history and refresh the latest table.
+
+    The PARSED_FIELDS columns are always derived here from the raw strings.
+    Nothing is deleted: an existing (ticker, snapshot_date) row is updated in
+    place. Does not commit. Returns the number of rows written.
+    """
+    rows = [{**{c: r.get(c) for c in SNAPSHOT_COLUMNS}, **parsed_fields(r)} for r in rows]
+    for chunk in chunks(rows, chunk_size):
+        _upsert(db, FundamentalHistory.__table__, ["ticker", "snapshot_date"], chunk)
+    refresh_latest(db, list({r["ticker"] for r in rows}), chunk_size)
+    return len(rows)
+
+
+def refresh_latest(db, tickers, chunk_size=500):
+    """Copy the newest history row of each ticker into `fundamentals`, updating rows in place."""
+    history = FundamentalHistory.__table__
+    for chunk in chunks(tickers, chunk_size):
+        newest = (
+            select(history.c.ticker, func.max(history.c.snapshot_date).label("snapshot_date"))
+            .where(history.c.ticker.in_(chunk))
+            .group_by(history.c.ticker)
+            .subquery()
+        )
+        rows = db.execute(
+            select(history).join(newest, and_(
+                history.c.ticker == newest.c.ticker, history.c.snapshot_date == newest.c.snapshot_date
+            ))
+        ).mappings().all()
+        if rows:
+            _upsert(db, Fundamental.__table__, ["ticker"], [dict(r) for r in rows])
+
+
+def backfill(db):
+    """Copy rows already in `fundamentals` into the history (existing snapshots win). Does not commit."""
+    existing = set()
+    for t in (FundamentalHistory.__table__, FundamentalHistoryCold.__table__):
+        existing.update(tuple(r) for r in db.execute(select(t.c.ticker, t.c.snapshot_date)))
+    rows = {}
+    for item in db.query(Fundamental).order_by(Fundamental.id):
+        key = (item.ticker, item.snapshot_date)
+        if item.ticker is not None and item.snapshot_date is not None and key not in existing:
+            rows[key] = {c: getattr(item, c) for c in SNAPSHOT_COLUMNS}
+    for chunk in chunks(list(rows.values()), 500):
+        db.execute(insert(FundamentalHistory.__table__), chunk)
+    return len(rows)
+
+
+def backfill_parsed_fields(db, chunk_size=500):
+    """Fill PARSED_FIELDS on rows stored before they existed, in every fundamentals table. Does not commit."""
+    updated = 0
+    for table in (Fundamental.__table__, FundamentalHistory.__table__, FundamentalHistoryCold.__table__):
+        keys = [c.name for c in table.primary_key.columns]
+        unparsed = or_(*[
+            and_(table.c[raw].isnot(None), table.c[first].is_(None))
+            for raw, (first, _, _) in PARSED_COLUMNS.items()
+        ])
+        rows = db.execute(
+            select(*[table.c[k] for k in keys], *[table.c[raw] for raw in PARSED_COLUMNS], table.c.current_price)
+            .where(unparsed)
+        ).mappings().all()
+        stmt = update(table).where(*[table.c[k] == bindparam("key_" + k) for k in keys])
+        for chunk in chunks(rows, chunk_size):
+            db.execute(stmt, [{**{"key_" + k: r[k] for k in keys}, **parsed_fields(r)} for r in chunk])
+        updated += len(rows)
+    return updated
+
+
+def compact(db, hot_days=HOT_DAYS, today=None, chunk_size=500):
+    """Move snapshots older than `hot_days` into the cold table, keeping the last one per ticker and month.
+
+    A ticker's newest snapshot always stays hot. Does not commit. Returns a stats dict.
+    """
+    import pandas as pd
+
+    hot, cold = FundamentalHistory.__table__, FundamentalHistoryCold.__table__
+    cutoff = (today or date.today()) - timedelta(days=hot_days)
+
+    newest = select(hot.c.ticker, func.max(hot.c.snapshot_date).label("snapshot_date")).group_by(hot.c.ticker).subquery()
+    old = pd.DataFrame(
+        db.execute(
+            select(hot).join(newest, hot.c.ticker == newest.c.ticker)
+            .where(hot.c.snapshot_date < cutoff, hot.c.snapshot_date < newest.c.snapshot_date)
+        ).mappings().all(),
+        columns=SNAPSHOT_COLUMNS,
+    )
+    if old.empty:
+        return {"moved": 0, "kept": 0}
+
+    old = old.sort_values(["ticker", "snapshot_date"])
+    months = pd.to_datetime(old["snapshot_date"]).dt.to_period("M")
+    monthly = old.groupby([old["ticker"], months]).tail(1)
+    keep_rows = monthly.astype(object).where(monthly.notna(), None).to_dict("records")
+
+    # An earlier compaction may have kept an older snapshot of the same month; the new one supersedes it.
+    superseded = delete(cold).where(
+        cold.c.ticker == bindparam("t"),
+        cold.c.snapshot_date >= bindparam("month_start"),
+        cold.c.snapshot_date < bindparam("d"),
+    )
+    for chunk in chunks(keep_rows, chunk_size):
+        _upsert(db, cold, ["ticker", "snapshot_date"], chunk)
+        db.execute(superseded, [
+            {"t": r["ticker"], "month_start": r["snapshot_date"].replace(day=1), "d": r["snapshot_date"]}
+            for r in chunk
+        ])
+
+    pairs = list(zip(old["ticker"], old["snapshot_date"]))
+    for chunk in chunks(pairs, chunk_size):
+        db.execute(delete(hot).where(tuple_(hot.c.ticker, hot.c.snapshot_date).in_(chunk)))
+
+    return {"moved": len(pairs), "kept": len(keep_rows)}
+
+
+def as_of_source(as_of):
+    """An alias of Fundamental over the newest snapshot per ticker dated on or before `as_of`.
+
+    Both history tables are first reduced to (ticker, max snapshot_date) along
+    their (ticker, snapshot_date) primary keys, so the full rows are only read
+    for the one snapshot per ticker that is returned. `id` is NULL.
+    """
+    tables = (FundamentalHistory.__table__, FundamentalHistoryCold.__table__)
+    candidates = union_all(*[
+        select(t.c.ticker, func.max(t.c.snapshot_date).label("snapshot_date"))
+        .where(t.c.snapshot_date <= as_of)
+        .group_by(t.c.ticker)
+        for t in tables
+    ]).subquery()
+    newest = (
+        select(candidates.c.ticker, func.max(candidates.c.snapshot_date).label("snapshot_date"))
+        .group_by(candidates.c.ticker)
+        .subquery()
+    )
+    rows = union_all(*[
+        select(cast(null(), Integer).label("id"), *[t.c[c] for c in SNAPSHOT_COLUMNS])
+        .join(newest, and_(t.c.ticker == newest.c.ticker, t.c.snapshot_date == newest.c.snapshot_date))
+        for t in tables
+    ]).subquery("fundamentals_as_of")
+    return aliased(Fundamental, rows, adapt_on_names=True)
+
+
+if __name__ == "__main__":
+    import argparse
+
+    from models import SessionLocal
+
+    parser = argparse.ArgumentParser(description="Maintain the fundamentals history tables.")
+    parser.add_argument("command", choices=["compact", "backfill"])
+    parser.add_argument("--hot-days", type=int, default=HOT_DAYS)
+    args = parser.parse_args()
+
+    db = SessionLocal()
+    try:
+        if args.command == "compact":
+            stats = compact(db, args.hot_days)
+            db.commit()
+            print(f"Moved {stats['moved']} snapshots older than {args.hot_days} days; kept {stats['kept']} in cold storage.")
+        else:
+            added = backfill(db)
+            db.commit()
+            print(f"Copied {added} snapshots from fundamentals into the history.")
+    finally:
+        db.close()
@@ -0,0 +1,156 @@
+"""Technical indicators derived from price_history, stored one row per ticker in `indicators`.
+
+Every value describes the ticker's last stored bar and depends only on the
+trailing WINDOW_BARS bars, so a refresh reads that tail window for the
+tickers whose prices changed instead of their whole history.
+"""
+import time
+from datetime import timedelta
+
+from sqlalchemy import func, insert
+
+from bulk_loader import chunks
+from models import INDICATOR_COLUMNS, Indicator, PriceHistory
+
+TRADING_DAYS = 252
+RETURN_PERIODS = {
+    "return_1w": 5,
+    "return_1m": 21,
+    "return_3m": 63,
+    "return_6m": 126,
+    "return_1y": TRADING_DAYS,
+}
+SMA_PERIODS = {"sma_50": 50, "sma_200": 200}
+RSI_PERIOD = 14
+# Volatility needs at least this many daily returns to be reported.
+MIN_VOLATILITY_BARS = 20
+
+# A 1Y return needs 253 closes; the extra bars warm up the RSI's exponential average.
+WINDOW_BARS = TRADING_DAYS + 1 + 5 * RSI_PERIOD
+# Calendar days that always cover WINDOW_BARS trading days.
+WINDOW_DAYS = int(WINDOW_BARS * 7 / 5) + 30
+
+
+def compute_indicators(prices):
+    """One row of indicators per ticker from a frame of (ticker, date, close) bars.
+
+    All tickers are computed together with grouped vectorized operations.
+    Returns a frame indexed by ticker with INDICATOR_COLUMNS.
+    """
+    import numpy as np
+
+    prices = prices.dropna(subset=["close"]).sort_values(["ticker", "date"])
+    prices = prices.groupby("ticker", sort=False).tail(WINDOW_BARS).reset_index(drop=True)
+    by_ticker = prices.groupby("ticker", sort=False)
+    close = prices["close"]
+
+    for name, bars in RETURN_PERIODS.items():
+        prices[name] = close / by_ticker["close"].shift(bars) - 1
+
+    delta = by_ticker["close"].diff()
+    wilder = dict(alpha=1 / RSI_PERIOD, adjust=False, min_periods=RSI_PERIOD)
+    avg_gain = delta.clip(lower=0).groupby(prices["ticker"]).ewm(**wilder).mean().droplevel(0).reindex(prices.index)
+    avg_loss = (-delta.clip(upper=0)).groupby(prices["ticker"]).ewm(**wilder).mean().droplevel(0).reindex(prices.index)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        prices["rsi_14"] = np.where(avg_loss == 0, np.where(avg_gain > 0, 100.0, np.nan),
+                                    100 - 100 / (1 + avg_gain / avg_loss))
+
+    prices["log_return"] = np.log(close / by_ticker["close"].shift(1))
+
+    result = prices.groupby("ticker", sort=False).tail(1).set_index("ticker")
+    result = result.rename(columns={"date": "as_of"})
+
+    for name, bars in SMA_PERIODS.items():
+        tail = prices.groupby("ticker", sort=False).tail(bars).groupby("ticker")["close"]
+        result[name] = tail.mean().where(tail.count() >= bars)
+
+    year = prices.groupby("ticker", sort=False).tail(TRADING_DAYS + 1)
+    returns = year.groupby("ticker")["log_return"]
+    result["volatility_1y"] = (returns.std() * np.sqrt(TRADING_DAYS)).where(returns.count() >= MIN_VOLATILITY_BARS)
+    peak = year.groupby("ticker")["close"].cummax()
+    result["max_drawdown_1y"] = (year["close"] / peak - 1).groupby(year["ticker"]).min()
+
+    return result[INDICATOR_COLUMNS]
+
+
+def stale_tickers(db):
+    """Return {ticker: last_bar_date} for tickers with bars newer than their stored indicators."""
+    latest = (
+        db.query(PriceHistory.ticker, func.max(PriceHistory.date).label("max_date"))
+        .group_by(PriceHistory.ticker)
+        .subquery()
+    )
+    rows = (
+        db.query(latest.c.ticker, latest.c.max_date)
+        .outerjoin(Indicator, Indicator.ticker == latest.c.ticker)
+        .filter((Indicator.as_of.is_(None)) | (Indicator.as_of < latest.c.max_date))
+        .all()
+    )
+    return {r.ticker: r.max_date for r in rows}
+
+
+def load_tail_prices(db, last_dates):
+    """Closes in the trailing window of each ticker in `last_dates` ({ticker: last_bar_date})."""
+    import pandas as pd
+
+    cutoff = min(last_dates.values()) - timedelta(days=WINDOW_DAYS)
+    rows = (
+        db.query(PriceHistory.ticker, PriceHistory.date, PriceHistory.close_price)
+        .filter(PriceHistory.ticker.in_(list(last_dates)), PriceHistory.date >= cutoff)
+        .all()
+    )
+    return pd.DataFrame(rows, columns=["ticker", "date", "close"])
+
+
+def update_indicators(db, tickers=None, chunk_size=500):
+    """Recompute indicators for `tickers`, or for every stale ticker when omitted.
+
+    Pass the tickers whose bars were rewritten (e.g. after a split re-adjustment)
+    since their last bar date alone does not show the change. Does not commit.
+    Returns a stats dict.
+    """
+    start = time.perf_counter()
+    if tickers is None:
+        last_dates = stale_tickers(db)
+    else:
+        last_dates = {}
+        for chunk in chunks(list(tickers), chunk_size):
+            last_dates.update(
+                db.query(PriceHistory.ticker, func.max(PriceHistory.date))
+                .filter(PriceHistory.ticker.in_(chunk))
+                .group_by(PriceHistory.ticker)
+                .all()
+            )
+
+    updated = 0
+    for chunk in chunks(sorted(last_dates), chunk_size):
+        frame = compute_indicators(load_tail_prices(db, {t: last_dates[t] for t in chunk}))
+        rows = frame.astype(object).where(frame.notna(), None).reset_index().to_dict("records")
+        db.query(Indicator).filter(Indicator.ticker.in_(chunk)).delete(synchronize_session=False)
+        if rows:
+            db.execute(insert(Indicator.__table__), rows)
+        updated += len(rows)
+
+    return {"tickers": updated, "seconds": time.perf_counter() - start}
+
+
+if __name__ == "__main__":
+    import argparse
+
+    from models import SessionLocal
+    from response_cache import bump_data_version
+
+    parser = argparse.ArgumentParser(description="Refresh the indicators table from price_history.")
+    parser.add_argument("--all", action="store_true", help="Recompute every ticker, not just those with new bars")
+    args = parser.parse_args()
+
+    db = SessionLocal()
+    try:
+        tickers = [t for (t,) in db.query(PriceHistory.ticker).distinct()] if args.all else None
+        stats = update_indicators(db, tickers)
+        db.commit()
+        if stats["tickers"]:
+            bump_data_version(db)
+        print(f"Updated indicators for {stats['tickers']} tickers in {stats['seconds']:.2f}s")
+    finally:
+        db.close()
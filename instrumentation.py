@@ -0,0 +1,180 @@
+"""Request latency and per-request database statistics, exported in Prometheus text format.
+
+InstrumentationMiddleware times every request and adds a Server-Timing header
+with the total time, the time spent in the database and its query count.
+The counts come from SQLAlchemy cursor events, attributed to the request
+being served through a context variable, so a route that lazy-loads
+relationships (an N+1 pattern) shows up as a high `db_queries_per_request`.
+"""
+import bisect
+import threading
+import time
+from contextvars import ContextVar
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+QUERY_COUNT_BUCKETS = (0, 1, 2, 3, 5, 10, 20, 50, 100)
+
+
+class Histogram:
+    """Cumulative-bucket histogram keyed by a tuple of label values."""
+
+    def __init__(self, name, help_text, label_names, buckets):
+        self.name = name
+        self.help_text = help_text
+        self.label_names = label_names
+        self.buckets = buckets
+        self.lock = threading.Lock()
+        self.series = {}
+
+    def observe(self, labels, value):
+        with self.lock:
+            counts = self.series.get(labels)
+            if counts is None:
+                # One slot per bucket plus +Inf, then the running sum.
+                counts = self.series[labels] = [0] * (len(self.buckets) + 1) + [0.0]
+            counts[bisect.bisect_left(self.buckets, value)] += 1
+            counts[-1] += value
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} histogram"]
+        with self.lock:
+            series = {labels: list(counts) for labels, counts in self.series.items()}
+        for labels, counts in sorted(series.items()):
+            base = [f'{n}="{_escape(v)}"' for n, v in zip(self.label_names, labels)]
+            cumulative = 0
+            for bound, count in zip(self.buckets + ("+Inf",), counts):
+                cumulative += count
+                bucket_labels = ",".join(base + [f'le="{bound}"'])
+                lines.append(f"{self.name}_bucket{{{bucket_labels}}} {cumulative}")
+            label_text = "{" + ",".join(base) + "}" if base else ""
+            lines.append(f"{self.name}_sum{label_text} {counts[-1]}")
+            lines.append(f"{self.name}_count{label_text} {cumulative}")
+        return lines
+
+
+class Counter:
+    def __init__(self, name, help_text):
+        self.name = name
+        self.help_text = help_text
+        self.lock = threading.Lock()
+        self.value = 0.0
+
+    def inc(self, amount=1.0):
+        with self.lock:
+            self.value += amount
+
+    def render(self):
+        return [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} counter", f"{self.name} {self.value}"]
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+request_duration = Histogram(
+    "http_request_duration_seconds", "Request latency by route.", ("method", "route", "status"), LATENCY_BUCKETS
+)
+request_db_duration = Histogram(
+    "http_request_db_seconds", "Time spent in database queries per request.", ("method", "route"), LATENCY_BUCKETS
+)
+request_queries = Histogram(
+    "db_queries_per_request", "Database queries issued per request.", ("method", "route"), QUERY_COUNT_BUCKETS
+)
+db_queries = Counter("db_queries_total", "Database queries executed, inside or outside a request.")
+db_seconds = Counter("db_query_seconds_total", "Time spent executing database queries.")
+
+
+class RequestStats:
+    __slots__ = ("queries", "db_seconds")
+
+    def __init__(self):
+        self.queries = 0
+        self.db_seconds = 0.0
+
+
+# The stats object of the request being served; worker threads and greenlets inherit it.
+current_request = ContextVar("current_request", default=None)
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault("query_start_time", []).append(time.perf_counter())
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    elapsed = time.perf_counter() - conn.info["query_start_time"].pop()
+    db_queries.inc()
+    db_seconds.inc(elapsed)
+    stats = current_request.get()
+    if stats is not None:
+        stats.queries += 1
+        stats.db_seconds += elapsed
+
+
+_installed = False
+
+
+def instrument_sqlalchemy():
+    """Time every cursor execution on every Engine, including the sync engine inside an AsyncEngine."""
+    global _installed
+    if not _installed:
+        event.listen(Engine, "before_cursor_execute", _before_cursor_execute)
+        event.listen(Engine, "after_cursor_execute", _after_cursor_execute)
+        _installed = True
+
+
+class InstrumentationMiddleware:
+    """ASGI middleware recording per-route latency and DB statistics and adding Server-Timing."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        stats = RequestStats()
+        token = current_request.set(stats)
+        start = time.perf_counter()
+        status = 500
+
+        async def send_with_timing(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+                elapsed = time.perf_counter() - start
+                timing = (
+                    f'app;dur={elapsed * 1000:.2f}, '
+                    f'db;dur={stats.db_seconds * 1000:.2f};desc="{stats.queries} queries"'
+                )
+                message = dict(message, headers=list(message.get("headers", [])) + [
+                    (b"server-timing", timing.encode("latin-1"))
+                ])
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_timing)
+        finally:
+            current_request.reset(token)
+            # The route template rather than the raw path keeps the label set bounded.
+            route = getattr(scope.get("route"), "path", "<unmatched>")
+            method = scope["method"]
+            request_duration.observe((method, route, str(status)), time.perf_counter() - start)
+            request_db_duration.observe((method, route), stats.db_seconds)
+            request_queries.observe((method, route), stats.queries)
+
+
+def sample(name, kind, help_text, value):
+    """Lines for a single unlabelled gauge or counter owned by another module."""
+    return [f"# HELP {name} {help_text}", f"# TYPE {name} {kind}", f"{name} {value}"]
+
+
+def render_metrics(extra_lines=()):
+    lines = []
+    for metric in (request_duration, request_db_duration, request_queries, db_queries, db_seconds):
+        lines.extend(metric.render())
+    lines.extend(extra_lines)
+    return "\n".join(lines) + "\n"
@@ -0,0 +1,113 @@
+import base64
+import json
+from datetime import date
+
+from sqlalchemy import literal, tuple_
+
+from models import INDICATOR_COLUMNS, PEER_RANK_COLUMNS, Fundamental, Indicator, PeerRank
+from screener_engine import SCREENER_COLUMNS, screener_column
+
+
+def encode_cursor(sort_by, sort_order, value, ticker):
+    if isinstance(value, date):
+        value = value.isoformat()
+    raw = json.dumps([sort_by, sort_order, value, ticker], separators=(",", ":"))
+    return base64.urlsafe_b64encode(raw.encode("utf-8")).decode("ascii").rstrip("=")
+
+
+def decode_cursor(cursor):
+    """Return (sort_by, sort_order, value, ticker); raises ValueError on a malformed cursor."""
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        sort_by, sort_order, value, ticker = json.loads(base64.urlsafe_b64decode(padded))
+    except Exception as e:
+        raise ValueError("Invalid cursor") from e
+    if sort_by not in SCREENER_COLUMNS:
+        raise ValueError("Invalid cursor")
+    if value is not None and screener_column(sort_by).type.python_type is date:
+        value = date.fromisoformat(value)
+    return sort_by, sort_order, value, ticker
+
+
+def tie_column(sort_by, source=Fundamental):
+    """The ticker that breaks ties: the sort column's own table's, so the pair matches one (column, ticker) index.
+
+    It equals source.ticker on every row where the sort column is not NULL.
+    """
+    if sort_by in INDICATOR_COLUMNS:
+        return Indicator.ticker
+    if sort_by in PEER_RANK_COLUMNS:
+        return PeerRank.ticker
+    return source.ticker
+
+
+def keyset_order(column, ascending, ticker_column=Fundamental.ticker):
+    # Ticker runs in the sort's direction, so the order is one forward or backward scan of (column, ticker).
+    if ascending:
+        return [column.asc(), ticker_column.asc()]
+    return [column.desc(), ticker_column.desc()]
+
+
+def seek_predicate(column, ascending, value, ticker, ticker_column=Fundamental.ticker):
+    """Rows strictly after (value, ticker) in keyset_order(), as one row-value comparison."""
+    position = tuple_(column, ticker_column)
+    # Typed bind parameters, since SQLAlchemy refuses < / > against bare True/False.
+    bound = tuple_(literal(value, type_=column.type), literal(ticker, type_=ticker_column.type))
+    return position > bound if ascending else position < bound
+
+
+def keyset_statements(query, sort_by, sort_order, limit, cursor=None, source=Fundamental):
+    """Statements for one page of a Query or select() from screener_statement(), to run in order.
+
+    Rows with a value come first, seeking on (column, ticker). The NULL tail is a
+    second phase by ticker, so neither needs an OR or an IS NULL sort key that
+    would keep the database off the indexes. The caller stops once it has
+    limit + 1 rows; the extra row tells it whether another page exists without counting.
+    """
+    column = screener_column(sort_by, source)
+    ticker_column = tie_column(sort_by, source)
+    ascending = sort_order == "asc"
+
+    value = ticker = None
+    if cursor:
+        cursor_sort_by, cursor_order, value, ticker = decode_cursor(cursor)
+        if (cursor_sort_by, cursor_order) != (sort_by, sort_order):
+            raise ValueError("Cursor does not match sort_by/sort_order")
+
+    statements = []
+    # A cursor without a value points into the NULL tail.
+    if not cursor or value is not None:
+        values = query.filter(column.is_not(None))
+        if cursor:
+            values = values.filter(seek_predicate(column, ascending, value, ticker, ticker_column))
+        statements.append(values.order_by(*keyset_order(column, ascending, ticker_column)).limit(limit + 1))
+    nulls = query.filter(column.is_(None))
+    if cursor and value is None:
+        nulls = nulls.filter(source.ticker > ticker)
+    statements.append(nulls.order_by(source.ticker.asc()).limit(limit + 1))
+    return statements
+
+
+def keyset_result(rows, sort_by, sort_order, limit):
+    """Trim the extra row fetched by keyset_statements() and return (rows, next_cursor)."""
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        last = rows[-1]
+        next_cursor = encode_cursor(sort_by, sort_order, getattr(last, sort_by), last.ticker)
+    return rows, next_cursor
+
+
+def keyset_page(query, sort_by, sort_order, limit, cursor=None, include_total=False, source=Fundamental):
+    """Fetch one page of a filtered screener query with a seek predicate instead of OFFSET.
+
+    Returns (rows, next_cursor, total); total is None unless `include_total` is set.
+    """
+    total = query.count() if include_total else None
+    rows = []
+    for stmt in keyset_statements(query, sort_by, sort_order, limit, cursor, source):
+        rows += stmt.all()
+        if len(rows) > limit:
+            break
+    rows, next_cursor = keyset_result(rows, sort_by, sort_order, limit)
+    return rows, next_cursor, total
@@ -0,0 +1,137 @@
+"""Compare requests/sec and latency percentiles of the sync and async API modes.
+
+Seeds a temporary SQLite database with synthetic data, then drives the app
+in-process through httpx's ASGI transport with a fixed number of concurrent
+clients. Each mode runs in its own subprocess so DB_MODE is read fresh.
+
+    python loadtest.py --requests 2000 --concurrency 64
+"""
+import argparse
+import asyncio
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+ENDPOINTS = [
+    "/api/fundamentals?limit=20&min_pe=10&sort_by=pe_ttm&sort_order=asc",
+    "/api/fundamentals?limit=50&page=3",
+    "/api/stock/{ticker}",
+    "/api/stock/{ticker}/price-history?period=1Y",
+    "/api/stocks",
+]
+
+
+def seed(tickers):
+    import models
+    models.engine.echo = False
+    from bulk_loader import load_price_history, price_rows, upsert_stocks
+    from fundamental_history import append_snapshots
+    from fetch_engine import StubScraper
+    from migrations import upgrade
+    from models import SessionLocal
+
+    upgrade(models.engine)
+    StubScraper.latency = 0
+    db = SessionLocal()
+    symbols = [f"T{i:03d}" for i in range(tickers)]
+    upsert_stocks(db, [{"ticker": s, "company_name": f"{s} Inc."} for s in symbols])
+    fundamentals = []
+    for s in symbols:
+        data = StubScraper(s).getFundamentals()
+        fundamentals.append({
+            "ticker": s, "snapshot_date": data["snapshot_date"], "market_cap": data["market_cap"],
+            "pe_ttm": data["P/E TTM"], "profit_margin": data["profit_margin"], "roe": data["roe"],
+        })
+        load_price_history(db, price_rows(s, StubScraper(s).getPriceHistory()))
+    append_snapshots(db, fundamentals)
+    db.commit()
+    db.close()
+    return symbols
+
+
+async def drive(app, symbols, total, concurrency):
+    import httpx
+
+    from response_cache import response_cache
+
+    # Measure database round trips rather than cache hits.
+    response_cache.maxsize = 0
+
+    urls = [ENDPOINTS[i % len(ENDPOINTS)].format(ticker=symbols[i % len(symbols)]) for i in range(total)]
+    latencies = []
+    errors = 0
+    queue = asyncio.Queue()
+    for url in urls:
+        queue.put_nowait(url)
+
+    async def client_loop(client):
+        nonlocal errors
+        while not queue.empty():
+            url = queue.get_nowait()
+            start = time.perf_counter()
+            response = await client.get(url)
+            latencies.append(time.perf_counter() - start)
+            if response.status_code != 200:
+                errors += 1
+
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://loadtest") as client:
+        start = time.perf_counter()
+        await asyncio.gather(*(client_loop(client) for _ in range(concurrency)))
+        elapsed = time.perf_counter() - start
+
+    latencies.sort()
+    pick = lambda q: latencies[min(len(latencies) - 1, int(q * len(latencies)))] * 1000
+    return {
+        "requests": total,
+        "errors": errors,
+        "seconds": elapsed,
+        "rps": total / elapsed,
+        "p50_ms": pick(0.50),
+        "p99_ms": pick(0.99),
+    }
+
+
+def run_worker(args):
+    from stockendpoint import app
+
+    symbols = [f"T{i:03d}" for i in range(args.tickers)]
+    result = asyncio.run(drive(app, symbols, args.requests, args.concurrency))
+    result["mode"] = os.environ["DB_MODE"]
+    print(json.dumps(result))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--concurrency", type=int, default=64)
+    parser.add_argument("--tickers", type=int, default=100)
+    parser.add_argument("--worker", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.worker:
+        run_worker(args)
+        return
+
+    db_path = os.path.join(tempfile.mkdtemp(), "loadtest.db")
+    env = dict(os.environ, DATABASE_URL=f"sqlite:///{db_path}")
+    os.environ.update(env)
+    print(f"Seeding {args.tickers} tickers into {db_path}...")
+    seed(args.tickers)
+
+    for mode in ("sync", "async"):
+        output = subprocess.run(
+            [sys.executable, __file__, "--worker", "--requests", str(args.requests),
+             "--concurrency", str(args.concurrency), "--tickers", str(args.tickers)],
+            env=dict(env, DB_MODE=mode), capture_output=True, text=True, check=True,
+        ).stdout.strip().splitlines()[-1]
+        r = json.loads(output)
+        print(f"{mode:>5}: {r['rps']:8.1f} req/s  p50 {r['p50_ms']:7.2f}ms  p99 {r['p99_ms']:7.2f}ms  "
+              f"errors {r['errors']}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,192 @@
+import time
+
+from sqlalchemy import MetaData, UniqueConstraint, func, inspect, text
+
+from models import Base, Fundamental, PriceHistory
+
+
+def dedupe_price_history(db):
+    """Keep the lowest id for each duplicated (ticker, date) so the unique index can be built."""
+    keep = db.query(func.min(PriceHistory.id)).group_by(PriceHistory.ticker, PriceHistory.date)
+    return db.query(PriceHistory).filter(~PriceHistory.id.in_(keep)).delete(synchronize_session=False)
+
+
+def dedupe_fundamentals(db):
+    """Keep only the newest snapshot of each ticker in `fundamentals`, the latest-snapshot table."""
+    rows = db.query(Fundamental.id, Fundamental.ticker).order_by(
+        Fundamental.ticker, Fundamental.snapshot_date, Fundamental.id
+    ).all()
+    newest = {ticker: id_ for id_, ticker in rows}
+    stale = [id_ for id_, ticker in rows if newest[ticker] != id_]
+    for i in range(0, len(stale), 500):
+        db.query(Fundamental).filter(Fundamental.id.in_(stale[i:i + 500])).delete(synchronize_session=False)
+    return len(stale)
+
+
+def upgrade_indexes(engine):
+    """Bring an existing database up to the indexes declared in models.py.
+
+    `create_all` never alters tables that already exist, so this creates any
+    missing indexes and backs the (ticker, date) unique constraint with a
+    unique index, which both Postgres and SQLite accept for ON CONFLICT.
+    """
+    from sqlalchemy.orm import Session
+
+    from fundamental_history import backfill
+
+    with Session(engine) as db:
+        removed = dedupe_price_history(db)
+        # Older per-ticker rows are preserved in fundamental_history before the latest table is deduplicated.
+        copied = backfill(db)
+        superseded = dedupe_fundamentals(db)
+        db.commit()
+    if removed:
+        print(f"Removed {removed} duplicate price_history rows.")
+    if copied:
+        print(f"Copied {copied} fundamentals snapshots into fundamental_history.")
+    if superseded:
+        print(f"Removed {superseded} superseded rows from fundamentals.")
+
+    with engine.begin() as conn:
+        for table in Base.metadata.sorted_tables:
+            for index in table.indexes:
+                index.create(bind=conn, checkfirst=True)
+                if "replaces" in index.info:
+                    conn.execute(text(f"DROP INDEX IF EXISTS {index.info['replaces']}"))
+            for constraint in table.constraints:
+                if isinstance(constraint, UniqueConstraint) and constraint.name:
+                    cols = ", ".join(c.name for c in constraint.columns)
+                    conn.execute(text(
+                        f"CREATE UNIQUE INDEX IF NOT EXISTS {constraint.name} ON {table.name} ({cols})"
+                    ))
+
+
+def add_missing_columns(engine):
+    """Add columns declared in models.py to tables created before them (as nullable columns). Returns their names."""
+    existing = inspect(engine)
+    added = []
+    with engine.begin() as conn:
+        for table in Base.metadata.sorted_tables:
+            if not existing.has_table(table.name):
+                continue
+            present = {c["name"] for c in existing.get_columns(table.name)}
+            for column in table.columns:
+                if column.name not in present:
+                    column_type = column.type.compile(dialect=engine.dialect)
+                    conn.execute(text(f"ALTER TABLE {table.name} ADD COLUMN {column.name} {column_type}"))
+                    added.append(f"{table.name}.{column.name}")
+    return added
+
+
+def upgrade(engine):
+    """Create tables and columns added since the database was built, then bring its indexes up to date."""
+    from sqlalchemy.orm import Session
+
+    from fundamental_history import backfill_parsed_fields
+
+    Base.metadata.create_all(bind=engine)
+    added = add_missing_columns(engine)
+    if added:
+        print(f"Added columns: {', '.join(added)}")
+        with Session(engine) as db:
+            parsed = backfill_parsed_fields(db)
+            db.commit()
+        print(f"Parsed ranges and ratings of {parsed} stored fundamentals rows.")
+    upgrade_indexes(engine)
+
+
+def _unindexed_metadata():
+    # Copy of the schema with no secondary indexes or unique constraints, i.e. the pre-migration layout.
+    metadata = MetaData()
+    for table in Base.metadata.sorted_tables:
+        copy = table.to_metadata(metadata)
+        copy.indexes.clear()
+        for constraint in [c for c in copy.constraints if isinstance(c, UniqueConstraint)]:
+            copy.constraints.discard(constraint)
+    return metadata
+
+
+def _benchmark_queries(engine, ticker, repeat):
+    queries = {
+        "price_history_1y": (
+            "SELECT * FROM price_history WHERE ticker = :ticker AND date >= date('now', '-365 day') ORDER BY date",
+            {"ticker": ticker},
+        ),
+        "latest_fundamental": (
+            "SELECT * FROM fundamentals WHERE ticker = :ticker ORDER BY snapshot_date DESC LIMIT 1",
+            {"ticker": ticker},
+        ),
+        "screener_sort_market_cap": (
+            "SELECT * FROM fundamentals WHERE pe_ttm BETWEEN 10 AND 30 ORDER BY market_cap DESC LIMIT 20",
+            {},
+        ),
+    }
+    results = {}
+    with engine.connect() as conn:
+        for name, (sql, params) in queries.items():
+            plan = conn.execute(text("EXPLAIN QUERY PLAN " + sql), params).fetchall()
+            start = time.perf_counter()
+            for _ in range(repeat):
+                conn.execute(text(sql), params).fetchall()
+            elapsed = (time.perf_counter() - start) / repeat
+            results[name] = (elapsed, " | ".join(row[-1] for row in plan))
+    return results
+
+
+def run_benchmark(tickers=250, years=5, repeat=50):
+    from sqlalchemy import create_engine, insert
+
+    from bulk_loader import price_rows
+    from fetch_engine import StubScraper
+    from models import Fundamental, Stock
+
+    engine = create_engine("sqlite://")
+    _unindexed_metadata().create_all(bind=engine)
+
+    StubScraper.latency = 0
+    StubScraper.days = years * 252
+    symbols = [f"T{i:04d}" for i in range(tickers)]
+    with engine.begin() as conn:
+        conn.execute(insert(Stock.__table__), [{"ticker": s, "company_name": s} for s in symbols])
+        for s in symbols:
+            scraper = StubScraper(s)
+            data = scraper.getFundamentals()
+            conn.execute(insert(Fundamental.__table__), {
+                "ticker": s,
+                "snapshot_date": data["snapshot_date"],
+                "market_cap": data["market_cap"],
+                "pe_ttm": data["P/E TTM"],
+                "revenue_growth_yoy": data["revenue_growth_YoY"],
+                "profit_margin": data["profit_margin"],
+                "perf_1y": data["perf_1y"],
+            })
+            conn.execute(insert(PriceHistory.__table__), price_rows(s, scraper.getPriceHistory()))
+    print(f"Synthetic dataset: {tickers} tickers x {StubScraper.days} bars")
+
+    before = _benchmark_queries(engine, symbols[tickers // 2], repeat)
+    upgrade_indexes(engine)
+    after = _benchmark_queries(engine, symbols[tickers // 2], repeat)
+
+    for name in before:
+        (t0, plan0), (t1, plan1) = before[name], after[name]
+        print(f"{name}: {t0 * 1000:.2f}ms -> {t1 * 1000:.2f}ms ({t0 / t1:.1f}x)")
+        print(f"  before: {plan0}")
+        print(f"  after:  {plan1}")
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Create missing tables and indexes, or benchmark the indexes on synthetic data.")
+    parser.add_argument("--benchmark", action="store_true", help="Run the before/after query benchmark on in-memory SQLite")
+    parser.add_argument("--tickers", type=int, default=250)
+    parser.add_argument("--years", type=int, default=5)
+    args = parser.parse_args()
+
+    if args.benchmark:
+        run_benchmark(args.tickers, args.years)
+    else:
+        from models import engine
+
+        upgrade(engine)
+        print("Schema and indexes are up to date.")
@@ -1,34 +1,113 @@
-from sqlalchemy import create_engine, Column, String, Integer, Float, Date, Boolean, ForeignKey
+from sqlalchemy import create_engine, Table, Column, String, Integer, Float, Date, DateTime, Boolean, Text, Enum, ForeignKey, UniqueConstraint, Index
 from sqlalchemy.orm import declarative_base, relationship, sessionmaker
 
 import os
-from dotenv import load_dotenv
 
-load_dotenv()
+# The engine and settings are resolved on first use, so importing the models
+# (in a worker, a script's --help, a benchmark) never reads .env or connects.
+_settings = None
+_engine = None
 
-DATABASE_URL = os.getenv("DATABASE_URL")
 
-if DATABASE_URL and DATABASE_URL.startswith("postgres://"):
-    DATABASE_URL = DATABASE_URL.replace("postgres://", "postgresql://", 1)
+def settings():
+    """DATABASE_URL and SQL_ECHO from the environment and .env, read once."""
+    global _settings
+    if _settings is None:
+        from dotenv import load_dotenv
+
+        load_dotenv()
+        url = os.getenv("DATABASE_URL")
+        if url and url.startswith("postgres://"):
+            url = url.replace("postgres://", "postgresql://", 1)
+        if not url:
+            raise ValueError("DATABASE_URL is not set in the environment variables.")
+        # SQL_ECHO logs every statement; a debugging aid only, as it slows every query down.
+        _settings = {"database_url": url, "sql_echo": os.getenv("SQL_ECHO", "false").lower() == "true"}
+    return _settings
+
+
+def pool_options(url):
+    """Connection pool settings from the environment (SQLite uses SQLAlchemy's defaults)."""
+    if url.startswith("sqlite"):
+        return {}
+    return {
+        "pool_size": int(os.getenv("DB_POOL_SIZE", "5")),
+        "max_overflow": int(os.getenv("DB_MAX_OVERFLOW", "10")),
+        "pool_pre_ping": os.getenv("DB_POOL_PRE_PING", "true").lower() == "true",
+        "pool_recycle": int(os.getenv("DB_POOL_RECYCLE", "1800")),
+    }
+
+
+def get_engine():
+    global _engine
+    if _engine is None:
+        url = settings()["database_url"]
+        _engine = create_engine(url, echo=settings()["sql_echo"], **pool_options(url))
+    return _engine
+
+
+def __getattr__(name):
+    # `models.engine` and `from models import engine, DATABASE_URL` keep working, built on first access.
+    if name == "engine":
+        return get_engine()
+    if name == "DATABASE_URL":
+        return settings()["database_url"]
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
+class LazySessionmaker(sessionmaker):
+    """sessionmaker that binds to get_engine() when the first session is made."""
+
+    def __call__(self, **local_kw):
+        if self.kw.get("bind") is None:
+            self.configure(bind=get_engine())
+        return super().__call__(**local_kw)
 
-if not DATABASE_URL:
-    raise ValueError("DATABASE_URL is not set in the environment variables.")
 
-engine = create_engine(DATABASE_URL, echo=True)
 Base = declarative_base()
-SessionLocal = sessionmaker(bind=engine)
+SessionLocal = LazySessionmaker()
 
 class Stock(Base):
     __tablename__ = "stock"
 
     ticker = Column(String(10), primary_key=True)
     company_name = Column(String(255))
+    sector = Column(String(100))
+    industry = Column(String(100))
     fundamentals = relationship("Fundamental", back_populates="stock", cascade="all, delete-orphan")
     price_history = relationship("PriceHistory", back_populates="stock", cascade="all, delete-orphan")
+    indicator = relationship("Indicator", uselist=False, cascade="all, delete-orphan")
+    peer_rank = relationship("PeerRank", uselist=False, cascade="all, delete-orphan")
+
+
+# Labels of Yahoo's averageAnalystRating ("2.0 - Buy"), best to worst.
+RATING_LABELS = ("Strong Buy", "Buy", "Hold", "Underperform", "Sell")
+
+
+def sort_index(table, column):
+    """(column, ticker) index for a screener sort column; ticker is the keyset tie-breaker (see keyset.py).
+
+    It replaces the earlier single-column index, which migrations.upgrade_indexes drops.
+    """
+    return Index(f"ix_{table}_{column}_ticker", column, "ticker", info={"replaces": f"ix_{table}_{column}"})
 
 
 class Fundamental(Base):
     __tablename__ = "fundamentals"
+    __table_args__ = (
+        # Latest snapshot per ticker, materialized from fundamental_history (see fundamental_history.py).
+        UniqueConstraint("ticker", name="uq_fundamentals_ticker"),
+        Index("ix_fundamentals_ticker_snapshot_date", "ticker", "snapshot_date"),
+        # Sort/filter columns used by the /api/fundamentals screener.
+        *[
+            sort_index("fundamentals", c)
+            for c in (
+                "market_cap", "pe_ttm", "revenue_growth_yoy", "profit_margin", "perf_1y", "week_range_52_low",
+                "week_range_52_high", "pct_from_52w_high", "day_low", "day_high", "analyst_rating_score",
+                "analyst_rating_label",
+            )
+        ],
+    )
 
     id = Column(Integer, primary_key=True, autoincrement=True)
     ticker = Column(String(10), ForeignKey("stock.ticker", ondelete="CASCADE"))
@@ -53,11 +132,72 @@ class Fundamental(Base):
     pe_trailing = Column(Float)
     market_cap = Column(Float)
 
+    # Parsed from week_range_52, day_range and analyst_rating at ingest (fundamental_history.parsed_fields).
+    week_range_52_low = Column(Float)
+    week_range_52_high = Column(Float)
+    pct_from_52w_high = Column(Float)
+    day_low = Column(Float)
+    day_high = Column(Float)
+    analyst_rating_score = Column(Float)
+    analyst_rating_label = Column(Enum(*RATING_LABELS, name="analyst_rating_label", native_enum=False, length=20))
+
     stock = relationship("Stock", back_populates="fundamentals")
 
 
+def _snapshot_table(name):
+    """Fundamental's columns keyed by (ticker, snapshot_date) instead of a surrogate id."""
+    columns = [
+        Column(c.name, c.type) for c in Fundamental.__table__.columns
+        if c.name not in ("id", "ticker", "snapshot_date")
+    ]
+    return Table(
+        name, Base.metadata,
+        Column("ticker", String(10), ForeignKey("stock.ticker", ondelete="CASCADE"), primary_key=True),
+        Column("snapshot_date", Date, primary_key=True),
+        *columns,
+        Index(f"ix_{name}_snapshot_date", "snapshot_date"),
+    )
+
+
+class FundamentalHistory(Base):
+    """Every fundamentals snapshot, one row per (ticker, snapshot_date)."""
+    __table__ = _snapshot_table("fundamental_history")
+
+
+class FundamentalHistoryCold(Base):
+    """Compacted snapshots older than the hot window: the last snapshot of each month."""
+    __table__ = _snapshot_table("fundamental_history_cold")
+
+
+# Scraper / Fundamentals.csv field name -> Fundamental column.
+FUNDAMENTAL_FIELDS = {
+    "snapshot_date": "snapshot_date",
+    "revenue_growth_YoY": "revenue_growth_yoy",
+    "debt_to_equity": "debt_to_equity",
+    "interest_coverage": "interest_coverage",
+    "free_cash_flow_positive": "free_cash_flow_positive",
+    "roe": "roe",
+    "profit_margin": "profit_margin",
+    "current_ratio": "current_ratio",
+    "EPS TTM": "eps_ttm",
+    "P/E TTM": "pe_ttm",
+    "Analyst Rating": "analyst_rating",
+    "5y PEG": "peg_5y",
+    "52 Week Range": "week_range_52",
+    "Day Range": "day_range",
+    "Current Price": "current_price",
+    "perf_1y": "perf_1y",
+    "beta": "beta",
+    "pe_trailing": "pe_trailing",
+    "market_cap": "market_cap",
+}
+
+
 class PriceHistory(Base):
     __tablename__ = "price_history"
+    __table_args__ = (
+        UniqueConstraint("ticker", "date", name="uq_price_history_ticker_date"),
+    )
 
     id = Column(Integer, primary_key=True, autoincrement=True)
     ticker = Column(String(10), ForeignKey("stock.ticker", ondelete="CASCADE"), nullable=False)
@@ -68,4 +208,106 @@ class PriceHistory(Base):
     close_price = Column(Float)
     volume = Column(Float)
 
-    stock = relationship("Stock", back_populates="price_history")
\ No newline at end of file
+    stock = relationship("Stock", back_populates="price_history")
+
+
+class DataVersion(Base):
+    __tablename__ = "data_version"
+
+    id = Column(Integer, primary_key=True)
+    version = Column(Integer, nullable=False, default=0)
+    updated_at = Column(DateTime)
+
+
+class Indicator(Base):
+    """Price-derived metrics per ticker as of its last stored bar (see indicators.py)."""
+    __tablename__ = "indicators"
+    __table_args__ = tuple(sort_index("indicators", c) for c in ("return_1m", "return_1y", "rsi_14", "volatility_1y"))
+
+    ticker = Column(String(10), ForeignKey("stock.ticker", ondelete="CASCADE"), primary_key=True)
+    as_of = Column(Date, nullable=False)
+
+    return_1w = Column(Float)
+    return_1m = Column(Float)
+    return_3m = Column(Float)
+    return_6m = Column(Float)
+    return_1y = Column(Float)
+    sma_50 = Column(Float)
+    sma_200 = Column(Float)
+    rsi_14 = Column(Float)
+    volatility_1y = Column(Float)
+    max_drawdown_1y = Column(Float)
+
+
+INDICATOR_COLUMNS = [c.name for c in Indicator.__table__.columns if c.name != "ticker"]
+
+
+# Fundamentals ranked within each peer group; absolute prices and per-share values are not comparable across peers.
+PEER_METRICS = (
+    "market_cap", "pe_ttm", "pe_trailing", "peg_5y", "revenue_growth_yoy", "profit_margin", "roe",
+    "debt_to_equity", "current_ratio", "interest_coverage", "beta", "perf_1y", "pct_from_52w_high",
+    "analyst_rating_score",
+)
+PEER_GROUPS = ("sector", "industry")
+
+
+def _peer_rank_table():
+    """One row per ticker: percentile (0-1] and z-score of each PEER_METRICS value within its sector and industry."""
+    columns = []
+    indexes = []
+    for metric in PEER_METRICS:
+        for group in PEER_GROUPS:
+            columns += [Column(f"{metric}_{group}_pct", Float), Column(f"{metric}_{group}_z", Float)]
+            indexes.append(sort_index("peer_ranks", f"{metric}_{group}_pct"))
+    return Table(
+        "peer_ranks", Base.metadata,
+        Column("ticker", String(10), ForeignKey("stock.ticker", ondelete="CASCADE"), primary_key=True),
+        Column("as_of", Date, nullable=False),
+        Column("sector", String(100), index=True),
+        Column("industry", String(100), index=True),
+        *columns,
+        *indexes,
+    )
+
+
+class PeerRank(Base):
+    """Sector and industry relative ranks per ticker (see peer_ranks.py)."""
+    __table__ = _peer_rank_table()
+
+
+# Everything the screener joins in; as_of is left out, since indicators already have a column of that name.
+# str() because names of Table-built columns are quoted_name, which orjson rejects as dict keys.
+PEER_RANK_COLUMNS = [str(c.name) for c in PeerRank.__table__.columns if c.name not in ("ticker", "as_of")]
+
+
+class RefreshRun(Base):
+    """One update_fundamentals run; status is running, completed, partial (time budget hit) or failed."""
+    __tablename__ = "refresh_runs"
+
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    started_at = Column(DateTime, nullable=False)
+    finished_at = Column(DateTime)
+    status = Column(String(20), nullable=False, default="running")
+    planned = Column(Integer)
+
+    tickers = relationship("RefreshStatus", back_populates="run", cascade="all, delete-orphan")
+
+
+class RefreshStatus(Base):
+    """Outcome of one ticker within a refresh run (ok or failed); tickers never attempted have no row."""
+    __tablename__ = "refresh_status"
+    __table_args__ = (
+        Index("ix_refresh_status_run_ticker", "run_id", "ticker"),
+        Index("ix_refresh_status_ticker_finished_at", "ticker", "finished_at"),
+    )
+
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    run_id = Column(Integer, ForeignKey("refresh_runs.id", ondelete="CASCADE"), nullable=False)
+    ticker = Column(String(10), nullable=False)
+    status = Column(String(10), nullable=False)
+    finished_at = Column(DateTime, nullable=False)
+    duration = Column(Float)
+    rows_written = Column(Integer, default=0)
+    error = Column(Text)
+
+    run = relationship("RefreshRun", back_populates="tickers")
@@ -0,0 +1,95 @@
+"""Sector and industry relative valuation, stored one row per ticker in `peer_ranks`.
+
+Each PEER_METRICS value of the latest fundamentals gets a percentile rank
+(0-1], 1 = highest in the group) and a z-score within the ticker's sector
+and within its industry. Ranks depend on every member of a group, so the
+whole table is recomputed in one grouped pass after each refresh; the
+screener then filters on the stored columns instead of aggregating per request.
+"""
+import time
+from datetime import date
+
+from sqlalchemy import delete, insert, select
+
+from bulk_loader import chunks
+from models import PEER_GROUPS, PEER_METRICS, PEER_RANK_COLUMNS, Fundamental, PeerRank, Stock
+
+# Groups smaller than this get no ranks; a percentile among two peers says little.
+MIN_PEERS = 5
+
+
+def compute_peer_ranks(frame):
+    """Percentiles and z-scores of PEER_METRICS within each sector and industry.
+
+    `frame` has ticker, sector, industry and PEER_METRICS columns. Returns a
+    frame indexed by ticker with PEER_RANK_COLUMNS.
+    """
+    import numpy as np
+    import pandas as pd
+
+    frame = frame.set_index("ticker")
+    values = frame[list(PEER_METRICS)].apply(pd.to_numeric, errors="coerce").replace([np.inf, -np.inf], np.nan)
+    result = frame[list(PEER_GROUPS)].copy()
+
+    for group in PEER_GROUPS:
+        if frame[group].isna().all():
+            # e.g. seeded from a CSV scraped before sectors were captured; the columns stay NULL.
+            continue
+        by_group = values.groupby(frame[group])
+        # Tickers without a group are left out of groupby and come back NaN.
+        pct = by_group.rank(pct=True)
+        mean = by_group.transform("mean")
+        std = by_group.transform("std")
+        counts = by_group.transform("count")
+        with np.errstate(divide="ignore", invalid="ignore"):
+            z = (values - mean) / std.where(std > 0)
+        enough = counts >= MIN_PEERS
+        pct = pct.where(enough)
+        z = z.where(enough)
+        for metric in PEER_METRICS:
+            result[f"{metric}_{group}_pct"] = pct[metric]
+            result[f"{metric}_{group}_z"] = z[metric]
+
+    return result.reindex(columns=PEER_RANK_COLUMNS)
+
+
+def load_peer_frame(db):
+    import pandas as pd
+
+    columns = [Fundamental.ticker, Stock.sector, Stock.industry] + [getattr(Fundamental, m) for m in PEER_METRICS]
+    rows = db.execute(select(*columns).join(Stock, Stock.ticker == Fundamental.ticker)).all()
+    return pd.DataFrame(rows, columns=["ticker", *PEER_GROUPS, *PEER_METRICS])
+
+
+def update_peer_ranks(db, chunk_size=500):
+    """Recompute every ticker's ranks from the latest fundamentals. Does not commit. Returns a stats dict."""
+    start = time.perf_counter()
+    frame = compute_peer_ranks(load_peer_frame(db))
+    frame.insert(0, "as_of", date.today())
+    rows = frame.astype(object).where(frame.notna(), None).reset_index().to_dict("records")
+
+    db.execute(delete(PeerRank.__table__))
+    for chunk in chunks(rows, chunk_size):
+        db.execute(insert(PeerRank.__table__), chunk)
+
+    return {
+        "tickers": len(rows),
+        "sectors": frame["sector"].nunique(),
+        "industries": frame["industry"].nunique(),
+        "seconds": time.perf_counter() - start,
+    }
+
+
+if __name__ == "__main__":
+    from models import SessionLocal
+    from response_cache import bump_data_version
+
+    db = SessionLocal()
+    try:
+        stats = update_peer_ranks(db)
+        db.commit()
+        bump_data_version(db)
+        print(f"Ranked {stats['tickers']} tickers across {stats['sectors']} sectors and "
+              f"{stats['industries']} industries in {stats['seconds']:.2f}s")
+    finally:
+        db.close()
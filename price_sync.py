@@ -0,0 +1,53 @@
+from sqlalchemy import func
+
+from bulk_loader import price_rows, replace_price_history, upsert_price_history
+from models import PriceHistory
+
+# Relative difference between a stored close and a refetched close that means
+# yfinance has re-adjusted the series (split or dividend) and it must be reloaded.
+ADJUSTMENT_TOLERANCE = 1e-3
+
+
+def latest_price_bars(db):
+    """Return {ticker: (last_date, last_close)} for every ticker, in a single grouped query."""
+    latest = (
+        db.query(PriceHistory.ticker, func.max(PriceHistory.date).label("max_date"))
+        .group_by(PriceHistory.ticker)
+        .subquery()
+    )
+    rows = (
+        db.query(PriceHistory.ticker, PriceHistory.date, PriceHistory.close_price)
+        .join(latest, (PriceHistory.ticker == latest.c.ticker) & (PriceHistory.date == latest.c.max_date))
+        .all()
+    )
+    return {r.ticker: (r.date, r.close_price) for r in rows}
+
+
+def is_adjusted(stored_close, fetched_close):
+    if stored_close is None or fetched_close is None:
+        return False
+    return abs(fetched_close - stored_close) > ADJUSTMENT_TOLERANCE * abs(stored_close)
+
+
+def fetch_price_history(scraper, last_bar=None):
+    """Fetch bars for one ticker, returning (price_history_data, full_resync).
+
+    With `last_bar` the fetch starts at the last stored date so that bar can be
+    compared against the stored close; a mismatch means the history was
+    re-adjusted and the full 5y series is fetched instead.
+    """
+    if last_bar is None:
+        return scraper.getPriceHistory(), True
+
+    last_date, last_close = last_bar
+    bars = scraper.getPriceHistory(start=last_date)
+    overlap = next((b for b in bars if b['date'] == last_date), None)
+    if overlap is not None and is_adjusted(last_close, overlap['close_price']):
+        return scraper.getPriceHistory(), True
+    return [b for b in bars if b['date'] > last_date], False
+
+
+def sync_price_history(db, ticker_symbol, price_history_data, full_resync):
+    if full_resync:
+        return replace_price_history(db, ticker_symbol, price_history_data)
+    return upsert_price_history(db, price_rows(ticker_symbol, price_history_data))
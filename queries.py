@@ -0,0 +1,362 @@
+import os
+from datetime import datetime, timedelta
+from itertools import groupby
+from typing import Optional
+
+from fastapi import HTTPException, Query, Request
+from sqlalchemy import asc, desc, select
+
+from fundamental_history import as_of_source
+from models import PEER_RANK_COLUMNS, RATING_LABELS, Fundamental, PeerRank, PriceHistory, Stock
+from screener_engine import (
+    FUNDAMENTAL_COLUMNS, LATEST_ONLY_COLUMNS, NUMERIC_COLUMNS, SCREENER_COLUMNS, screener_column, screener_statement
+)
+
+PERIODS = {
+    "5D": timedelta(days=5),
+    "1M": timedelta(days=30),
+    "6M": timedelta(days=180),
+    "1Y": timedelta(days=365),
+    "5Y": timedelta(days=365 * 5)
+}
+
+BATCH_MAX_TICKERS = int(os.getenv("BATCH_MAX_TICKERS", "50"))
+
+
+def screener_params(
+    request: Request,
+    min_market_cap: float = Query(None),
+    max_market_cap: float = Query(None),
+    min_pe: float = Query(None),
+    max_pe: float = Query(None),
+    min_growth: float = Query(None, alias="min_revenue_growth"),
+    max_growth: float = Query(None, alias="max_revenue_growth"),
+    min_profit_margin: float = Query(None),
+    max_profit_margin: float = Query(None),
+    min_perf_1y: float = Query(None),
+    max_perf_1y: float = Query(None),
+    min_52w_low: float = Query(None),
+    max_52w_low: float = Query(None),
+    min_52w_high: float = Query(None),
+    max_52w_high: float = Query(None),
+    min_pct_from_52w_high: float = Query(None),
+    max_pct_from_52w_high: float = Query(None),
+    min_day_low: float = Query(None),
+    max_day_low: float = Query(None),
+    min_day_high: float = Query(None),
+    max_day_high: float = Query(None),
+    min_rating_score: float = Query(None),
+    max_rating_score: float = Query(None),
+    min_return_1w: float = Query(None),
+    max_return_1w: float = Query(None),
+    min_return_1m: float = Query(None),
+    max_return_1m: float = Query(None),
+    min_return_3m: float = Query(None),
+    max_return_3m: float = Query(None),
+    min_return_6m: float = Query(None),
+    max_return_6m: float = Query(None),
+    min_return_1y: float = Query(None),
+    max_return_1y: float = Query(None),
+    min_rsi: float = Query(None),
+    max_rsi: float = Query(None),
+    min_volatility: float = Query(None),
+    max_volatility: float = Query(None),
+    min_drawdown: float = Query(None),
+    max_drawdown: float = Query(None),
+    fcf_positive: bool = Query(None),
+    analyst_rating: str = Query(
+        None, description="Comma-separated rating labels, matched exactly (Buy excludes Strong Buy): Strong Buy,Buy"
+    ),
+    ticker_search: str = Query(None),
+    sector: str = Query(None),
+    industry: str = Query(None),
+    page: int = Query(1, ge=1),
+    limit: int = Query(20, ge=1, le=100),
+    sort_by: str = Query("market_cap"),
+    sort_order: str = Query("desc"),
+):
+    """Screener query parameters, shared by the sync and async /api/fundamentals handlers.
+
+    Peer ranks are filtered with min_/max_ plus the column name, e.g.
+    max_pe_ttm_sector_pct=0.5 for a P/E at or below the sector median.
+    """
+    return {
+        "ranges": {
+            "market_cap": (min_market_cap, max_market_cap),
+            "pe_ttm": (min_pe, max_pe),
+            "revenue_growth_yoy": (min_growth, max_growth),
+            "profit_margin": (min_profit_margin, max_profit_margin),
+            "perf_1y": (min_perf_1y, max_perf_1y),
+            "week_range_52_low": (min_52w_low, max_52w_low),
+            "week_range_52_high": (min_52w_high, max_52w_high),
+            "pct_from_52w_high": (min_pct_from_52w_high, max_pct_from_52w_high),
+            "day_low": (min_day_low, max_day_low),
+            "day_high": (min_day_high, max_day_high),
+            "analyst_rating_score": (min_rating_score, max_rating_score),
+            "return_1w": (min_return_1w, max_return_1w),
+            "return_1m": (min_return_1m, max_return_1m),
+            "return_3m": (min_return_3m, max_return_3m),
+            "return_6m": (min_return_6m, max_return_6m),
+            "return_1y": (min_return_1y, max_return_1y),
+            "rsi_14": (min_rsi, max_rsi),
+            "volatility_1y": (min_volatility, max_volatility),
+            "max_drawdown_1y": (min_drawdown, max_drawdown),
+            **peer_rank_ranges(request),
+        },
+        "fcf_positive": fcf_positive,
+        "analyst_rating": rating_labels(analyst_rating),
+        "ticker_search": ticker_search,
+        "sector": sector,
+        "industry": industry,
+        "page": page,
+        "limit": limit,
+        "sort_by": sort_by,
+        "sort_order": sort_order,
+    }
+
+
+# Peer ranks also carry the text sector and industry, which are filtered by name rather than by range.
+PEER_RANK_RANGE_COLUMNS = [c for c in PEER_RANK_COLUMNS if c in NUMERIC_COLUMNS]
+
+
+def peer_rank_ranges(request):
+    """(min, max) ranges for the peer rank columns given as min_<column> / max_<column> query parameters."""
+    ranges = {}
+    for column in PEER_RANK_RANGE_COLUMNS:
+        bounds = (request.query_params.get("min_" + column), request.query_params.get("max_" + column))
+        if bounds == (None, None):
+            continue
+        try:
+            ranges[column] = tuple(None if b is None else float(b) for b in bounds)
+        except ValueError:
+            raise HTTPException(status_code=400, detail=f"min_{column} and max_{column} must be numbers")
+    return ranges
+
+
+def rating_labels(value):
+    """Parse the `analyst_rating` filter into RATING_LABELS (case-insensitive), or None when unset."""
+    if not value:
+        return None
+    known = {label.lower(): label for label in RATING_LABELS}
+    labels = [known.get(v.strip().lower()) for v in value.split(",") if v.strip()]
+    if None in labels:
+        raise HTTPException(status_code=400, detail=f"analyst_rating must be among: {', '.join(RATING_LABELS)}")
+    return labels or None
+
+
+def screener_source(as_of, params):
+    """The entity the screener reads: the latest fundamentals, or their state on `as_of`."""
+    if as_of is None:
+        return Fundamental
+    uses_latest = params["sort_by"] in LATEST_ONLY_COLUMNS or params["sector"] or params["industry"] or any(
+        column in LATEST_ONLY_COLUMNS and (low is not None or high is not None)
+        for column, (low, high) in params["ranges"].items()
+    )
+    if uses_latest:
+        raise HTTPException(
+            status_code=400, detail="Indicator and peer rank columns cannot be filtered or sorted with as_of"
+        )
+    return as_of_source(as_of)
+
+
+def apply_screener_filters(query, ranges, fcf_positive=None, analyst_rating=None, ticker_search=None,
+                           source=Fundamental, sector=None, industry=None):
+    """Add the screener's WHERE clauses to a Query or select() from screener_statement()."""
+    if ticker_search:
+        query = query.filter(source.ticker.ilike(f"%{ticker_search}%"))
+
+    for column, (low, high) in ranges.items():
+        col_attr = screener_column(column, source)
+        if low is not None:
+            query = query.filter(col_attr >= low)
+        if high is not None:
+            query = query.filter(col_attr <= high)
+
+    if fcf_positive is not None:
+        query = query.filter(source.free_cash_flow_positive == fcf_positive)
+
+    if analyst_rating:
+        # `analyst_rating` is a list of RATING_LABELS, matched on the indexed parsed label.
+        query = query.filter(source.analyst_rating_label.in_(analyst_rating))
+
+    # Matched on the indexed copies in peer_ranks, which screener_statement() already joins.
+    if sector:
+        query = query.filter(PeerRank.sector == sector)
+    if industry:
+        query = query.filter(PeerRank.industry == industry)
+
+    return query
+
+
+def screener_order(sort_by, sort_order, source=Fundamental):
+    if sort_by in SCREENER_COLUMNS:
+        col_attr = screener_column(sort_by, source)
+        # NULLs last in both directions, as in the memory engine; Postgres would put them first when descending.
+        return (asc(col_attr) if sort_order == "asc" else desc(col_attr)).nulls_last()
+    return desc(source.market_cap).nulls_last()
+
+
+def fundamental_dict(row):
+    return {c: getattr(row, c) for c in FUNDAMENTAL_COLUMNS}
+
+
+def screener_dict(row):
+    return {c: getattr(row, c) for c in SCREENER_COLUMNS}
+
+
+def batch_tickers(tickers: str = Query(..., description="Comma-separated symbols")):
+    """Parse the `tickers` parameter of the batch endpoints into unique upper-case symbols."""
+    symbols = list(dict.fromkeys(t.strip().upper() for t in tickers.split(",") if t.strip()))
+    if not symbols:
+        raise HTTPException(status_code=400, detail="No tickers given")
+    if len(symbols) > BATCH_MAX_TICKERS:
+        raise HTTPException(status_code=400, detail=f"At most {BATCH_MAX_TICKERS} tickers per request")
+    return symbols
+
+
+def stock_detail_statement(tickers):
+    return (
+        select(Fundamental, Stock.company_name)
+        .outerjoin(Stock, Stock.ticker == Fundamental.ticker)
+        .where(Fundamental.ticker.in_(tickers))
+    )
+
+
+def stock_details(rows, tickers):
+    """Group (Fundamental, company_name) rows into per-ticker details, in the order requested."""
+    details = {}
+    for item, company_name in rows:
+        if item.ticker in details:
+            continue
+        item_dict = fundamental_dict(item)
+        if company_name is not None:
+            item_dict['company_name'] = company_name
+        details[item.ticker] = item_dict
+
+    return {
+        "data": [details[t] for t in tickers if t in details],
+        "missing": [t for t in tickers if t not in details],
+    }
+
+
+def period_start(period):
+    """First date of a PERIODS window ending today; an unknown period means 1Y."""
+    return datetime.now().date() - PERIODS.get(period.upper(), timedelta(days=365))
+
+
+def price_history_statement(ticker, period):
+    start_date = period_start(period)
+    return select(
+        PriceHistory.date,
+        PriceHistory.open_price,
+        PriceHistory.high_price,
+        PriceHistory.low_price,
+        PriceHistory.close_price,
+        PriceHistory.volume
+    ).where(
+        PriceHistory.ticker == ticker.upper(),
+        PriceHistory.date >= start_date
+    ).order_by(PriceHistory.date)
+
+
+def price_history_rows(price_data, resolution: Optional[str] = None, max_points: Optional[int] = None):
+    # Plain column tuples, no ORM objects; NaN/inf become null in the encoder.
+    result = [
+        {'date': d, 'open': o, 'high': h, 'low': l, 'close': c, 'volume': v}
+        for d, o, h, l, c, v in price_data
+    ]
+
+    if (resolution and resolution.upper() not in ("D", "DAILY")) or (max_points and len(result) > max_points):
+        import pandas as pd
+
+        from downsample import downsample
+
+        frame = downsample(pd.DataFrame(result), resolution, max_points)
+        result = frame.to_dict("records")
+
+    return result
+
+
+def price_history_batch_statement(tickers, period):
+    return select(
+        PriceHistory.ticker,
+        PriceHistory.date,
+        PriceHistory.open_price,
+        PriceHistory.high_price,
+        PriceHistory.low_price,
+        PriceHistory.close_price,
+        PriceHistory.volume
+    ).where(
+        PriceHistory.ticker.in_(tickers),
+        PriceHistory.date >= period_start(period)
+    ).order_by(PriceHistory.ticker, PriceHistory.date)
+
+
+def aligned_price_series(price_data, tickers, resolution=None, max_points=None):
+    """Lay out (ticker, date, o, h, l, c, v) rows sorted by ticker and date on one shared date axis.
+
+    Each ticker gets one list per field, with None on dates where it has no bar.
+    Candles and downsampling are computed on the shared axis, so every ticker keeps
+    the same dates: a weekly or monthly candle is dated at the period's first trading
+    day across all tickers, and `max_points` picks one set of dates by LTTB over the
+    tickers' mean close, each scaled to its first close.
+    """
+    series = {
+        ticker: price_history_rows([row[1:] for row in rows], resolution)
+        for ticker, rows in groupby(price_data, key=lambda row: row[0])
+    }
+
+    if resolution and resolution.upper() not in ("D", "DAILY"):
+        import pandas as pd
+
+        from downsample import RESOLUTIONS
+
+        freq = RESOLUTIONS[resolution.upper()]
+        first = {}
+        for bars in series.values():
+            for bar in bars:
+                bar['period'] = pd.Period(bar['date'], freq)
+                first[bar['period']] = min(first.get(bar['period'], bar['date']), bar['date'])
+        for bars in series.values():
+            for bar in bars:
+                bar['date'] = first[bar.pop('period')]
+
+    dates = sorted({bar['date'] for bars in series.values() for bar in bars})
+    position = {d: i for i, d in enumerate(dates)}
+
+    aligned = {}
+    for ticker in tickers:
+        if ticker not in series:
+            continue
+        fields = {f: [None] * len(dates) for f in ('open', 'high', 'low', 'close', 'volume')}
+        for bar in series[ticker]:
+            i = position[bar['date']]
+            for f, values in fields.items():
+                values[i] = bar[f]
+        aligned[ticker] = fields
+
+    if max_points and len(dates) > max_points:
+        import numpy as np
+        import pandas as pd
+
+        from downsample import lttb_indices
+
+        scaled = []
+        for fields in aligned.values():
+            closes = pd.Series(fields['close'], dtype=float)
+            start = closes.first_valid_index()
+            if start is not None and closes[start] > 0:
+                scaled.append(closes / closes[start])
+        # Gaps are filled only to steer the selection; the returned values keep their None.
+        reference = pd.concat(scaled, axis=1).mean(axis=1).ffill().bfill() if scaled else pd.Series(0.0, index=dates)
+        keep = lttb_indices(reference.to_numpy(dtype=float, na_value=np.nan), max_points)
+        dates = [dates[i] for i in keep]
+        for fields in aligned.values():
+            for f, values in fields.items():
+                fields[f] = [values[i] for i in keep]
+
+    return {
+        "dates": dates,
+        "series": aligned,
+        "missing": [t for t in tickers if t not in series],
+    }
@@ -0,0 +1,119 @@
+"""Run and per-ticker status tracking for update_fundamentals, so refreshes can resume."""
+from datetime import datetime
+
+from sqlalchemy import func
+
+from bulk_loader import chunks
+from models import RefreshRun, RefreshStatus
+
+
+def begin_run(db, tickers, resume=False):
+    """Start a run, or reopen the latest one with `resume`; returns (run, tickers still to refresh).
+
+    A resumed run keeps its id and only gets the tickers that failed or were
+    never reached in it.
+    """
+    run = db.query(RefreshRun).order_by(RefreshRun.id.desc()).first() if resume else None
+    if run is None:
+        run = RefreshRun(started_at=datetime.now(), status="running", planned=len(tickers))
+        db.add(run)
+        db.commit()
+        return run, list(tickers)
+
+    done = {t for (t,) in db.query(RefreshStatus.ticker).filter(
+        RefreshStatus.run_id == run.id, RefreshStatus.status == "ok"
+    )}
+    run.status = "running"
+    run.finished_at = None
+    db.commit()
+    return run, [t for t in tickers if t not in done]
+
+
+def stalest_first(db, tickers, chunk_size=500):
+    """Order tickers by their last successful refresh, never-refreshed ones first."""
+    last_ok = {}
+    for chunk in chunks(list(tickers), chunk_size):
+        last_ok.update(
+            db.query(RefreshStatus.ticker, func.max(RefreshStatus.finished_at))
+            .filter(RefreshStatus.ticker.in_(chunk), RefreshStatus.status == "ok")
+            .group_by(RefreshStatus.ticker)
+            .all()
+        )
+    return sorted(tickers, key=lambda t: (last_ok.get(t) is not None, last_ok.get(t) or datetime.min))
+
+
+def record_ticker(db, run, ticker, status, duration, rows_written=0, error=None):
+    """Record one ticker's outcome and commit."""
+    db.add(RefreshStatus(
+        run_id=run.id,
+        ticker=ticker,
+        status=status,
+        finished_at=datetime.now(),
+        duration=duration,
+        rows_written=rows_written,
+        error=None if error is None else str(error)[:2000],
+    ))
+    db.commit()
+
+
+def finish_run(db, run, status):
+    run.status = status
+    run.finished_at = datetime.now()
+    db.commit()
+
+
+def run_summary(db, run_id=None):
+    """Counts, rows written and failures of a run (the latest by default), or None if there are no runs."""
+    if run_id is not None:
+        run = db.get(RefreshRun, run_id)
+    else:
+        run = db.query(RefreshRun).order_by(RefreshRun.id.desc()).first()
+    if run is None:
+        return None
+
+    rows = db.query(RefreshStatus).filter(RefreshStatus.run_id == run.id).all()
+    # A ticker retried on resume keeps only its latest outcome.
+    latest = {}
+    for r in sorted(rows, key=lambda r: r.id):
+        latest[r.ticker] = r
+    outcomes = list(latest.values())
+
+    return {
+        "run_id": run.id,
+        "status": run.status,
+        "started_at": run.started_at,
+        "finished_at": run.finished_at,
+        "planned": run.planned,
+        "ok": sum(r.status == "ok" for r in outcomes),
+        "failed": sorted((r.ticker, r.error) for r in outcomes if r.status == "failed"),
+        "missing": (run.planned or 0) - len(outcomes),
+        "rows_written": sum(r.rows_written or 0 for r in rows),
+        "seconds": sum(r.duration or 0 for r in rows),
+    }
+
+
+if __name__ == "__main__":
+    import argparse
+
+    from models import SessionLocal
+
+    parser = argparse.ArgumentParser(description="Show the outcome of a refresh run.")
+    parser.add_argument("--run", type=int, help="Run id (default: latest)")
+    args = parser.parse_args()
+
+    db = SessionLocal()
+    try:
+        summary = run_summary(db, args.run)
+        if summary is None:
+            print("No refresh runs recorded.")
+        else:
+            print(f"Run {summary['run_id']} ({summary['status']}), started {summary['started_at']:%Y-%m-%d %H:%M:%S}")
+            print(f"  ok:      {summary['ok']} / {summary['planned']}")
+            print(f"  missing: {summary['missing']}")
+            print(f"  rows:    {summary['rows_written']}")
+            print(f"  time:    {summary['seconds']:.1f}s across tickers")
+            print(f"  failed:  {len(summary['failed'])}")
+            for ticker, error in summary["failed"]:
+                print(f"    {ticker}: {error}")
+    finally:
+        db.close()
@@ -0,0 +1,183 @@
+import hashlib
+import os
+import threading
+import time
+from collections import OrderedDict
+from datetime import date, datetime
+
+from fastapi import Response
+from sqlalchemy.exc import OperationalError, ProgrammingError
+
+from models import DataVersion
+from serialization import dumps
+
+
+def bump_data_version(db):
+    """Mark the data as changed so cached API responses are invalidated. Commits."""
+    row = db.get(DataVersion, 1)
+    if row is None:
+        row = DataVersion(id=1, version=0)
+        db.add(row)
+    row.version += 1
+    row.updated_at = datetime.now()
+    db.commit()
+    return row.version
+
+
+class ResponseCache:
+    """Thread-safe LRU of encoded response bodies with a TTL, keyed per data version.
+
+    Without a data version (the data_version table or its row is missing, as on a
+    database that was never migrated or written to) nothing is cached.
+    """
+
+    def __init__(self, maxsize=1024, ttl=3600.0, version_check_interval=5.0):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.version_check_interval = version_check_interval
+        self.entries = OrderedDict()
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.not_modified = 0
+        self.version = None
+        self.version_checked_at = 0.0
+
+    def _version_due(self):
+        return not self.version_checked_at or time.monotonic() - self.version_checked_at >= self.version_check_interval
+
+    def _set_version(self, row):
+        self.version = row.version if row else None
+        self.version_checked_at = time.monotonic()
+
+    def data_version(self, db):
+        """The writers' data version, or None when there is none."""
+        # The stamp is read at most every `version_check_interval` seconds, not per request.
+        if self._version_due():
+            try:
+                row = db.get(DataVersion, 1)
+            except (OperationalError, ProgrammingError):
+                # No data_version table; the failed statement aborted the transaction on Postgres.
+                db.rollback()
+                row = None
+            self._set_version(row)
+        return self.version
+
+    async def data_version_async(self, db):
+        if self._version_due():
+            try:
+                row = await db.get(DataVersion, 1)
+            except (OperationalError, ProgrammingError):
+                await db.rollback()
+                row = None
+            self._set_version(row)
+        return self.version
+
+    def get(self, key):
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is not None and time.monotonic() - entry[0] < self.ttl:
+                self.entries.move_to_end(key)
+                self.hits += 1
+                return entry[1]
+            if entry is not None:
+                del self.entries[key]
+            self.misses += 1
+            return None
+
+    def set(self, key, value):
+        with self.lock:
+            self.entries[key] = (time.monotonic(), value)
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.maxsize:
+                self.entries.popitem(last=False)
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+            self.version = None
+            self.version_checked_at = 0.0
+
+    def stats(self):
+        with self.lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self.entries),
+                "maxsize": self.maxsize,
+                "ttl": self.ttl,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+                "not_modified": self.not_modified,
+                "data_version": self.version,
+            }
+
+
+def _etag_matches(if_none_match, etag):
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    return etag in (t.strip() for t in if_none_match.split(","))
+
+
+def _cache_key(request, version):
+    # Today's date is part of the key because period windows ("1Y", ...) are relative to it.
+    return (
+        request.url.path,
+        tuple(sorted(request.query_params.multi_items())),
+        version,
+        date.today(),
+    )
+
+
+def _encode(payload):
+    body = dumps(payload)
+    return body, '"' + hashlib.sha1(body).hexdigest() + '"'
+
+
+def _respond(cache, request, entry):
+    body, etag = entry
+    headers = {"ETag": etag, "Cache-Control": "no-cache"}
+    if _etag_matches(request.headers.get("if-none-match"), etag):
+        with cache.lock:
+            cache.not_modified += 1
+        return Response(status_code=304, headers=headers)
+    return Response(content=body, media_type="application/json", headers=headers)
+
+
+def cached_response(cache, request, db, build):
+    """Serve `build()` through the cache, with a strong ETag and If-None-Match -> 304.
+
+    `build` returns the JSON-able payload; exceptions it raises (e.g. 404) are not cached.
+    """
+    version = cache.data_version(db)
+    if version is None:
+        # Nothing would tell a cached entry went stale, so it is built every time.
+        return _respond(cache, request, _encode(build()))
+    key = _cache_key(request, version)
+    entry = cache.get(key)
+    if entry is None:
+        entry = _encode(build())
+        cache.set(key, entry)
+    return _respond(cache, request, entry)
+
+
+async def cached_response_async(cache, request, db, build):
+    """cached_response() for an AsyncSession; `build` is a coroutine function."""
+    version = await cache.data_version_async(db)
+    if version is None:
+        return _respond(cache, request, _encode(await build()))
+    key = _cache_key(request, version)
+    entry = cache.get(key)
+    if entry is None:
+        entry = _encode(await build())
+        cache.set(key, entry)
+    return _respond(cache, request, entry)
+
+
+response_cache = ResponseCache(
+    maxsize=int(os.getenv("RESPONSE_CACHE_SIZE", "1024")),
+    ttl=float(os.getenv("RESPONSE_CACHE_TTL", "3600")),
+    version_check_interval=float(os.getenv("RESPONSE_CACHE_VERSION_INTERVAL", "5")),
+)
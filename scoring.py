@@ -0,0 +1,172 @@
+"""Multi-factor composite scores over the screener universe.
+
+A factor spec weights screener columns, e.g. `roe:1,profit_margin:1,pe_ttm:-1`
+(a negative weight means lower is better) or a preset such as `quality`.
+Each factor is normalized across every ticker, as a clipped z-score or a
+centred percentile rank. The composite is the weighted mean of the factors
+a ticker has. Only the top page*limit rows are sorted, after an
+argpartition.
+
+Scores run on the in-process ScreenerSnapshot's columns. Normalized factors
+are cached until the snapshot reloads, i.e. per data version, so repeated
+requests with different weights or filters only recombine cached arrays.
+"""
+import math
+import threading
+
+from fastapi import HTTPException, Query
+
+import screener_engine
+from screener_engine import NUMERIC_COLUMNS, import_arrays
+
+# Everything numeric except the surrogate key, including indicators and peer ranks.
+FACTOR_COLUMNS = sorted(NUMERIC_COLUMNS - {"id"})
+
+FACTOR_PRESETS = {
+    "quality": {"roe": 1.0, "profit_margin": 1.0, "interest_coverage": 1.0},
+    "value": {"pe_ttm": -1.0, "peg_5y": -1.0},
+    "momentum": {"return_3m": 1.0, "return_6m": 1.0, "return_1y": 1.0},
+    "low_risk": {"volatility_1y": -1.0, "beta": -1.0, "debt_to_equity": -1.0},
+}
+
+# Outliers beyond this many standard deviations count as this many, so one extreme value cannot swamp a blend.
+Z_CLIP = 3.0
+
+
+def factor_weights(factors: str = Query(..., description="e.g. quality:0.5,value:0.5 or roe:1,pe_ttm:-1")):
+    """Parse a factor spec into {column: weight}. A preset's weight is split across its columns."""
+    weights = {}
+    for item in factors.split(","):
+        name, _, weight = item.strip().partition(":")
+        if not name:
+            continue
+        try:
+            weight = float(weight) if weight else 1.0
+        except ValueError:
+            raise HTTPException(status_code=400, detail=f"Factor weight must be a number: {item.strip()}")
+        if name in FACTOR_PRESETS:
+            preset = FACTOR_PRESETS[name]
+            members = {c: weight * w / len(preset) for c, w in preset.items()}
+        elif name in FACTOR_COLUMNS:
+            members = {name: weight}
+        else:
+            raise HTTPException(
+                status_code=400,
+                detail=f"Unknown factor {name}; use a numeric screener column or one of: {', '.join(FACTOR_PRESETS)}"
+            )
+        for column, w in members.items():
+            weights[column] = weights.get(column, 0.0) + w
+
+    weights = {c: w for c, w in weights.items() if w != 0 and math.isfinite(w)}
+    if not weights:
+        raise HTTPException(status_code=400, detail="No factors with a non-zero weight")
+    return weights
+
+
+def normalize(values, method):
+    """(scores, stats) for one column; NaN stays NaN."""
+    np, _ = import_arrays()
+    valid = ~np.isnan(values)
+    scores = np.full(len(values), np.nan)
+    count = int(valid.sum())
+    if method == "rank":
+        # Average ranks mapped into (-0.5, 0.5), so 0 is the median like a z-score's mean.
+        order = np.argsort(values[valid], kind="stable")
+        # Ties share the mean of their 1-based ranks.
+        _, starts, counts = np.unique(values[valid][order], return_index=True, return_counts=True)
+        ranks = np.empty(count)
+        ranks[order] = np.repeat(starts + (counts + 1) / 2, counts)
+        scores[valid] = (ranks - 0.5) / count - 0.5
+        return scores, {"count": count}
+    mean = float(values[valid].mean()) if count else math.nan
+    std = float(values[valid].std(ddof=1)) if count > 1 else math.nan
+    if std > 0:
+        scores[valid] = np.clip((values[valid] - mean) / std, -Z_CLIP, Z_CLIP)
+    return scores, {"count": count, "mean": mean, "std": std}
+
+
+class FactorScorer:
+    """Normalized factor columns cached per screener snapshot, and composite top-N selection."""
+
+    def __init__(self, snapshot):
+        self.snapshot = snapshot
+        self.lock = threading.Lock()
+        self.source = None
+        self.normalized = {}
+        self.hits = 0
+        self.misses = 0
+
+    def factor(self, columns, column, method):
+        with self.lock:
+            # The snapshot builds a new columns dict on every reload, which is when the data version changed.
+            if columns is not self.source:
+                self.source = columns
+                self.normalized = {}
+            entry = self.normalized.get((column, method))
+            if entry is not None:
+                self.hits += 1
+                return entry
+            self.misses += 1
+            entry = self.normalized[(column, method)] = normalize(columns[column], method)
+            return entry
+
+    def stats(self):
+        return {"factors": len(self.normalized), "hits": self.hits, "misses": self.misses}
+
+    def score(self, db, weights, method="z", page=1, limit=20, ranges=None, fcf_positive=None,
+              analyst_rating=None, ticker_search=None, sector=None, industry=None):
+        """Tickers passing the screener filters, by descending composite score.
+
+        Factors are normalized over the whole universe, before filtering, so a
+        score means the same thing whatever the filters.
+        """
+        np, _ = import_arrays()
+
+        columns, _, records = self.snapshot.ensure_fresh(db)
+        mask = self.snapshot.filter_mask(columns, ranges, fcf_positive, analyst_rating, ticker_search, sector, industry)
+
+        factors = {c: self.factor(columns, c, method) for c in weights}
+        total = np.zeros(len(records))
+        weight_sum = np.zeros(len(records))
+        for column, weight in weights.items():
+            scores = factors[column][0]
+            present = ~np.isnan(scores)
+            total[present] += weight * scores[present]
+            weight_sum[present] += abs(weight)
+        with np.errstate(invalid="ignore", divide="ignore"):
+            composite = total / weight_sum
+
+        # Tickers with none of the factors have no score and are left out.
+        selected = np.flatnonzero(mask & (weight_sum > 0))
+        keys = -composite[selected]
+        end = min(page * limit, len(selected))
+        if end < len(selected):
+            top = np.argpartition(keys, end - 1)[:end]
+        else:
+            top = np.arange(len(selected))
+        top = top[np.argsort(keys[top], kind="stable")]
+        page_idx = selected[top[(page - 1) * limit:end]]
+
+        coverage = weight_sum / sum(abs(w) for w in weights.values())
+        return {
+            "data": [
+                {
+                    **records[i],
+                    "score": float(composite[i]),
+                    "coverage": float(coverage[i]),
+                    "factor_scores": {c: factors[c][0][i] for c in weights},
+                }
+                for i in page_idx
+            ],
+            "factors": [{"column": c, "weight": w, **factors[c][1]} for c, w in weights.items()],
+            "method": method,
+            "pagination": {
+                "total": len(selected),
+                "page": page,
+                "limit": limit,
+                "total_pages": math.ceil(len(selected) / limit)
+            }
+        }
+
+
+scorer = FactorScorer(screener_engine.screener)
@@ -0,0 +1,179 @@
+"""On-disk cache of raw yfinance payloads (info dicts, statement frames, price history).
+
+Entries are content-addressed: the file name is a hash of (endpoint, ticker,
+params), so the same request always lands on the same file and a rerun after
+a crash, or a re-derivation of ratios, reads from disk instead of the network.
+Each endpoint has its own TTL, checked against the file's modification time.
+"""
+import hashlib
+import json
+import os
+import pickle
+import tempfile
+import threading
+import time
+
+SCRAPE_CACHE_DIR = os.getenv("SCRAPE_CACHE_DIR", ".scrape_cache")
+
+HOUR = 3600
+DAY = 24 * HOUR
+
+# Statements change quarterly; info and prices move during the trading day.
+DEFAULT_TTLS = {
+    "info": 6 * HOUR,
+    "history": 6 * HOUR,
+    "financials": 7 * DAY,
+    "cash_flow": 7 * DAY,
+    "quarterly_income_stmt": 7 * DAY,
+    "quarterly_balance_sheet": 7 * DAY,
+    "quarterly_cashflow": 7 * DAY,
+}
+
+
+def has_data(payload):
+    """False for None and empty payloads, which yfinance returns when rate limited as well as for unknown tickers."""
+    if payload is None:
+        return False
+    # DataFrames and Series; their truth value is ambiguous.
+    empty = getattr(payload, "empty", None)
+    if isinstance(empty, bool):
+        return not empty
+    try:
+        return len(payload) > 0
+    except TypeError:
+        return True
+
+
+class ScrapeCache:
+    def __init__(self, root=SCRAPE_CACHE_DIR, ttls=None, default_ttl=DAY):
+        self.root = root
+        self.ttls = {**DEFAULT_TTLS, **(ttls or {})}
+        self.default_ttl = default_ttl
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.expired = 0
+        self.writes = 0
+        self.skipped = 0
+
+    @staticmethod
+    def key(endpoint, ticker, params=None):
+        raw = json.dumps([endpoint, ticker.upper(), params or {}], sort_keys=True, default=str)
+        return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+    def path(self, endpoint, key):
+        return os.path.join(self.root, endpoint, key[:2], key + ".pkl")
+
+    def _count(self, counter):
+        with self.lock:
+            setattr(self, counter, getattr(self, counter) + 1)
+
+    def get(self, endpoint, ticker, params=None):
+        """Return (found, payload); expired or unreadable entries count as misses."""
+        path = self.path(endpoint, self.key(endpoint, ticker, params))
+        try:
+            age = time.time() - os.path.getmtime(path)
+        except OSError:
+            self._count("misses")
+            return False, None
+
+        if age > self.ttls.get(endpoint, self.default_ttl):
+            self._count("expired")
+            self._count("misses")
+            return False, None
+
+        try:
+            with open(path, "rb") as f:
+                payload = pickle.load(f)
+        except Exception:
+            self._count("misses")
+            return False, None
+
+        self._count("hits")
+        return True, payload
+
+    def set(self, endpoint, ticker, payload, params=None):
+        path = self.path(endpoint, self.key(endpoint, ticker, params))
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        # Written to a temp file and renamed so concurrent readers never see a partial entry.
+        fd, tmp = tempfile.mkstemp(dir=os.path.dirname(path), suffix=".tmp")
+        with os.fdopen(fd, "wb") as f:
+            pickle.dump(payload, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp, path)
+        self._count("writes")
+
+    def fetch(self, endpoint, ticker, loader, params=None, cacheable=has_data):
+        """Return the cached payload, or call `loader()` and cache what it returns.
+
+        Exceptions from `loader` propagate and nothing is cached. Neither is a payload
+        that fails `cacheable`, so an empty rate-limited response is refetched next run
+        instead of being served for the whole TTL.
+        """
+        found, payload = self.get(endpoint, ticker, params)
+        if found:
+            return payload
+        payload = loader()
+        if cacheable(payload):
+            self.set(endpoint, ticker, payload, params)
+        else:
+            self._count("skipped")
+        return payload
+
+    def size(self):
+        files = 0
+        total = 0
+        for dirpath, _, filenames in os.walk(self.root):
+            for name in filenames:
+                if name.endswith(".pkl"):
+                    files += 1
+                    total += os.path.getsize(os.path.join(dirpath, name))
+        return files, total
+
+    def prune(self):
+        """Delete expired entries; returns how many were removed."""
+        removed = 0
+        now = time.time()
+        for dirpath, _, filenames in os.walk(self.root):
+            endpoint = os.path.basename(os.path.dirname(dirpath))
+            ttl = self.ttls.get(endpoint, self.default_ttl)
+            for name in filenames:
+                path = os.path.join(dirpath, name)
+                if name.endswith(".tmp") or now - os.path.getmtime(path) > ttl:
+                    os.remove(path)
+                    removed += 1
+        return removed
+
+    def stats(self):
+        files, total = self.size()
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "expired": self.expired,
+            "writes": self.writes,
+            "skipped": self.skipped,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+            "files": files,
+            "bytes": total,
+        }
+
+    def report(self):
+        s = self.stats()
+        return (
+            f"Scrape cache: {s['hits']} hits / {s['misses']} misses ({s['hit_rate']:.1%} hit rate), "
+            f"{s['expired']} expired, {s['skipped']} empty not cached, {s['files']} files, {s['bytes'] / 1e6:.1f} MB in {self.root}"
+        )
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Inspect or prune the scraper's on-disk payload cache.")
+    parser.add_argument("--dir", default=SCRAPE_CACHE_DIR)
+    parser.add_argument("--prune", action="store_true", help="Delete expired entries")
+    args = parser.parse_args()
+
+    cache = ScrapeCache(args.dir)
+    if args.prune:
+        print(f"Removed {cache.prune()} expired entries")
+    print(cache.report())
@@ -0,0 +1,242 @@
+import math
+import os
+import threading
+import time
+
+from sqlalchemy import Float, Integer, func, null
+
+from models import INDICATOR_COLUMNS, PEER_RANK_COLUMNS, DataVersion, Fundamental, Indicator, PeerRank
+
+FUNDAMENTAL_COLUMNS = [c.name for c in Fundamental.__table__.columns]
+# Fundamentals plus the precomputed indicators and peer ranks joined on ticker; all of these can be filtered and sorted.
+SCREENER_COLUMNS = FUNDAMENTAL_COLUMNS + INDICATOR_COLUMNS + PEER_RANK_COLUMNS
+# Derived from the latest data only, so NULL for a point-in-time source.
+LATEST_ONLY_COLUMNS = INDICATOR_COLUMNS + PEER_RANK_COLUMNS
+
+
+def import_arrays():
+    """(numpy, pandas), imported on first use so a process on the SQL screener never loads them."""
+    import numpy as np
+    import pandas as pd
+
+    return np, pd
+
+
+def screener_column(name, source=Fundamental):
+    if name in FUNDAMENTAL_COLUMNS:
+        return getattr(source, name)
+    return getattr(Indicator if name in INDICATOR_COLUMNS else PeerRank, name)
+
+
+def screener_statement(builder, source=Fundamental):
+    """Fundamentals outer-joined with indicators and peer ranks, from `db.query` or `select`.
+
+    `source` may be a point-in-time alias from fundamental_history.as_of_source();
+    indicators and peer ranks only describe the latest data, so they come back NULL for it.
+    """
+    if source is not Fundamental:
+        return builder(*[getattr(source, c) for c in FUNDAMENTAL_COLUMNS], *[null().label(c) for c in LATEST_ONLY_COLUMNS])
+    return (
+        builder(*[screener_column(c) for c in SCREENER_COLUMNS])
+        .outerjoin(Indicator, Indicator.ticker == Fundamental.ticker)
+        .outerjoin(PeerRank, PeerRank.ticker == Fundamental.ticker)
+    )
+
+
+# Taken from the column types, since a column that is NULL in every row loads with object dtype.
+NUMERIC_COLUMNS = {c for c in SCREENER_COLUMNS if isinstance(screener_column(c).type, (Float, Integer))}
+
+
+class ScreenerSnapshot:
+    """Columnar in-process copy of the latest fundamentals row per ticker, with its indicators and peer ranks.
+
+    Filters are evaluated as NumPy boolean masks over the whole table, so a
+    screener request costs no database round trip. The snapshot checks the
+    tables' version (row counts, max id, latest dates, data version) at most every
+    `check_interval` seconds and reloads when it changed. NumPy and pandas are
+    imported on first use (import_arrays), so the SQL screener never loads them.
+    """
+
+    def __init__(self, check_interval=30.0):
+        self.check_interval = check_interval
+        # (columns, sort_keys, records) from one load, swapped as a whole so a request never mixes two loads.
+        self.state = None
+        self.version = None
+        self.checked_at = 0.0
+        self.reloading = False
+        self.lock = threading.Lock()
+
+    @staticmethod
+    def current_version(db):
+        count, max_id, max_date = db.query(
+            func.count(Fundamental.id), func.max(Fundamental.id), func.max(Fundamental.snapshot_date)
+        ).one()
+        indicator_count, max_as_of = db.query(func.count(Indicator.ticker), func.max(Indicator.as_of)).one()
+        # Latest rows are updated in place, so the writers' data version is part of the key too.
+        data_version = db.query(DataVersion.version).filter(DataVersion.id == 1).scalar()
+        return (count, max_id, max_date, indicator_count, max_as_of, data_version)
+
+    @staticmethod
+    def load_frame(db):
+        _, pd = import_arrays()
+        rows = screener_statement(db.query).all()
+        frame = pd.DataFrame(rows, columns=SCREENER_COLUMNS)
+        if not frame.empty:
+            frame = (
+                frame.sort_values(["ticker", "snapshot_date", "id"])
+                .drop_duplicates("ticker", keep="last")
+                .reset_index(drop=True)
+            )
+        return frame
+
+    def load(self, db):
+        return self.build(self.load_frame(db))
+
+    @staticmethod
+    def build(frame):
+        np, pd = import_arrays()
+        frame = frame.replace([np.inf, -np.inf], np.nan)
+
+        columns = {}
+        sort_keys = {}
+        for c in SCREENER_COLUMNS:
+            series = frame[c]
+            if c in NUMERIC_COLUMNS:
+                series = pd.to_numeric(series)
+                columns[c] = series.to_numpy(dtype=float, na_value=np.nan)
+            else:
+                columns[c] = series.to_numpy(dtype=object)
+            # Dense ranks give every column (numeric, text, date, bool) a float sort key with NaN for NULL.
+            sort_keys[c] = series.rank(method="dense").to_numpy(dtype=float, na_value=np.nan)
+        columns["ticker_lower"] = frame["ticker"].fillna("").str.lower().to_numpy(dtype=str)
+
+        # Rows are pre-cleaned once per load so requests only pick from this list.
+        records = frame.astype(object).where(frame.notna(), None).to_dict("records")
+        return columns, sort_keys, records
+
+    def refresh(self, db):
+        # The lock only guards the swap, never the queries, so concurrent requests keep serving the
+        # current state while one of them reloads.
+        with self.lock:
+            if self.reloading and self.state is not None:
+                # Another request is already checking; serve the current data meanwhile.
+                return
+            self.reloading = True
+        try:
+            version = self.current_version(db)
+            loaded = self.load(db) if self.state is None or version != self.version else None
+        except BaseException:
+            with self.lock:
+                self.reloading = False
+            raise
+        with self.lock:
+            if loaded is not None:
+                self.state = loaded
+                self.version = version
+            self.checked_at = time.monotonic()
+            self.reloading = False
+
+    def load_snapshot(self, path):
+        """Warm-start from a columnar snapshot (see snapshots.py) without querying the database.
+
+        The database version is still checked once `check_interval` has elapsed.
+        """
+        from snapshots import load_snapshot
+
+        np, _ = import_arrays()
+
+        fundamentals, _ = load_snapshot(path)
+        # Columns added after the snapshot was written stay empty.
+        frame = fundamentals.to_frame([c for c in FUNDAMENTAL_COLUMNS if c != "id" and c in fundamentals.types])
+        frame.insert(0, "id", np.arange(1, len(frame) + 1))
+        # Snapshots carry no indicators; those columns stay empty until the first version check.
+        loaded = self.build(frame.reindex(columns=SCREENER_COLUMNS))
+        with self.lock:
+            self.state = loaded
+            self.version = None
+            self.checked_at = time.monotonic()
+
+    def invalidate(self):
+        self.checked_at = 0.0
+        self.version = None
+
+    def ensure_fresh(self, db):
+        """(columns, sort_keys, records), reloaded first if due for a version check."""
+        if self.state is None or time.monotonic() - self.checked_at >= self.check_interval:
+            self.refresh(db)
+        return self.state
+
+    @staticmethod
+    def filter_mask(columns, ranges=None, fcf_positive=None, analyst_rating=None, ticker_search=None,
+                    sector=None, industry=None):
+        """Boolean mask of the rows passing the screener filters."""
+        np, _ = import_arrays()
+        mask = np.ones(len(columns["ticker_lower"]), dtype=bool)
+
+        for column, (low, high) in (ranges or {}).items():
+            values = columns[column]
+            # NaN compares False, which matches SQL's handling of NULL in >= / <=.
+            if low is not None:
+                mask &= values >= low
+            if high is not None:
+                mask &= values <= high
+
+        if fcf_positive is not None:
+            mask &= columns["free_cash_flow_positive"] == fcf_positive
+
+        if analyst_rating:
+            mask &= np.isin(columns["analyst_rating_label"], analyst_rating)
+
+        if ticker_search:
+            mask &= np.char.find(columns["ticker_lower"], ticker_search.lower()) >= 0
+
+        if sector:
+            mask &= columns["sector"] == sector
+
+        if industry:
+            mask &= columns["industry"] == industry
+
+        return mask
+
+    def query(self, db, ranges=None, fcf_positive=None, analyst_rating=None, ticker_search=None,
+              sector=None, industry=None, page=1, limit=20, sort_by="market_cap", sort_order="desc"):
+        """Mirror of the SQL screener in stockendpoint.get_fundamentals.
+
+        `ranges` maps a column name to a (min, max) tuple where either bound may be None;
+        `analyst_rating` is a list of RATING_LABELS.
+        """
+        np, _ = import_arrays()
+        columns, sort_keys, records = self.ensure_fresh(db)
+        mask = self.filter_mask(columns, ranges, fcf_positive, analyst_rating, ticker_search, sector, industry)
+
+        if sort_by not in SCREENER_COLUMNS:
+            sort_by, sort_order = "market_cap", "desc"
+        selected = np.flatnonzero(mask)
+        keys = sort_keys[sort_by][selected]
+        # argsort puts NaN last in both directions because -NaN is still NaN.
+        order = np.argsort(keys if sort_order == "asc" else -keys, kind="stable")
+
+        total_records = len(selected)
+        offset = (page - 1) * limit
+        page_idx = selected[order[offset:offset + limit]]
+
+        return {
+            "data": [records[i] for i in page_idx],
+            "pagination": {
+                "total": total_records,
+                "page": page,
+                "limit": limit,
+                "total_pages": math.ceil(total_records / limit)
+            }
+        }
+
+
+screener = ScreenerSnapshot(check_interval=float(os.getenv("SCREENER_CHECK_INTERVAL", "30")))
+enabled = os.getenv("SCREENER_ENGINE", "sql").lower() == "memory"
+
+
+def warm_start():
+    """Load SCREENER_SNAPSHOT into the memory screener when both are configured; called by create_app()."""
+    path = os.getenv("SCREENER_SNAPSHOT")
+    if enabled and path:
+        screener.load_snapshot(path)
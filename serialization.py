@@ -0,0 +1,134 @@
+import json
+import math
+from datetime import date, datetime
+
+from fastapi import Response
+
+try:
+    import orjson
+except ImportError:  # optional speedup; the stdlib path produces the same JSON
+    orjson = None
+
+
+def _default(obj):
+    if isinstance(obj, (date, datetime)):
+        return obj.isoformat()
+    if hasattr(obj, "item"):  # NumPy scalars
+        return obj.item()
+    raise TypeError(f"Object of type {type(obj).__name__} is not JSON serializable")
+
+
+def _finite(value):
+    if isinstance(value, float) and (math.isnan(value) or math.isinf(value)):
+        return None
+    return value
+
+
+def _sanitize(payload):
+    # Only the stdlib fallback needs this: orjson already writes NaN/inf as null.
+    # Payloads are rows, lists of rows, or {"data": [rows], ...}, so floats sit at most two levels down.
+    if isinstance(payload, dict):
+        return {k: _sanitize(v) if isinstance(v, (dict, list)) else _finite(v) for k, v in payload.items()}
+    if isinstance(payload, list):
+        return [_sanitize(v) if isinstance(v, (dict, list)) else _finite(v) for v in payload]
+    return _finite(payload)
+
+
+def dumps(payload):
+    """Encode a response payload to JSON bytes, with NaN/inf written as null."""
+    if orjson is not None:
+        return orjson.dumps(payload, default=_default, option=orjson.OPT_SERIALIZE_NUMPY)
+    return json.dumps(
+        _sanitize(payload), default=_default, ensure_ascii=False, allow_nan=False, separators=(",", ":")
+    ).encode("utf-8")
+
+
+def json_response(payload, status_code=200, headers=None):
+    """Pre-encoded JSON response that bypasses FastAPI's jsonable_encoder."""
+    return Response(content=dumps(payload), status_code=status_code, headers=headers, media_type="application/json")
+
+
+if __name__ == "__main__":
+    import argparse
+    import os
+    import tempfile
+    import time
+
+    parser = argparse.ArgumentParser(description="Time response encoding and request latency for history and screener pages.")
+    parser.add_argument("--repeat", type=int, default=200)
+    args = parser.parse_args()
+
+    db_path = os.path.join(tempfile.mkdtemp(), "bench.db")
+    os.environ["DATABASE_URL"] = f"sqlite:///{db_path}"
+
+    from fastapi.encoders import jsonable_encoder
+    from fastapi.testclient import TestClient
+
+    import models
+    models.engine.echo = False
+    from bulk_loader import price_rows, load_price_history
+    from fetch_engine import StubScraper
+    from migrations import upgrade
+    from models import Fundamental, SessionLocal, Stock
+    from response_cache import response_cache
+    from stockendpoint import app
+
+    def legacy_clean_nans(data):
+        if isinstance(data, float):
+            return None if math.isnan(data) or math.isinf(data) else data
+        if isinstance(data, dict):
+            return {k: legacy_clean_nans(v) for k, v in data.items()}
+        if isinstance(data, list):
+            return [legacy_clean_nans(v) for v in data]
+        return data
+
+    def legacy_encode(payload):
+        return json.dumps(jsonable_encoder(legacy_clean_nans(payload)), ensure_ascii=False,
+                          allow_nan=False, separators=(",", ":")).encode("utf-8")
+
+    upgrade(models.engine)
+    StubScraper.latency = 0
+    db = SessionLocal()
+    symbols = [f"T{i:03d}" for i in range(120)]
+    for s in symbols:
+        scraper = StubScraper(s)
+        data = scraper.getFundamentals()
+        db.add(Stock(ticker=s, company_name=data["company_name"]))
+        db.add(Fundamental(ticker=s, snapshot_date=data["snapshot_date"], market_cap=data["market_cap"],
+                           pe_ttm=data["P/E TTM"], profit_margin=float("nan"), roe=data["roe"]))
+    db.flush()
+    load_price_history(db, price_rows(symbols[0], StubScraper(symbols[0]).getPriceHistory()))
+    db.commit()
+    db.close()
+
+    client = TestClient(app)
+    cases = {
+        "history_1y": f"/api/stock/{symbols[0]}/price-history?period=1Y",
+        "history_5y": f"/api/stock/{symbols[0]}/price-history?period=5Y",
+        "screener_100": "/api/fundamentals?limit=100",
+    }
+    print(f"Encoder: {'orjson' if orjson is not None else 'stdlib json'}")
+    for name, url in cases.items():
+        payload = json.loads(client.get(url).content)
+        if isinstance(payload, dict):
+            payload["data"] = [dict(r, profit_margin=float("nan")) for r in payload["data"]]
+
+        start = time.perf_counter()
+        for _ in range(args.repeat):
+            legacy_encode(payload)
+        legacy = (time.perf_counter() - start) / args.repeat
+
+        start = time.perf_counter()
+        for _ in range(args.repeat):
+            dumps(payload)
+        fast = (time.perf_counter() - start) / args.repeat
+
+        # The cached history endpoints are timed on a cache miss each round.
+        start = time.perf_counter()
+        for _ in range(args.repeat // 4):
+            response_cache.clear()
+            client.get(url)
+        latency = (time.perf_counter() - start) / (args.repeat // 4)
+
+        print(f"{name}: encode {legacy * 1000:.3f}ms -> {fast * 1000:.3f}ms ({legacy / fast:.1f}x), "
+              f"request {latency * 1000:.2f}ms")
@@ -0,0 +1,237 @@
+"""Dated columnar snapshots of fundamentals and price history.
+
+Each table is a directory holding one ``.npy`` file per column plus a
+``schema.json`` sidecar, e.g. ``snapshots/2025-10-02/price_history/close_price.npy``.
+Columns are fixed-width NumPy arrays (no object dtype), so they can be
+memory-mapped and are only read when first accessed.
+"""
+import json
+import os
+from datetime import date
+
+import numpy as np
+import pandas as pd
+
+from bulk_loader import load_price_history, update_stock_groups, upsert_stocks
+from fundamental_history import PARSED_COLUMNS, PARSED_FIELDS, append_snapshots, parsed_fields
+from peer_ranks import update_peer_ranks
+from models import FUNDAMENTAL_FIELDS, Fundamental, PriceHistory, Stock
+from response_cache import bump_data_version
+
+SNAPSHOT_ROOT = os.getenv("SNAPSHOT_ROOT", "snapshots")
+
+
+def _logical_type(column):
+    name = type(column.type).__name__
+    return {"Float": "float", "Integer": "int", "Boolean": "bool", "Date": "date"}.get(name, "str")
+
+
+FUNDAMENTAL_TYPES = {c.name: _logical_type(c) for c in Fundamental.__table__.columns if c.name != "id"}
+STOCK_COLUMNS = ["company_name", "sector", "industry"]
+FUNDAMENTAL_TYPES.update({c: "str" for c in STOCK_COLUMNS})
+PRICE_TYPES = {c.name: _logical_type(c) for c in PriceHistory.__table__.columns if c.name != "id"}
+
+
+def _to_array(series, logical_type):
+    if logical_type == "float":
+        return pd.to_numeric(series, errors="coerce").to_numpy(dtype=np.float64, na_value=np.nan)
+    if logical_type == "int":
+        return pd.to_numeric(series, errors="coerce").fillna(0).to_numpy(dtype=np.int64)
+    if logical_type == "bool":
+        # Nullable bool: 1 / 0 / -1 for NULL.
+        return series.map({True: 1, False: 0, "True": 1, "False": 0}).fillna(-1).to_numpy(dtype=np.int8)
+    if logical_type == "date":
+        return pd.to_datetime(series, errors="coerce").to_numpy(dtype="datetime64[D]")
+    return series.fillna("").astype(str).to_numpy(dtype=str)
+
+
+def _from_array(array, logical_type):
+    if logical_type == "bool":
+        return pd.Series(array).map({1: True, 0: False, -1: None})
+    if logical_type == "date":
+        return pd.Series(pd.to_datetime(array)).dt.date.where(~np.isnat(array), None)
+    if logical_type == "str":
+        return pd.Series(array).replace("", None)
+    return pd.Series(array)
+
+
+def write_table(path, frame, types):
+    os.makedirs(path, exist_ok=True)
+    for column, logical_type in types.items():
+        np.save(os.path.join(path, f"{column}.npy"), _to_array(frame[column], logical_type))
+    with open(os.path.join(path, "schema.json"), "w") as f:
+        json.dump({"rows": len(frame), "columns": types}, f, indent=2)
+
+
+class SnapshotTable:
+    """Lazily loaded snapshot table; columns are memory-mapped on first access."""
+
+    def __init__(self, path, mmap=True):
+        self.path = path
+        self.mmap_mode = "r" if mmap else None
+        with open(os.path.join(path, "schema.json")) as f:
+            schema = json.load(f)
+        self.rows = schema["rows"]
+        self.types = schema["columns"]
+        self.arrays = {}
+
+    def __len__(self):
+        return self.rows
+
+    def __getitem__(self, column):
+        if column not in self.arrays:
+            self.arrays[column] = np.load(os.path.join(self.path, f"{column}.npy"), mmap_mode=self.mmap_mode)
+        return self.arrays[column]
+
+    def to_frame(self, columns=None):
+        columns = columns or list(self.types)
+        return pd.DataFrame({c: _from_array(self[c], self.types[c]) for c in columns})
+
+
+class PriceSnapshot(SnapshotTable):
+    """Price history sorted by (ticker, date) with per-ticker offsets for O(log n) slicing."""
+
+    def __init__(self, path, mmap=True):
+        super().__init__(path, mmap)
+        # Sorted, as written by np.unique, so a ticker's offset is a binary search away.
+        self.tickers = np.load(os.path.join(path, "index_tickers.npy"))
+        self.offsets = np.load(os.path.join(path, "index_offsets.npy"))
+
+    def ticker_slice(self, ticker):
+        i = int(np.searchsorted(self.tickers, ticker))
+        if i == len(self.tickers) or self.tickers[i] != ticker:
+            raise KeyError(ticker)
+        return slice(int(self.offsets[i]), int(self.offsets[i + 1]))
+
+
+def _add_parsed_columns(frame):
+    parsed = [parsed_fields(r) for r in frame[list(PARSED_COLUMNS) + ["current_price"]].to_dict("records")]
+    for column in PARSED_FIELDS:
+        frame[column] = [p[column] for p in parsed]
+    return frame
+
+
+def fundamentals_frame(records):
+    """Normalize scraper/CSV records (FUNDAMENTAL_FIELDS keys) to typed snapshot columns."""
+    frame = pd.DataFrame(records).rename(columns=FUNDAMENTAL_FIELDS)
+    for raw in list(PARSED_COLUMNS) + ["current_price"]:
+        if raw not in frame:
+            frame[raw] = None
+    _add_parsed_columns(frame)
+    for column in FUNDAMENTAL_TYPES:
+        if column not in frame:
+            frame[column] = None
+    return frame
+
+
+def write_snapshot(fundamentals, price_history=None, snapshot_date=None, root=SNAPSHOT_ROOT):
+    """Write a dated snapshot directory and return its path.
+
+    `fundamentals` is a frame from fundamentals_frame(); `price_history` has PriceHistory columns.
+    """
+    path = os.path.join(root, (snapshot_date or date.today()).isoformat())
+    write_table(os.path.join(path, "fundamentals"), fundamentals, FUNDAMENTAL_TYPES)
+
+    if price_history is not None:
+        prices = price_history.sort_values(["ticker", "date"], kind="stable").reset_index(drop=True)
+        table_path = os.path.join(path, "price_history")
+        write_table(table_path, prices, PRICE_TYPES)
+        tickers, starts = np.unique(prices["ticker"].to_numpy(dtype=str), return_index=True)
+        offsets = np.append(starts, len(prices)).astype(np.int64)
+        np.save(os.path.join(table_path, "index_tickers.npy"), tickers)
+        np.save(os.path.join(table_path, "index_offsets.npy"), offsets)
+    return path
+
+
+def latest_snapshot(root=SNAPSHOT_ROOT):
+    dated = sorted(d for d in os.listdir(root) if os.path.isdir(os.path.join(root, d))) if os.path.isdir(root) else []
+    return os.path.join(root, dated[-1]) if dated else None
+
+
+def load_snapshot(path, mmap=True):
+    fundamentals = SnapshotTable(os.path.join(path, "fundamentals"), mmap)
+    price_path = os.path.join(path, "price_history")
+    price_history = PriceSnapshot(price_path, mmap) if os.path.isdir(price_path) else None
+    return fundamentals, price_history
+
+
+def export_from_db(db, snapshot_date=None, root=SNAPSHOT_ROOT):
+    query = db.query(Fundamental, Stock.company_name, Stock.sector, Stock.industry).outerjoin(Stock, Stock.ticker == Fundamental.ticker)
+    fundamentals = _add_parsed_columns(pd.read_sql(query.statement, db.connection()))
+    prices = pd.read_sql(db.query(PriceHistory).statement, db.connection())
+    return write_snapshot(fundamentals, prices, snapshot_date, root)
+
+
+def seed_database(db, path):
+    """Append a snapshot's fundamentals to the history, replace its tickers' price history and re-rank peers.
+
+    Commits when bumping the data version, so cached API responses are invalidated.
+    """
+    fundamentals, price_history = load_snapshot(path)
+    db_columns = [c.name for c in Fundamental.__table__.columns if c.name != "id"]
+    # Snapshots written before sector and industry were captured lack those columns.
+    stock_columns = [c for c in STOCK_COLUMNS if c in fundamentals.types]
+    frame = fundamentals.to_frame(db_columns + stock_columns)
+    frame = frame.astype(object).where(frame.notna(), None)
+
+    stock_rows = frame[["ticker"] + stock_columns].to_dict("records")
+    upsert_stocks(db, stock_rows)
+    update_stock_groups(db, stock_rows)
+    append_snapshots(db, frame[db_columns].to_dict("records"))
+    update_peer_ranks(db)
+
+    stats = None
+    if price_history is not None:
+        db.query(PriceHistory).filter(PriceHistory.ticker.in_(price_history.tickers.tolist())).delete(synchronize_session=False)
+        stats = load_price_history(db, price_history.to_frame().to_dict("records"))
+    bump_data_version(db)
+    return len(frame), stats
+
+
+def export_from_csv(csv_path="Fundamentals.csv", snapshot_date=None, root=SNAPSHOT_ROOT):
+    return write_snapshot(fundamentals_frame(pd.read_csv(csv_path)), None, snapshot_date, root)
+
+
+if __name__ == "__main__":
+    import argparse
+    import time
+
+    parser = argparse.ArgumentParser(description="Export or inspect columnar snapshots.")
+    parser.add_argument("command", choices=["export-db", "export-csv", "inspect", "seed"])
+    parser.add_argument("--csv", default="Fundamentals.csv")
+    parser.add_argument("--root", default=SNAPSHOT_ROOT)
+    parser.add_argument("--path", help="Snapshot directory for inspect/seed (default: latest)")
+    args = parser.parse_args()
+
+    if args.command == "export-db":
+        from models import SessionLocal
+
+        db = SessionLocal()
+        try:
+            print(f"Wrote {export_from_db(db, root=args.root)}")
+        finally:
+            db.close()
+    elif args.command == "seed":
+        from models import SessionLocal
+
+        path = args.path or latest_snapshot(args.root)
+        db = SessionLocal()
+        try:
+            start = time.perf_counter()
+            count, stats = seed_database(db, path)
+            print(f"Seeded {count} tickers from {path} in {time.perf_counter() - start:.2f}s")
+            if stats:
+                print(f"price_history: {stats['rows']} rows ({stats['rows_per_sec']:,.0f} rows/sec)")
+        finally:
+            db.close()
+    elif args.command == "export-csv":
+        print(f"Wrote {export_from_csv(args.csv, root=args.root)}")
+    else:
+        path = args.path or latest_snapshot(args.root)
+        start = time.perf_counter()
+        fundamentals, price_history = load_snapshot(path)
+        frame = fundamentals.to_frame()
+        elapsed = time.perf_counter() - start
+        print(f"{path}: {len(fundamentals)} fundamentals rows loaded in {elapsed * 1000:.1f}ms")
+        if price_history is not None:
+            print(f"price_history: {len(price_history)} rows, {len(price_history.tickers)} tickers")
@@ -313,7 +313,8 @@ const TopFilterBar = ({ filters, setFilters }) => {
         onChange={(v) => handleFilterChange({ analyst_rating: v })}
         options={[
           { label: 'Strong Buy', value: 'Strong Buy' },
-          { label: 'Buy', value: 'Buy' },
+          // Labels match exactly on the API, so "Buy" has to ask for Strong Buy as well.
+          { label: 'Buy', value: 'Strong Buy,Buy' },
           { label: 'Hold', value: 'Hold' },
         ]}
       />
@@ -443,7 +444,7 @@ const ScreenerView = () => {
                   <SortHeader label="Rev Growth" field="revenue_growth_yoy" currentSort={sort} onSort={handleSort} />
                   <SortHeader label="Profit Margin" field="profit_margin" currentSort={sort} onSort={handleSort} />
                   <SortHeader label="1Y Perf" field="perf_1y" currentSort={sort} onSort={handleSort} />
-                  <SortHeader label="Rating" field="analyst_rating" currentSort={sort} onSort={handleSort} />
+                  <SortHeader label="Rating" field="analyst_rating_score" currentSort={sort} onSort={handleSort} />
                 </tr>
               </thead>
               <tbody>
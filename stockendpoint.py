@@ -1,24 +1,31 @@
-from fastapi import FastAPI, Query, HTTPException, Depends
+from fastapi import APIRouter, FastAPI, Query, HTTPException, Depends, Request
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import RedirectResponse
+from fastapi.responses import PlainTextResponse, RedirectResponse
 from sqlalchemy.orm import Session
-from sqlalchemy import create_engine, desc, asc
-from sqlalchemy.orm import sessionmaker
-from models import Stock, Fundamental, SessionLocal, PriceHistory
+from models import Stock, Fundamental, SessionLocal
+import screener_engine
+from queries import (
+    SCREENER_COLUMNS, screener_params, screener_statement, apply_screener_filters, screener_order,
+    fundamental_dict, screener_dict, price_history_statement, price_history_rows,
+    screener_source, batch_tickers, stock_detail_statement, stock_details, price_history_batch_statement, aligned_price_series
+)
+from response_cache import response_cache, cached_response
+from serialization import json_response
+from keyset import keyset_page
+from instrumentation import InstrumentationMiddleware, instrument_sqlalchemy, render_metrics, sample
+from scoring import factor_weights, scorer
+from exports import (
+    export_format, export_period, export_response, export_tickers, price_export_statement, screener_export_statement
+)
 import math
-from typing import List, Optional, Dict, Any
-from datetime import datetime, timedelta
+from datetime import date
+import os
+import sys
+from typing import Optional
 
 
-app = FastAPI()
-
-app.add_middleware(
-    CORSMiddleware,
-    allow_origins=["*"],
-    allow_credentials=True,
-    allow_methods=["*"],
-    allow_headers=["*"],
-)
+# Routes are registered on a router; create_app() assembles the app with its middleware.
+router = APIRouter()
 
 def get_db():
     db = SessionLocal()
@@ -27,166 +34,263 @@ def get_db():
     finally:
         db.close()
 
-def clean_nans(data: Any) -> Any:
-    if isinstance(data, float):
-        if math.isnan(data) or math.isinf(data):
-            return None
-        return data
-    elif isinstance(data, dict):
-        return {k: clean_nans(v) for k, v in data.items()}
-    elif isinstance(data, list):
-        return [clean_nans(v) for v in data]
-    elif hasattr(data, "__dict__"):
-        return clean_nans(data.__dict__)
-    return data
-
-@app.get("/")
+@router.get("/")
 def read_root():
     return RedirectResponse(url="/docs")
 
-@app.get("/health")
+@router.get("/health")
 def health_check():
     return {"status": "ok", "message": "StockAg API is running"}
 
-@app.get("/api/fundamentals")
+@router.get("/api/fundamentals")
 def get_fundamentals(
-    min_market_cap: float = Query(None),
-    max_market_cap: float = Query(None),
-    min_pe: float = Query(None),
-    max_pe: float = Query(None),
-    min_growth: float = Query(None, alias="min_revenue_growth"),
-    max_growth: float = Query(None, alias="max_revenue_growth"),
-    min_profit_margin: float = Query(None),
-    max_profit_margin: float = Query(None),
-    min_perf_1y: float = Query(None),
-    max_perf_1y: float = Query(None),
-    fcf_positive: bool = Query(None),
-    analyst_rating: str = Query(None),
-    ticker_search: str = Query(None),
-    page: int = Query(1, ge=1),
-    limit: int = Query(20, ge=1, le=100),
-    sort_by: str = Query("market_cap"),
-    sort_order: str = Query("desc"),
+    params: dict = Depends(screener_params),
+    pagination: str = Query("offset", pattern="^(offset|cursor)$"),
+    cursor: Optional[str] = Query(None),
+    include_total: bool = Query(False),
+    as_of: Optional[date] = Query(None, description="Screen the fundamentals as they were on this date"),
     db: Session = Depends(get_db)
 ):
-    query = db.query(Fundamental)
-
-    if ticker_search:
-        query = query.filter(Fundamental.ticker.ilike(f"%{ticker_search}%"))
-        
-    if min_market_cap is not None:
-        query = query.filter(Fundamental.market_cap >= min_market_cap)
-    if max_market_cap is not None:
-        query = query.filter(Fundamental.market_cap <= max_market_cap)
-        
-    if min_pe is not None:
-        query = query.filter(Fundamental.pe_ttm >= min_pe)
-    if max_pe is not None:
-        query = query.filter(Fundamental.pe_ttm <= max_pe)
-        
-    if min_growth is not None:
-        query = query.filter(Fundamental.revenue_growth_yoy >= min_growth)
-    if max_growth is not None:
-        query = query.filter(Fundamental.revenue_growth_yoy <= max_growth)
-        
-    if min_profit_margin is not None:
-        query = query.filter(Fundamental.profit_margin >= min_profit_margin)
-    if max_profit_margin is not None:
-        query = query.filter(Fundamental.profit_margin <= max_profit_margin)
-
-    if min_perf_1y is not None:
-        query = query.filter(Fundamental.perf_1y >= min_perf_1y)
-    if max_perf_1y is not None:
-        query = query.filter(Fundamental.perf_1y <= max_perf_1y)
-
-    if fcf_positive is not None:
-        query = query.filter(Fundamental.free_cash_flow_positive == fcf_positive)
-
-    if analyst_rating:
-        query = query.filter(Fundamental.analyst_rating.ilike(f"%{analyst_rating}%"))
-
-    if hasattr(Fundamental, sort_by):
-        col_attr = getattr(Fundamental, sort_by)
-        if sort_order == "asc":
-            query = query.order_by(asc(col_attr))
-        else:
-            query = query.order_by(desc(col_attr))
-    else:
-        query = query.order_by(desc(Fundamental.market_cap))
+    use_cursor = pagination == "cursor" or cursor is not None
+
+    if screener_engine.enabled and not use_cursor and as_of is None:
+        return json_response(screener_engine.screener.query(db, **params))
+
+    page, limit = params["page"], params["limit"]
+    sort_by, sort_order = params["sort_by"], params["sort_order"]
+    source = screener_source(as_of, params)
+
+    query = apply_screener_filters(
+        screener_statement(db.query, source),
+        params["ranges"],
+        params["fcf_positive"],
+        params["analyst_rating"],
+        params["ticker_search"],
+        source,
+        params["sector"],
+        params["industry"],
+    )
+
+    if use_cursor:
+        if sort_by not in SCREENER_COLUMNS:
+            sort_by, sort_order = "market_cap", "desc"
+        try:
+            results, next_cursor, total_records = keyset_page(
+                query, sort_by, sort_order, limit, cursor, include_total, source
+            )
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+
+        return json_response({
+            "data": [screener_dict(r) for r in results],
+            "pagination": {
+                "limit": limit,
+                "next_cursor": next_cursor,
+                "total": total_records
+            }
+        })
+
+    query = query.order_by(screener_order(sort_by, sort_order, source))
 
     total_records = query.count()
     
     offset = (page - 1) * limit
     results = query.offset(offset).limit(limit).all()
 
-    data_clean = []
-    for r in results:
-        r_dict = {k: v for k, v in r.__dict__.items() if not k.startswith('_sa_')}
-        data_clean.append(clean_nans(r_dict))
-
-    return {
-        "data": data_clean,
+    return json_response({
+        "data": [screener_dict(r) for r in results],
         "pagination": {
             "total": total_records,
             "page": page,
             "limit": limit,
             "total_pages": math.ceil(total_records / limit)
         }
-    }
+    })
 
-@app.get("/api/stock/{ticker}")
-def get_stock_detail(ticker: str, db: Session = Depends(get_db)):
-   
-    item = db.query(Fundamental).filter(Fundamental.ticker == ticker.upper()).first()
-    
-    if not item:
-        raise HTTPException(status_code=404, detail="Stock not found")
-    
-    item_dict = {k: v for k, v in item.__dict__.items() if not k.startswith('_sa_')}
-    
-    if item.stock:
-        item_dict['company_name'] = item.stock.company_name
-        
-    return clean_nans(item_dict)
+@router.get("/api/stock/{ticker}")
+def get_stock_detail(ticker: str, request: Request, db: Session = Depends(get_db)):
+
+    def build():
+        # Joined up front; reading item.stock would lazy-load it in a second query.
+        row = db.execute(stock_detail_statement([ticker.upper()]).limit(1)).first()
+
+        if not row:
+            raise HTTPException(status_code=404, detail="Stock not found")
+
+        item, company_name = row
+        item_dict = fundamental_dict(item)
+
+        if company_name is not None:
+            item_dict['company_name'] = company_name
+
+        return item_dict
+
+    return cached_response(response_cache, request, db, build)
 
-@app.get("/api/stocks")
+@router.get("/api/stocks")
 def get_all_tickers(db: Session = Depends(get_db)):
    
     stocks = db.query(Stock.ticker, Stock.company_name).all()
     return [{"ticker": s.ticker, "name": s.company_name} for s in stocks]
 
-@app.get("/api/stock/{ticker}/price-history")
-def get_price_history(ticker: str, period: str = Query("1Y"), db: Session = Depends(get_db)):
-    end_date = datetime.now().date()
-    
-    period_mapping = {
-        "5D": timedelta(days=5),
-        "1M": timedelta(days=30),
-        "6M": timedelta(days=180),
-        "1Y": timedelta(days=365),
-        "5Y": timedelta(days=365 * 5)
-    }
-    
-    delta = period_mapping.get(period.upper(), timedelta(days=365))
-    start_date = end_date - delta
-    
-    price_data = db.query(PriceHistory).filter(
-        PriceHistory.ticker == ticker.upper(),
-        PriceHistory.date >= start_date
-    ).order_by(PriceHistory.date).all()
-    
+@router.get("/api/stocks/details")
+def get_stock_details(request: Request, tickers: list = Depends(batch_tickers), db: Session = Depends(get_db)):
+    # One IN query for the whole batch instead of a request per symbol.
+    return cached_response(
+        response_cache, request, db,
+        lambda: stock_details(db.execute(stock_detail_statement(tickers)).all(), tickers)
+    )
+
+@router.get("/api/stocks/price-history")
+def get_price_histories(
+    request: Request,
+    tickers: list = Depends(batch_tickers),
+    period: str = Query("1Y"),
+    resolution: Optional[str] = Query(None, pattern="(?i)^(d|daily|w|weekly|m|monthly)$"),
+    max_points: Optional[int] = Query(None, ge=3),
+    db: Session = Depends(get_db)
+):
+    return cached_response(
+        response_cache, request, db,
+        lambda: aligned_price_series(
+            db.execute(price_history_batch_statement(tickers, period)).all(), tickers, resolution, max_points
+        )
+    )
+
+@router.get("/api/stock/{ticker}/price-history")
+def get_price_history(
+    ticker: str,
+    request: Request,
+    period: str = Query("1Y"),
+    resolution: Optional[str] = Query(None, pattern="(?i)^(d|daily|w|weekly|m|monthly)$"),
+    max_points: Optional[int] = Query(None, ge=3),
+    db: Session = Depends(get_db)
+):
+    return cached_response(
+        response_cache, request, db,
+        lambda: _price_history_payload(db, ticker, period, resolution, max_points)
+    )
+
+def _price_history_payload(db, ticker, period, resolution=None, max_points=None):
+    price_data = db.execute(price_history_statement(ticker, period)).all()
+
     if not price_data:
         raise HTTPException(status_code=404, detail="No price history found for this stock")
-    
-    result = []
-    for item in price_data:
-        result.append({
-            'date': item.date.isoformat(),
-            'open': item.open_price,
-            'high': item.high_price,
-            'low': item.low_price,
-            'close': item.close_price,
-            'volume': item.volume
-        })
-    
-    return clean_nans(result)
\ No newline at end of file
+
+    return price_history_rows(price_data, resolution, max_points)
+
+@router.get("/api/scores")
+def get_scores(
+    request: Request,
+    weights: dict = Depends(factor_weights),
+    method: str = Query("z", pattern="^(z|rank)$"),
+    params: dict = Depends(screener_params),
+    db: Session = Depends(get_db)
+):
+    # Filters narrow the candidates; factors are normalized over the whole universe. sort_by does not apply.
+    filters = {k: v for k, v in params.items() if k not in ("sort_by", "sort_order")}
+    return cached_response(response_cache, request, db, lambda: scorer.score(db, weights, method, **filters))
+
+@router.get("/api/backtest")
+def get_backtest(
+    request: Request,
+    params: dict = Depends(screener_params),
+    start: Optional[date] = Query(None),
+    end: Optional[date] = Query(None),
+    rebalance: str = Query("M", pattern="^(W|M|Q|A)$"),
+    weighting: str = Query("equal", pattern="^(equal|cap)$"),
+    point_in_time: bool = Query(False, description="Screen each rebalance on the fundamentals as of that date"),
+    max_holdings: Optional[int] = Query(None, ge=1, description="Hold the first N by sort_by"),
+    cost_bps: float = Query(0.0, ge=0),
+    db: Session = Depends(get_db)
+):
+
+    def build():
+        # NumPy and pandas load with the first backtest, not with the app.
+        from backtest import price_matrix, run_backtest
+
+        result = run_backtest(
+            db, price_matrix, params, start, end, rebalance, weighting, point_in_time, max_holdings, cost_bps
+        )
+        if result is None:
+            raise HTTPException(status_code=404, detail="Not enough price history in this range")
+        return result
+
+    return cached_response(response_cache, request, db, build)
+
+@router.get("/api/export/fundamentals")
+def export_fundamentals(
+    request: Request,
+    format: str = Depends(export_format),
+    params: dict = Depends(screener_params),
+    as_of: Optional[date] = Query(None, description="Export the fundamentals as they were on this date"),
+):
+    # Every matching row, streamed; page and limit do not apply.
+    stmt = screener_export_statement(params, screener_source(as_of, params))
+    return export_response(request, stmt, format, "fundamentals")
+
+@router.get("/api/export/price-history")
+def export_price_history(
+    request: Request,
+    format: str = Depends(export_format),
+    tickers: Optional[list] = Depends(export_tickers),
+    period: Optional[str] = Depends(export_period),
+):
+    return export_response(request, price_export_statement(tickers, period), format, "price-history")
+
+@router.get("/api/cache/stats")
+def get_cache_stats():
+    return response_cache.stats()
+
+@router.get("/metrics", include_in_schema=False)
+def get_metrics():
+    cache = response_cache.stats()
+    # Only reported once a backtest has imported the module; /metrics should not load pandas for it.
+    backtest = sys.modules.get("backtest")
+    matrix_tickers = None if backtest is None else backtest.price_matrix.tickers
+    return PlainTextResponse(
+        render_metrics(
+            sample("response_cache_entries", "gauge", "Entries in the response cache.", cache["entries"])
+            + sample("response_cache_hits_total", "counter", "Response cache hits.", cache["hits"])
+            + sample("response_cache_misses_total", "counter", "Response cache misses.", cache["misses"])
+            + sample("factor_cache_hits_total", "counter", "Normalized factors reused by /api/scores.", scorer.hits)
+            + sample("factor_cache_misses_total", "counter", "Factors normalized by /api/scores.", scorer.misses)
+            + sample("price_matrix_tickers", "gauge", "Tickers in the backtest price matrix.",
+                     0 if matrix_tickers is None else len(matrix_tickers))
+        ),
+        media_type="text/plain; version=0.0.4",
+    )
+
+def create_app():
+    """The API app. `uvicorn --factory stockendpoint:create_app` builds one per worker."""
+    app = FastAPI()
+    app.add_middleware(
+        CORSMiddleware,
+        allow_origins=["*"],
+        allow_credentials=True,
+        allow_methods=["*"],
+        allow_headers=["*"],
+        expose_headers=["Server-Timing"],
+    )
+    # Added last so it wraps CORS too and times the whole request.
+    app.add_middleware(InstrumentationMiddleware)
+    instrument_sqlalchemy()
+    screener_engine.warm_start()
+
+    if os.getenv("DB_MODE", "sync").lower() == "async":
+        # Included before the sync routes, so these handlers take precedence.
+        from async_routes import router as async_router
+        app.include_router(async_router)
+    app.include_router(router)
+    return app
+
+_app = None
+
+def __getattr__(name):
+    # `uvicorn stockendpoint:app` and `from stockendpoint import app` build the app on first access.
+    global _app
+    if name == "app":
+        if _app is None:
+            _app = create_app()
+        return _app
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
@@ -0,0 +1,61 @@
+import os
+import sys
+import tempfile
+
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+# Set before the first database access, which is when models reads its settings.
+os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(tempfile.mkdtemp(), 'tests.db')}"
+os.environ["SQL_ECHO"] = "false"
+
+TICKERS = 40
+
+
+@pytest.fixture(scope="session")
+def symbols():
+    """A seeded synthetic database (see benchmarks.dataset), shared by the whole session."""
+    import models
+    from benchmarks.dataset import build_dataset
+    from migrations import upgrade
+
+    upgrade(models.get_engine())
+    db = models.SessionLocal()
+    try:
+        names, _ = build_dataset(db, TICKERS, 1)
+    finally:
+        db.close()
+    return names
+
+
+@pytest.fixture
+def db(symbols):
+    import models
+
+    session = models.SessionLocal()
+    yield session
+    session.close()
+
+
+@pytest.fixture
+def async_app(symbols, monkeypatch):
+    """The app with the async routes mounted and the response cache disabled, so each request reaches the database."""
+    from response_cache import response_cache
+    from stockendpoint import create_app
+
+    monkeypatch.setenv("DB_MODE", "async")
+    monkeypatch.setattr(response_cache, "maxsize", 0)
+    return create_app()
+
+
+@pytest.fixture
+def app(symbols, monkeypatch):
+    """The app with only the sync routes and the response cache disabled."""
+    from response_cache import response_cache
+    from stockendpoint import create_app
+
+    monkeypatch.setenv("DB_MODE", "sync")
+    monkeypatch.setattr(response_cache, "maxsize", 0)
+    return create_app()
@@ -0,0 +1,99 @@
+import asyncio
+import threading
+
+import httpx
+import pytest
+
+import screener_engine
+
+CONCURRENT_REQUESTS = 4
+
+
+def fetch_concurrently(app, url):
+    """Status codes of CONCURRENT_REQUESTS simultaneous GETs of `url`, all served on one event loop."""
+
+    async def run():
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            responses = await asyncio.gather(*[client.get(url) for _ in range(CONCURRENT_REQUESTS)])
+        statuses.extend(r.status_code for r in responses)
+
+    # A deadlock blocks the event loop's own thread, so the loop runs in a daemon thread the test can give up on.
+    statuses = []
+    thread = threading.Thread(target=asyncio.run, args=(run(),), daemon=True)
+    thread.start()
+    thread.join(timeout=30)
+    assert not thread.is_alive(), f"{url} hung with {CONCURRENT_REQUESTS} concurrent requests"
+    return statuses
+
+
+@pytest.fixture
+def reloading(monkeypatch):
+    """Make every request check the data version and reload the in-process caches."""
+    monkeypatch.setattr(screener_engine.screener, "check_interval", 0.0)
+    monkeypatch.setattr(screener_engine.screener, "version", None)
+
+
+def test_memory_screener_concurrent_requests(async_app, reloading, monkeypatch):
+    monkeypatch.setattr(screener_engine, "enabled", True)
+    assert fetch_concurrently(async_app, "/api/fundamentals?sort_by=pe_ttm") == [200] * CONCURRENT_REQUESTS
+
+
+def test_scores_concurrent_requests(async_app, reloading):
+    # Scores always run on the snapshot, reloaded through run_sync, even with the SQL screener.
+    assert fetch_concurrently(async_app, "/api/scores?factors=quality") == [200] * CONCURRENT_REQUESTS
+
+
+def test_backtest_concurrent_requests(async_app, monkeypatch):
+    from backtest import price_matrix
+
+    monkeypatch.setattr(price_matrix, "check_interval", 0.0)
+    monkeypatch.setattr(price_matrix, "version", None)
+    assert fetch_concurrently(async_app, "/api/backtest?max_holdings=5") == [200] * CONCURRENT_REQUESTS
+
+
+def answers_during(app, url, monkeypatch, target, name):
+    """Replace target.name with a call that blocks until released, and check /api/stocks answers while `url` waits on it."""
+    started, released = threading.Event(), threading.Event()
+    finished = []
+
+    def slow(*args, **kwargs):
+        # Stands in for the CPU-bound work behind `url`.
+        started.set()
+        released.wait(timeout=10)
+        finished.append(url)
+        return {"ok": True}
+
+    monkeypatch.setattr(target, name, slow)
+
+    async def run():
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            in_flight = asyncio.create_task(client.get(url))
+            while not started.is_set():
+                await asyncio.sleep(0.01)
+            response = await client.get("/api/stocks")
+            finished.append("/api/stocks")
+            released.set()
+            assert response.status_code == 200
+            assert (await in_flight).status_code == 200
+
+    asyncio.run(run())
+    assert finished == ["/api/stocks", url]
+
+
+def test_backtest_runs_off_the_event_loop(async_app, monkeypatch):
+    import backtest
+
+    answers_during(async_app, "/api/backtest", monkeypatch, backtest, "run_backtest")
+
+
+def test_scores_run_off_the_event_loop(async_app, monkeypatch):
+    from scoring import scorer
+
+    answers_during(async_app, "/api/scores?factors=quality", monkeypatch, scorer, "score")
+
+
+def test_memory_screener_runs_off_the_event_loop(async_app, monkeypatch):
+    monkeypatch.setattr(screener_engine, "enabled", True)
+    answers_during(async_app, "/api/fundamentals", monkeypatch, screener_engine.screener, "query")
@@ -0,0 +1,47 @@
+import pytest
+from fastapi.testclient import TestClient
+
+
+@pytest.mark.parametrize("app_fixture", ["app", "async_app"])
+def test_unknown_period_is_rejected(request, app_fixture):
+    with TestClient(request.getfixturevalue(app_fixture)) as client:
+        response = client.get("/api/export/price-history?period=2W")
+    assert response.status_code == 400
+
+
+@pytest.mark.parametrize("app_fixture", ["app", "async_app"])
+def test_period_limits_the_export(request, app_fixture, symbols):
+    with TestClient(request.getfixturevalue(app_fixture)) as client:
+        full = client.get(f"/api/export/price-history?tickers={symbols[0]}")
+        month = client.get(f"/api/export/price-history?tickers={symbols[0]}&period=1m")
+    assert full.status_code == month.status_code == 200
+    # Header plus roughly 21 trading days.
+    assert 15 < len(month.text.splitlines()) < 30 < len(full.text.splitlines())
+
+
+@pytest.mark.parametrize("header, expected", [
+    ("gzip", True),
+    ("gzip, deflate, br", True),
+    ("br;q=1.0, gzip;q=0.5", True),
+    ("GZIP; Q=0.1", True),
+    ("*", True),
+    ("", False),
+    ("deflate", False),
+    ("gzip;q=0", False),
+    ("gzip;q=0.000", False),
+    ("*;q=1, gzip;q=0", False),
+    ("identity", False),
+])
+def test_accepts_gzip(header, expected):
+    from exports import accepts_gzip
+
+    assert accepts_gzip(header) is expected
+
+
+def test_refused_gzip_is_not_compressed(app, symbols):
+    with TestClient(app) as client:
+        response = client.get(f"/api/export/price-history?tickers={symbols[0]}",
+                              headers={"Accept-Encoding": "gzip;q=0, identity"})
+    assert response.status_code == 200
+    assert "content-encoding" not in response.headers
+    assert response.content.splitlines()[0] == b"ticker,date,open,high,low,close,volume"
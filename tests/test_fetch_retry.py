@@ -0,0 +1,115 @@
+import pandas as pd
+import pytest
+
+import fetch_engine
+from FundamentalScript import FetchError, FundamentalScraper
+from fetch_engine import StubScraper
+from update_fundamentals import _sequential_results
+
+
+class Payloads:
+    """Stands in for ScrapeCache, serving fixed payloads per endpoint."""
+
+    def __init__(self, **payloads):
+        self.payloads = payloads
+
+    def fetch(self, endpoint, ticker, loader, params=None, cacheable=None):
+        return self.payloads.get(endpoint)
+
+
+def flaky(failures):
+    """A StubScraper whose first `failures` fundamentals fetches come back empty-handed."""
+    calls = []
+
+    class Flaky(StubScraper):
+        latency = 0
+
+        def getFundamentals(self):
+            calls.append(self.ticker)
+            if len(calls) <= failures:
+                raise FetchError(f"No info returned for {self.ticker}")
+            return super().getFundamentals()
+
+    return Flaky, calls
+
+
+@pytest.fixture(autouse=True)
+def no_backoff(monkeypatch):
+    monkeypatch.setattr(fetch_engine.time, "sleep", lambda seconds: None)
+
+
+def test_empty_info_raises():
+    with pytest.raises(FetchError):
+        FundamentalScraper("AAPL", cache=Payloads(info={})).getFundamentals()
+
+
+def test_empty_history_raises_only_for_a_full_fetch():
+    scraper = FundamentalScraper("AAPL", cache=Payloads(history=pd.DataFrame()))
+    with pytest.raises(FetchError):
+        scraper.getPriceHistory()
+    # Nothing new since the last stored bar is not a failure.
+    assert scraper.getPriceHistory(start=pd.Timestamp("2024-01-02").date()) == []
+
+
+def test_sequential_path_retries():
+    source, calls = flaky(failures=2)
+    (ticker, data, bars, _, error, _), = _sequential_results(["T0001"], source, {}, retries=3)
+    assert error is None
+    assert data["ticker"] == "T0001" and bars
+    assert len(calls) == 3
+
+
+def test_sequential_path_gives_up_after_retries():
+    source, calls = flaky(failures=10)
+    (_, data, _, _, error, _), = _sequential_results(["T0001"], source, {}, retries=2)
+    assert isinstance(error, FetchError) and data is None
+    assert len(calls) == 3
+
+
+def test_concurrent_path_retries():
+    source, calls = flaky(failures=1)
+    results = list(fetch_engine.fetch_concurrently(["T0001"], source, workers=1, rate=0, retries=1))
+    assert results[0][4] is None
+    assert len(calls) == 2
+
+
+class CountingLimiter:
+    def __init__(self):
+        self.acquired = 0
+
+    def acquire(self, tokens=1.0):
+        self.acquired += tokens
+
+
+def test_limiter_is_charged_per_upstream_request():
+    limiter = CountingLimiter()
+    fetch_engine.fetch_ticker("T0001", flaky(failures=0)[0], limiter=limiter)
+    # One request for the fundamentals, one for the price history.
+    assert limiter.acquired == 2
+
+
+def test_scraper_charges_the_limiter_on_cache_misses_only(monkeypatch):
+    import sys
+    import types
+
+    class Ticker:
+        def __init__(self, symbol, session=None):
+            self.info = {"shortName": symbol}
+
+        def __getattr__(self, name):
+            raise AttributeError(name)
+
+    monkeypatch.setitem(sys.modules, "yfinance", types.SimpleNamespace(Ticker=Ticker))
+
+    class Loading(Payloads):
+        def fetch(self, endpoint, ticker, loader, params=None, cacheable=None):
+            return self.payloads[endpoint] if endpoint in self.payloads else loader()
+
+    limiter = CountingLimiter()
+    FundamentalScraper("AAPL", limiter=limiter).getFundamentals()
+    # quarterly_income_stmt, quarterly_balance_sheet, quarterly_cashflow, financials, info and cash_flow.
+    assert limiter.acquired == 6
+
+    limiter = CountingLimiter()
+    FundamentalScraper("AAPL", cache=Loading(info={"shortName": "Apple"}), limiter=limiter).getFundamentals()
+    assert limiter.acquired == 5
@@ -0,0 +1,22 @@
+import os
+import subprocess
+import sys
+
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+@pytest.mark.parametrize("module", ["update_fundamentals", "FundamentalScript", "indicators", "peer_ranks"])
+def test_refresh_modules_defer_numpy_and_pandas(module):
+    code = f"import sys, {module}; assert not {{'numpy', 'pandas'}} & set(sys.modules), sorted(sys.modules)"
+    subprocess.run([sys.executable, "-c", code], cwd=ROOT, check=True)
+
+
+def test_parsed_fields_without_a_price():
+    from fundamental_history import parsed_fields
+
+    row = {"week_range_52": "100.0 - 200.0", "current_price": 150.0}
+    assert parsed_fields(row)["pct_from_52w_high"] == -0.25
+    assert parsed_fields(dict(row, current_price=float("nan")))["pct_from_52w_high"] is None
+    assert parsed_fields(dict(row, current_price=None))["pct_from_52w_high"] is None
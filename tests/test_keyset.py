@@ -0,0 +1,47 @@
+import pytest
+from fastapi.testclient import TestClient
+
+
+def walk(client, query, limit):
+    """Every row of a cursor-paginated screener query, following next_cursor to the end."""
+    rows, cursor = [], None
+    while True:
+        url = f"/api/fundamentals?pagination=cursor&limit={limit}&{query}" + (f"&cursor={cursor}" if cursor else "")
+        response = client.get(url)
+        assert response.status_code == 200
+        page = response.json()
+        assert len(page["data"]) <= limit
+        rows += page["data"]
+        cursor = page["pagination"]["next_cursor"]
+        if cursor is None:
+            return rows
+
+
+def expected_order(rows, sort_by, sort_order):
+    """Values by sort_by with ticker breaking ties in the same direction, then NULLs by ticker."""
+    present = sorted((r for r in rows if r[sort_by] is not None), key=lambda r: (r[sort_by], r["ticker"]),
+                     reverse=sort_order == "desc")
+    nulls = sorted((r for r in rows if r[sort_by] is None), key=lambda r: r["ticker"])
+    return [r["ticker"] for r in present + nulls]
+
+
+# Fundamentals, indicator and peer rank columns; roe_sector_pct and return_1y have NULLs.
+@pytest.mark.parametrize("sort_by", ["market_cap", "analyst_rating_label", "rsi_14", "roe_sector_pct", "return_1y"])
+@pytest.mark.parametrize("sort_order", ["asc", "desc"])
+@pytest.mark.parametrize("limit", [1, 7, 100])
+@pytest.mark.parametrize("app_fixture", ["app", "async_app"])
+def test_cursor_pages_cover_every_row_in_order(request, app_fixture, symbols, sort_by, sort_order, limit):
+    query = f"sort_by={sort_by}&sort_order={sort_order}"
+    with TestClient(request.getfixturevalue(app_fixture)) as client:
+        rows = walk(client, query, limit)
+        everything = client.get(f"/api/fundamentals?limit=100&{query}").json()["data"]
+
+    assert [r["ticker"] for r in rows] == expected_order(everything, sort_by, sort_order)
+    assert len(rows) == len(symbols)
+
+
+def test_cursor_for_another_sort_is_rejected(app):
+    with TestClient(app) as client:
+        cursor = client.get("/api/fundamentals?pagination=cursor&limit=1").json()["pagination"]["next_cursor"]
+        response = client.get(f"/api/fundamentals?pagination=cursor&sort_by=pe_ttm&cursor={cursor}")
+    assert response.status_code == 400
@@ -0,0 +1,10 @@
+from fastapi.testclient import TestClient
+
+
+def test_price_matrix_gauge(app, symbols):
+    from backtest import price_matrix
+
+    with TestClient(app) as client:
+        assert client.get("/api/backtest?max_holdings=5").status_code == 200
+        metrics = client.get("/metrics").text
+    assert f"price_matrix_tickers {len(price_matrix.tickers)}" in metrics
@@ -0,0 +1,55 @@
+import math
+from datetime import date, timedelta
+
+from fastapi.testclient import TestClient
+
+from queries import aligned_price_series
+
+
+def bars(ticker, start, days, step=1, drift=0.01):
+    """(ticker, date, o, h, l, c, v) rows on every `step`-th weekday from `start`."""
+    rows = []
+    day = start
+    while len(rows) < days:
+        if day.weekday() < 5 and (day - start).days % step == 0:
+            close = 100 * (1 + drift) ** len(rows) + 5 * math.sin(len(rows) / 3)
+            rows.append((ticker, day, close, close + 1, close - 1, close, 1000))
+        day += timedelta(days=1)
+    return rows
+
+
+def test_max_points_bounds_the_shared_axis():
+    # Different calendars, so per-ticker downsampling would pick different dates.
+    rows = bars("AAA", date(2024, 1, 1), 250) + bars("BBB", date(2024, 1, 3), 200, step=2, drift=-0.005)
+    result = aligned_price_series(rows, ["AAA", "BBB"], max_points=40)
+
+    assert len(result["dates"]) == 40
+    assert result["dates"] == sorted(result["dates"])
+    for fields in result["series"].values():
+        assert all(len(values) == 40 for values in fields.values())
+    # Both tickers keep bars on the sampled dates, not one disjoint set each.
+    both = [a is not None and b is not None
+            for a, b in zip(result["series"]["AAA"]["close"], result["series"]["BBB"]["close"])]
+    assert sum(both) > 10
+
+
+def test_weekly_candles_share_dates():
+    aaa = bars("AAA", date(2024, 1, 1), 60)
+    rows = aaa + bars("BBB", date(2024, 1, 3), 60, step=2)
+    result = aligned_price_series(rows, ["AAA", "BBB"], resolution="W")
+
+    # One date per week, and each of AAA's weeks is a single candle on it.
+    weeks = [d.isocalendar()[:2] for d in result["dates"]]
+    assert len(weeks) == len(set(weeks))
+    candles = sum(v is not None for v in result["series"]["AAA"]["close"])
+    assert candles == len({row[1].isocalendar()[:2] for row in aaa})
+
+
+def test_batch_endpoint_respects_max_points(app, symbols):
+    tickers = ",".join(symbols[:5])
+    with TestClient(app) as client:
+        response = client.get(f"/api/stocks/price-history?tickers={tickers}&period=1Y&max_points=50")
+    assert response.status_code == 200
+    body = response.json()
+    assert len(body["dates"]) == 50
+    assert all(len(fields["close"]) == 50 for fields in body["series"].values())
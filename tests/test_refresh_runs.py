@@ -0,0 +1,36 @@
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+import update_fundamentals
+from fetch_engine import StubScraper
+from migrations import upgrade
+from models import PriceHistory, RefreshStatus
+
+
+class Instant(StubScraper):
+    latency = 0
+
+
+def test_failed_price_sync_marks_the_ticker_failed(tmp_path, monkeypatch):
+    engine = create_engine(f"sqlite:///{tmp_path / 'refresh.db'}")
+    upgrade(engine)
+    Session = sessionmaker(engine)
+    sync = update_fundamentals.sync_price_history
+
+    def failing_sync(db, ticker, *args):
+        if ticker == "T0002":
+            raise RuntimeError("upsert failed")
+        return sync(db, ticker, *args)
+
+    monkeypatch.setattr(update_fundamentals, "SessionLocal", Session)
+    monkeypatch.setattr(update_fundamentals, "sync_price_history", failing_sync)
+    monkeypatch.setattr(update_fundamentals, "tickers", ["T0001", "T0002"])
+    update_fundamentals.update_fundamentals(source=Instant)
+
+    with Session() as db:
+        statuses = dict(db.query(RefreshStatus.ticker, RefreshStatus.status).all())
+        assert statuses == {"T0001": "ok", "T0002": "failed"}
+        assert db.query(PriceHistory).filter(PriceHistory.ticker == "T0002").count() == 0
+        # A resumed run retries it.
+        run, pending = update_fundamentals.begin_run(db, update_fundamentals.tickers, resume=True)
+        assert pending == ["T0002"]
@@ -0,0 +1,56 @@
+import asyncio
+
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine
+from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+from sqlalchemy.orm import Session
+from starlette.requests import Request
+
+from models import DataVersion
+from response_cache import ResponseCache, bump_data_version, cached_response, response_cache
+
+
+def request(path="/api/test"):
+    return Request({"type": "http", "method": "GET", "path": path, "query_string": b"", "headers": []})
+
+
+def test_missing_table_means_no_version():
+    # A database nothing was ever created in.
+    with Session(create_engine("sqlite://")) as db:
+        assert ResponseCache().data_version(db) is None
+
+
+def test_missing_table_means_no_version_async():
+    async def version():
+        engine = create_async_engine("sqlite+aiosqlite://")
+        async with AsyncSession(engine) as db:
+            return await ResponseCache().data_version_async(db)
+
+    assert asyncio.run(version()) is None
+
+
+def test_nothing_is_cached_without_a_version():
+    cache = ResponseCache()
+    calls = []
+
+    def build():
+        calls.append(1)
+        return {"ok": True}
+
+    with Session(create_engine("sqlite://")) as db:
+        for _ in range(2):
+            assert cached_response(cache, request(), db, build).status_code == 200
+    assert len(calls) == 2
+    assert cache.stats()["entries"] == 0
+
+
+def test_detail_route_without_a_version_row(app, db, symbols):
+    db.query(DataVersion).delete()
+    db.commit()
+    try:
+        response_cache.clear()
+        with TestClient(app) as client:
+            assert client.get(f"/api/stock/{symbols[0]}").status_code == 200
+            assert client.get(f"/api/stock/{symbols[0]}/price-history").status_code == 200
+    finally:
+        bump_data_version(db)
@@ -0,0 +1,42 @@
+import pandas as pd
+import pytest
+
+from scrape_cache import ScrapeCache
+
+
+@pytest.mark.parametrize("empty", [None, {}, [], "", pd.DataFrame(), pd.Series(dtype=float)])
+def test_empty_payloads_are_not_cached(tmp_path, empty):
+    cache = ScrapeCache(str(tmp_path))
+    calls = []
+
+    def loader():
+        calls.append(1)
+        return empty
+
+    for _ in range(2):
+        cache.fetch("info", "AAPL", loader)
+    assert len(calls) == 2
+    assert cache.stats()["skipped"] == 2
+    assert cache.stats()["files"] == 0
+
+
+def test_payloads_with_data_are_cached(tmp_path):
+    cache = ScrapeCache(str(tmp_path))
+    frame = pd.DataFrame({"Close": [1.0, 2.0]})
+    calls = []
+
+    def loader():
+        calls.append(1)
+        return frame
+
+    first = cache.fetch("history", "AAPL", loader, {"period": "1y"})
+    second = cache.fetch("history", "AAPL", loader, {"period": "1y"})
+    assert len(calls) == 1
+    assert second.equals(first)
+
+
+def test_custom_predicate(tmp_path):
+    cache = ScrapeCache(str(tmp_path))
+    priced = lambda info: info.get("regularMarketPrice") is not None
+    cache.fetch("info", "AAPL", lambda: {"regularMarketPrice": None}, cacheable=priced)
+    assert cache.get("info", "AAPL") == (False, None)
@@ -0,0 +1,46 @@
+import pytest
+from fastapi.testclient import TestClient
+
+import screener_engine
+
+
+def screen(client, monkeypatch, memory, query):
+    monkeypatch.setattr(screener_engine, "enabled", memory)
+    response = client.get(f"/api/fundamentals?limit=100&{query}")
+    assert response.status_code == 200
+    return response.json()
+
+
+# roe_sector_pct is NULL for tickers alone in their sector and return_1y for all of them (one year of bars).
+@pytest.mark.parametrize("sort_by", ["market_cap", "pe_ttm", "roe_sector_pct", "return_1y"])
+@pytest.mark.parametrize("sort_order", ["asc", "desc"])
+def test_memory_engine_matches_sql(app, monkeypatch, sort_by, sort_order):
+    query = f"sort_by={sort_by}&sort_order={sort_order}"
+    with TestClient(app) as client:
+        sql = screen(client, monkeypatch, False, query)
+        memory = screen(client, monkeypatch, True, query)
+
+    assert memory["pagination"] == sql["pagination"]
+    # Ties may come back in either order, so rows are compared by their sort values and as a set.
+    assert [r[sort_by] for r in memory["data"]] == [r[sort_by] for r in sql["data"]]
+    assert {r["ticker"] for r in memory["data"]} == {r["ticker"] for r in sql["data"]}
+
+
+@pytest.mark.parametrize("sort_order", ["asc", "desc"])
+def test_nulls_sort_last(app, monkeypatch, sort_order):
+    with TestClient(app) as client:
+        for memory in (False, True):
+            values = [r["roe_sector_pct"] for r in
+                      screen(client, monkeypatch, memory, f"sort_by=roe_sector_pct&sort_order={sort_order}")["data"]]
+            present = [v for v in values if v is not None]
+            assert 0 < len(present) < len(values)
+            assert values == present + [None] * (len(values) - len(present))
+
+
+@pytest.mark.parametrize("memory", [False, True])
+def test_text_peer_columns_are_not_ranges(app, monkeypatch, memory):
+    with TestClient(app) as client:
+        unfiltered = screen(client, monkeypatch, memory, "")
+        # sector and industry live in peer_ranks too, but only take exact names.
+        filtered = screen(client, monkeypatch, memory, "min_sector=1&max_industry=x")
+    assert filtered["pagination"] == unfiltered["pagination"]
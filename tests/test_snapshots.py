@@ -0,0 +1,66 @@
+import numpy as np
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import Session
+
+from migrations import upgrade
+from models import DataVersion, PriceHistory
+from snapshots import export_from_db, load_snapshot, seed_database
+
+
+@pytest.fixture
+def snapshot_path(db, tmp_path):
+    return export_from_db(db, root=str(tmp_path / "snapshots"))
+
+
+def test_ticker_slice_matches_rows(snapshot_path, symbols):
+    _, prices = load_snapshot(snapshot_path)
+    tickers = prices["ticker"]
+    for symbol in symbols:
+        rows = prices.ticker_slice(symbol)
+        assert rows.stop > rows.start
+        assert set(tickers[rows]) == {symbol}
+    assert sum(len(tickers[prices.ticker_slice(s)]) for s in symbols) == len(prices)
+
+
+def test_ticker_slice_unknown_ticker(snapshot_path):
+    _, prices = load_snapshot(snapshot_path)
+    with pytest.raises(KeyError):
+        prices.ticker_slice("NOT-A-TICKER")
+    with pytest.raises(KeyError):
+        prices.ticker_slice("ZZZZZZ")
+
+
+def test_seed_database_bumps_data_version(snapshot_path, db, tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'seeded.db'}")
+    upgrade(engine)
+    with Session(engine) as seeded:
+        count, stats = seed_database(seeded, snapshot_path)
+        assert seeded.get(DataVersion, 1).version == 1
+        assert seeded.query(PriceHistory).count() == db.query(PriceHistory).count() == stats["rows"]
+
+        seed_database(seeded, snapshot_path)
+        assert seeded.get(DataVersion, 1).version == 2
+        # Re-seeding replaces the price history rather than duplicating it.
+        assert seeded.query(PriceHistory).count() == stats["rows"]
+    assert count == len(np.unique(load_snapshot(snapshot_path)[0]["ticker"]))
+
+
+def test_screener_snapshot_loads_in_create_app_not_on_import(snapshot_path, monkeypatch):
+    import os
+    import subprocess
+    import sys
+
+    import screener_engine
+    from stockendpoint import create_app
+
+    env = dict(os.environ, SCREENER_ENGINE="memory", SCREENER_SNAPSHOT=snapshot_path)
+    code = "import sys, screener_engine; assert screener_engine.screener.state is None; assert 'numpy' not in sys.modules"
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    subprocess.run([sys.executable, "-c", code], env=env, cwd=root, check=True)
+
+    monkeypatch.setenv("SCREENER_SNAPSHOT", snapshot_path)
+    monkeypatch.setattr(screener_engine, "enabled", True)
+    monkeypatch.setattr(screener_engine, "screener", screener_engine.ScreenerSnapshot())
+    create_app()
+    assert len(screener_engine.screener.state[2]) == len(load_snapshot(snapshot_path)[0])
@@ -1,100 +1,171 @@
-import pandas as pd
-import numpy as np
-from FundamentalScript import FundamentalScraper
+from functools import partial
+from FundamentalScript import FundamentalScraper, make_session
 from models import SessionLocal, Fundamental, Stock, PriceHistory
 from sqlalchemy.orm import Session
+from fetch_engine import DeadlineExceeded, fetch_concurrently, fetch_with_retry
+from price_sync import latest_price_bars, sync_price_history
+from indicators import update_indicators
+from peer_ranks import update_peer_ranks
+from fundamental_history import append_snapshots, fundamental_row
+from response_cache import bump_data_version
+from scrape_cache import ScrapeCache, SCRAPE_CACHE_DIR
+from refresh_runs import begin_run, stalest_first, record_ticker, finish_run
 import time
 
 tickers = ['UNH', 'PLD', 'CC', 'AEP', 'GOOGL', 'MLM', 'PINS', 'ORA', 'SPG', 'C', 'OTIS', 'APD', 'MU', 'KDP', 'EMR', 'DUK', 'IFF', 'XOM', 'CVX', 'HSY', 'AXP', 'NEXT', 'GS', 'RBLX', 'TXN', 'NTRS', 'GE', 'ADBE', 'CLX', 'MET', 'WY', 'BUD', 'KMB', 'EOG', 'ICE', 'COF', 'REGN', 'PEP', 'VLO', 'NOC', 'CAT', 'PEG', 'MDB', 'SCHW', 'PGR', 'PSA', 'DD', 'BA', 'ABBV', 'CVS', 'ZM', 'UNP', 'CDNS', 'CCI', 'FOXA', 'ALL', 'DE', 'AMR', 'LRCX', 'EXC', 'SRE', 'STT', 'ENPH', 'HD', 'BE', 'BAC', 'EQR', 'ROKU', 'CHTR', 'SEDG', 'AMAT', 'CRWD', 'INFY', 'HUM', 'IRM', 'KIM', 'MDLZ', 'CRSR', 'CSX', 'FDX', 'FANG', 'VTR', 'BLK', 'FOX', 'AFRM', 'TGT', 'SO', 'DOCS', 'RTX', 'BABA', 'MMC', 'DDOG', 'DEO', 'ORCL', 'PNC', 'PG', 'JNJ', 'COP', 'TRV', 'TD', 'FCX', 'BALL', 'WBD', 'OKTA', 'PARR', 'NVDA', 'COST', 'VZ', 'ASML', 'PH', 'PYPL', 'IBM', 'PLUG', 'CRM', 'LOW', 'COIN', 'EMN', 'MOS', 'TFC', 'NUE', 'IP', 'ZS', 'UL', 'NOW', 'AON', 'SNAP', 'KO', 'DOCU', 'WMT', 'UPS', 'LIN', 'ECL', 'LMT', 'WMB', 'PKG', 'NET', 'VRTX', 'PRU', 'BTU', 'TSM', 'HOOD', 'NVO', 'LUMN', 'FYBR', 'O', 'METC', 'MRVL', 'VMC', 'ADI', 'MCD', 'ABNB', 'SLB', 'DASH', 'BKNG', 'AMT', 'EQIX', 'MDT', 'KLAC', 'ITW', 'KMI', 'ETN', 'RUN', 'ILMN', 'RHI', 'SNPS', 'NOK', 'GILD', 'UBER', 'HST', 'SHOP', 'DVN', 'TMO', 'TMUS', 'AVGO', 'INTC', 'FAST', 'OXY', 'MSFT', 'BMY', 'D', 'SMR', 'NXPI', 'ALB', 'ZBH', 'FRT', 'MRK', 'DG', 'ERIC', 'AMD', 'TJX', 'TSLA', 'CME', 'CL', 'CF', 'VST', 'ESS', 'REG', 'WFC', 'TEAM', 'MPC', 'ISRG', 'HON', 'LLY', 'BK', 'SBUX', 'BIIB', 'CMCSA', 'COMM', 'QCOM', 'DHR', 'AMGN', 'BSX', 'SIRI', 'ULTA', 'INTU', 'DIS', 'DAL', 'GD', 'PANW', 'JCI', 'AMZN', 'TM', 'NEE', 'CI', 'EL', 'NSC', 'DOW', 'SOC', 'SAP', 'APA', 'UDR', 'PFE', 'EXR', 'PSX', 'OKE', 'CE', 'LYB', 'NKE', 'META', 'MS', 'MEOH', 'T', 'CMI', 'BXP', 'SHW', 'PPG', 'JD', 'CCJ', 'SONY', 'YUM', 'MAA', 'CPT', 'EW', 'LYFT', 'AAPL', 'HCC', 'MMM', 'NFLX', 'AVB', 'DLTR', 'JPM', 'USB']
 
-def update_fundamentals():
+def save_ticker(db, ticker_symbol, data, price_history_data, full_resync=True):
+    for key, value in data.items():
+        if value == "":
+            data[key] = None
+
+    stock = db.query(Stock).filter(Stock.ticker == ticker_symbol).first()
+    if not stock:
+        stock = Stock(ticker=ticker_symbol, company_name=data.get('company_name'))
+        db.add(stock)
+    # Sector and industry group the peer ranks; keep them current when the source reports them.
+    for field in ('sector', 'industry'):
+        if data.get(field):
+            setattr(stock, field, data[field])
+    db.commit()
+
+    append_snapshots(db, [fundamental_row(ticker_symbol, data)])
+
+    rows_written = 1
+
+    # A failed sync propagates, so the caller rolls back and records the ticker as failed rather than "ok".
+    if price_history_data:
+        stats = sync_price_history(db, ticker_symbol, price_history_data, full_resync)
+        rows_written += stats['rows']
+        print(f"Added {stats['rows']} price history records ({stats['rows_per_sec']:,.0f} rows/sec)")
+
+    db.commit()
+    return rows_written
+
+
+def _sequential_results(symbols, source, last_bars, deadline=None, retries=3):
+    for ticker_symbol in symbols:
+        start = time.perf_counter()
+        try:
+            data, price_history_data, full_resync = fetch_with_retry(
+                ticker_symbol, source, retries=retries, last_bar=last_bars.get(ticker_symbol), deadline=deadline
+            )
+            yield ticker_symbol, data, price_history_data, full_resync, None, time.perf_counter() - start
+        except Exception as e:
+            yield ticker_symbol, None, [], True, e, time.perf_counter() - start
+
+
+def update_fundamentals(concurrent=False, workers=8, rate=20.0, retries=3, incremental=False, source=FundamentalScraper,
+                        cache=None, resume=False, time_budget=None):
+    """Refresh every ticker, recording each outcome in refresh_status.
+
+    `resume` continues the latest run with only its failed and unreached tickers.
+    Tickers are refreshed stalest first; with `time_budget` (seconds) no new
+    fetch starts once it is spent and the run is marked partial, to be resumed later.
+    """
     db: Session = SessionLocal()
-    total_tickers = len(tickers)
-    print(f"Starting update for {total_tickers} tickers...")
+
+    run, pending = begin_run(db, tickers, resume)
+    pending = stalest_first(db, pending)
+    total_tickers = len(pending)
+    print(f"Starting {'resumed ' if resume else ''}run {run.id}: updating {total_tickers} tickers...")
+
+    # Incremental mode only fetches bars after the last stored date for each ticker.
+    last_bars = latest_price_bars(db) if incremental else {}
+    deadline = time.monotonic() + time_budget if time_budget else None
+
+    if source is FundamentalScraper:
+        # Every scraper shares one pooled session; `cache` (a ScrapeCache) lets a rerun skip payloads already fetched.
+        source = partial(FundamentalScraper, session=make_session(), cache=cache)
+
+    if concurrent:
+        results = fetch_concurrently(pending, source, workers=workers, rate=rate, retries=retries, last_bars=last_bars,
+                                     deadline=deadline)
+    else:
+        results = _sequential_results(pending, source, last_bars, deadline, retries)
+
+    # Tickers whose bars were written this run; their indicators are refreshed at the end.
+    priced = []
+    unreached = 0
 
     try:
-        for index, ticker_symbol in enumerate(tickers):
+        # Fetching may happen on worker threads, but every write goes through this one session.
+        for index, (ticker_symbol, data, price_history_data, full_resync, error, fetch_seconds) in enumerate(results):
+            if isinstance(error, DeadlineExceeded):
+                # Not attempted: no status row, so a resumed run picks it up.
+                unreached += 1
+                continue
+
+            start = time.perf_counter()
             try:
-                scraper = FundamentalScraper(ticker_symbol)
-                data = scraper.getFundamentals()
-                
+                if error is not None:
+                    raise error
+
                 if not data:
-                    print(f"Skipping {ticker_symbol}: No data returned.")
-                    continue
-
-                for key, value in data.items():
-                    if value == "":
-                        data[key] = None
-                
-                stock = db.query(Stock).filter(Stock.ticker == ticker_symbol).first()
-                if not stock:
-                    new_stock = Stock(ticker=ticker_symbol, company_name=data.get('company_name'))
-                    db.add(new_stock)
-                    db.commit()
-
-                db.query(Fundamental).filter(Fundamental.ticker == ticker_symbol).delete()
-                
-                fundamental_entry = Fundamental(
-                    ticker=ticker_symbol,
-                    snapshot_date=data.get("snapshot_date"),
-                    revenue_growth_yoy=data.get("revenue_growth_YoY"),
-                    debt_to_equity=data.get("debt_to_equity"),
-                    interest_coverage=data.get("interest_coverage"),
-                    free_cash_flow_positive=data.get("free_cash_flow_positive"),
-                    roe=data.get("roe"),
-                    profit_margin=data.get("profit_margin"),
-                    current_ratio=data.get("current_ratio"),
-                    eps_ttm=data.get("EPS TTM"),
-                    pe_ttm=data.get("P/E TTM"),
-                    analyst_rating=data.get("Analyst Rating"),
-                    peg_5y=data.get("5y PEG"),
-                    week_range_52=data.get("52 Week Range"),
-                    day_range=data.get("Day Range"),
-                    current_price=data.get("Current Price"),
-                    perf_1y=data.get("perf_1y"),
-                    beta=data.get("beta"),
-                    pe_trailing=data.get("pe_trailing"),
-                    market_cap=data.get("market_cap"),
-                )
-                
-                db.add(fundamental_entry)
-                
-                try:
-                    price_history_data = scraper.getPriceHistory()
-                    if price_history_data:
-                        db.query(PriceHistory).filter(PriceHistory.ticker == ticker_symbol).delete()
-                        
-                        for price_point in price_history_data:
-                            price_entry = PriceHistory(
-                                ticker=ticker_symbol,
-                                date=price_point['date'],
-                                open_price=price_point['open_price'],
-                                high_price=price_point['high_price'],
-                                low_price=price_point['low_price'],
-                                close_price=price_point['close_price'],
-                                volume=price_point['volume']
-                            )
-                            db.add(price_entry)
-                        print(f"Added {len(price_history_data)} price history records")
-                except Exception as e:
-                    print(f"Error updating price history: {e}")
-                
+                    raise ValueError("No data returned")
+
+                rows_written = save_ticker(db, ticker_symbol, data, price_history_data, full_resync)
+                if price_history_data:
+                    priced.append(ticker_symbol)
+                record_ticker(db, run, ticker_symbol, "ok", fetch_seconds + time.perf_counter() - start, rows_written)
+
                 progress = round(((index + 1) / total_tickers) * 100, 2)
                 print(f"[{progress}%] Updated {ticker_symbol}")
 
-                db.commit()
-
             except Exception as e:
                 print(f"Error processing {ticker_symbol}: {e}")
                 db.rollback() 
+                record_ticker(db, run, ticker_symbol, "failed", fetch_seconds + time.perf_counter() - start, error=e)
                 continue
 
+        stats = update_indicators(db, priced)
+        db.commit()
+        print(f"Updated indicators for {stats['tickers']} tickers in {stats['seconds']:.2f}s")
+
+        stats = update_peer_ranks(db)
+        db.commit()
+        print(f"Ranked {stats['tickers']} tickers across {stats['sectors']} sectors in {stats['seconds']:.2f}s")
+
+        # API workers are separate processes; their in-memory snapshots poll this version to reload.
+        bump_data_version(db)
+
+        finish_run(db, run, "partial" if unreached else "completed")
+        if unreached:
+            print(f"Time budget spent: {unreached} tickers left for a resumed run.")
         print("All updates completed.")
 
     except Exception as e:
         print(f"Critical Error: {e}")
+        db.rollback()
+        finish_run(db, run, "failed")
     finally:
         db.close()
+        if cache is not None:
+            print(cache.report())
+
+
+if __name__ == "__main__":
+    import argparse
 
+    parser = argparse.ArgumentParser(description="Refresh fundamentals and price history.")
+    parser.add_argument("--concurrent", action="store_true", help="Fetch tickers on a worker pool")
+    parser.add_argument("--workers", type=int, default=8)
+    parser.add_argument("--rate", type=float, default=20.0, help="Max upstream requests per second (a ticker makes several)")
+    parser.add_argument("--retries", type=int, default=3)
+    parser.add_argument("--incremental", action="store_true", help="Only fetch and upsert price bars newer than the stored ones")
+    parser.add_argument("--cache-dir", default=SCRAPE_CACHE_DIR, help="Directory of the on-disk payload cache")
+    parser.add_argument("--no-cache", action="store_true", help="Always fetch from the network")
+    parser.add_argument("--resume", action="store_true", help="Only retry the failed and unreached tickers of the last run")
+    parser.add_argument("--time-budget", type=float, help="Seconds after which no new ticker is started")
+    args = parser.parse_args()
 
-update_fundamentals()
+    update_fundamentals(
+        concurrent=args.concurrent,
+        workers=args.workers,
+        rate=args.rate,
+        retries=args.retries,
+        incremental=args.incremental,
+        cache=None if args.no_cache else ScrapeCache(args.cache_dir),
+        resume=args.resume,
+        time_budget=args.time_budget,
+    )